@@ -3,9 +3,14 @@ SMS Phishing Firewall - Flask Application Factory
 """
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event
+
+from app.utils import serialization
 
 # Initialize extensions
 db = SQLAlchemy()
@@ -18,10 +23,93 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# SQLite tuning applied to every new connection (WAL lets webhook readers
+# and writers run concurrently instead of failing with 'database is locked')
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-65536',  # 64 MB
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',  # 256 MB
+    'PRAGMA busy_timeout=60000',
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS to a freshly opened SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+    # pysqlite's own transaction handling skips BEGIN before SAVEPOINT, so
+    # releasing a savepoint would commit the whole batch; emit BEGIN ourselves
+    dbapi_connection.isolation_level = None
+
+
+def _begin_sqlite_transaction(connection):
+    """Start SQLite transactions explicitly (see _set_sqlite_pragmas)."""
+    connection.exec_driver_sql('BEGIN')
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson when installed.
+
+    Output matches Flask's default provider: keys sorted per sort_keys,
+    datetimes formatted by default(), pretty-printed in debug mode (that
+    case is left to Flask). Non-ASCII text is written as UTF-8 rather than
+    \\u escapes. Falls back to Flask's default encoder for anything orjson
+    rejects and when orjson is missing.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if serialization.ORJSON_AVAILABLE and not kwargs:
+            try:
+                return serialization.dumps(obj, sort_keys=self.sort_keys, default=self.default)
+            except TypeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if serialization.ORJSON_AVAILABLE and not kwargs:
+            return serialization.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        # Passing both args and kwargs is an error; Flask raises it
+        if serialization.ORJSON_AVAILABLE and not pretty and not (args and kwargs):
+            # Same rules as jsonify(): one positional value as-is, several as
+            # a list, keyword arguments as a dict, nothing as null
+            obj = args[0] if len(args) == 1 else args or kwargs or None
+            try:
+                body = serialization.dumps_bytes(obj, sort_keys=self.sort_keys, default=self.default)
+            except TypeError:
+                body = None
+            if body is not None:
+                return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+        return super().response(*args, **kwargs)
 
-def create_app(config_name=None):
-    """Create and configure the Flask application."""
+
+def _social_post_disabled(*args, **kwargs):
+    """Stand-in for SocialMediaService.post_campaign_alert when disabled."""
+    return {'success': False, 'reason': 'disabled'}
+
+
+def create_app(config_name=None, minimal=False):
+    """
+    Create and configure the Flask application.
+
+    Args:
+        config_name: 'production', 'testing' or 'development' (default from
+            FLASK_ENV)
+        minimal: Only set up the database, for admin scripts; skips webhook
+            security, workers, social media and the routes (and their imports)
+
+    Returns:
+        Flask application
+    """
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
 
     # Load configuration
     config_name = config_name or os.getenv('FLASK_ENV', 'development')
@@ -39,6 +127,38 @@ def create_app(config_name=None):
     db.init_app(app)
     migrate.init_app(app, db)
 
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        with app.app_context():
+            event.listen(db.engine, 'connect', _set_sqlite_pragmas)
+            event.listen(db.engine, 'begin', _begin_sqlite_transaction)
+
+    if minimal:
+        return app
+
+    # Resolve webhook security settings once instead of per request
+    from app.utils.security import SecurityPolicy, build_ip_matcher, DEFAULT_WEBHOOK_IP_WHITELIST
+    app.extensions['sec_policy'] = SecurityPolicy.from_config(app.config)
+    app.extensions['ip_matcher'] = build_ip_matcher(
+        app.config.get('AT_WEBHOOK_IP_WHITELIST') or DEFAULT_WEBHOOK_IP_WHITELIST
+    )
+
+    from app.services.database.blacklist import BlacklistService
+    BlacklistService.reload_config(app.config)
+
+    # Choose the social media poster once; when disabled it is a no-op
+    if app.config.get('ENABLE_SOCIAL_MEDIA', False):
+        from app.services.notifications.social_media import SocialMediaService
+        with app.app_context():
+            app.extensions['social_post'] = SocialMediaService().post_campaign_alert
+    else:
+        app.extensions['social_post'] = _social_post_disabled
+
+    # Background workers for webhook processing (Gemini, DB writes, replies)
+    app.extensions['executor'] = ThreadPoolExecutor(
+        max_workers=app.config['SMS_WORKER_THREADS'],
+        thread_name_prefix='sms-worker'
+    )
+
     # Register blueprints (voice disabled for SMS/USSD-only focus)
     from app.routes.sms_webhook import sms_bp
     from app.routes.ussd_webhook import ussd_bp
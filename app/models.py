@@ -1,24 +1,59 @@
 """
 SQLAlchemy models for SMS Phishing Firewall
 """
-from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 from app import db
-import json
+
+# Native JSON column: JSONB on PostgreSQL, JSON (text-backed) elsewhere
+JSONType = db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql')
+
+
+class utcnow(FunctionElement):
+    """
+    Current time in UTC, as a naive timestamp.
+
+    Timestamp columns are naive and compared against datetime.utcnow()
+    cutoffs. PostgreSQL's now() is converted to the session TimeZone when
+    stored, so it is pinned to UTC there.
+    """
+    type = db.DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _compile_utcnow(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP is already UTC
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(utcnow, 'postgresql')
+def _compile_utcnow_postgresql(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
 
 
 class ScamLog(db.Model):
     """Log of reported scam messages."""
     __tablename__ = 'scam_logs'
+    __table_args__ = (
+        db.Index('ix_scamlog_campaign_score_ts', 'is_campaign', 'score', 'timestamp'),
+        db.Index('ix_scamlog_sender_ts', 'original_sender', 'timestamp'),
+        # URL containment queries (detected_urls @> '["..."]'), PostgreSQL only
+        db.Index(
+            'ix_scamlog_detected_urls', 'detected_urls', postgresql_using='gin'
+        ).ddl_if(dialect='postgresql'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     reporter_phone = db.Column(db.String(20), nullable=False, index=True)
-    original_sender = db.Column(db.String(20), nullable=True, index=True)
+    original_sender = db.Column(db.String(20), nullable=True)
     message_text = db.Column(db.Text, nullable=False)
     score = db.Column(db.Integer, nullable=False, index=True)
-    analysis_json = db.Column(db.Text, nullable=True)  # Store full Gemini response
-    detected_urls = db.Column(db.Text, nullable=True)  # JSON array of URLs
-    is_campaign = db.Column(db.Boolean, default=False, index=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    analysis_json = db.Column(JSONType, nullable=True)  # Store full Gemini response
+    detected_urls = db.Column(JSONType, nullable=True)  # JSON array of URLs
+    is_campaign = db.Column(db.Boolean, default=False)
+    timestamp = db.Column(db.DateTime, server_default=utcnow(), index=True)
 
     def to_dict(self):
         """Convert to dictionary."""
@@ -28,8 +63,8 @@ class ScamLog(db.Model):
             'original_sender': self.original_sender,
             'message_text': self.message_text,
             'score': self.score,
-            'analysis': json.loads(self.analysis_json) if self.analysis_json else None,
-            'detected_urls': json.loads(self.detected_urls) if self.detected_urls else [],
+            'analysis': self.analysis_json,
+            'detected_urls': self.detected_urls or [],
             'is_campaign': self.is_campaign,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None
         }
@@ -38,13 +73,17 @@ class ScamLog(db.Model):
 class Blacklist(db.Model):
     """Community blacklist of phone numbers and URLs."""
     __tablename__ = 'blacklist'
+    __table_args__ = (
+        # Serves the (entity_type, entity_value) probe on every webhook
+        db.Index('ix_blacklist_type_value', 'entity_type', 'entity_value'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    entity_type = db.Column(db.String(10), nullable=False, index=True)  # 'phone' or 'url'
-    entity_value = db.Column(db.String(500), nullable=False, unique=True, index=True)
+    entity_type = db.Column(db.String(10), nullable=False)  # 'phone', 'url' or 'message'
+    entity_value = db.Column(db.String(500), nullable=False, unique=True)
     hit_count = db.Column(db.Integer, default=0)
-    first_seen = db.Column(db.DateTime, default=datetime.utcnow)
-    last_seen = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    first_seen = db.Column(db.DateTime, server_default=utcnow())
+    last_seen = db.Column(db.DateTime, server_default=utcnow(), onupdate=utcnow())
     auto_blocked = db.Column(db.Boolean, default=False)
     reason = db.Column(db.String(200), nullable=True)
 
@@ -69,8 +108,8 @@ class Subscriber(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     phone_number = db.Column(db.String(20), unique=True, nullable=False, index=True)
     region = db.Column(db.String(50), nullable=True)
-    subscribed_at = db.Column(db.DateTime, default=datetime.utcnow)
-    alert_preferences = db.Column(db.Text, nullable=True)  # JSON object
+    subscribed_at = db.Column(db.DateTime, server_default=utcnow())
+    alert_preferences = db.Column(JSONType, nullable=True)  # JSON object
     is_active = db.Column(db.Boolean, default=True, index=True)
 
     def to_dict(self):
@@ -80,7 +119,7 @@ class Subscriber(db.Model):
             'phone_number': self.phone_number,
             'region': self.region,
             'subscribed_at': self.subscribed_at.isoformat() if self.subscribed_at else None,
-            'alert_preferences': json.loads(self.alert_preferences) if self.alert_preferences else {},
+            'alert_preferences': self.alert_preferences or {},
             'is_active': self.is_active
         }
 
@@ -88,16 +127,19 @@ class Subscriber(db.Model):
 class Campaign(db.Model):
     """Detected scam campaigns."""
     __tablename__ = 'campaigns'
+    __table_args__ = (
+        db.Index('ix_campaign_status_last_detected', 'status', 'last_detected'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     campaign_name = db.Column(db.String(200), nullable=False)
     pattern_description = db.Column(db.Text, nullable=True)
     affected_count = db.Column(db.Integer, default=0)
-    first_detected = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-    last_detected = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    status = db.Column(db.String(20), default='active', index=True)  # 'active', 'resolved', 'archived'
-    related_urls = db.Column(db.Text, nullable=True)  # JSON array
-    related_phones = db.Column(db.Text, nullable=True)  # JSON array
+    first_detected = db.Column(db.DateTime, server_default=utcnow(), index=True)
+    last_detected = db.Column(db.DateTime, server_default=utcnow(), onupdate=utcnow())
+    status = db.Column(db.String(20), default='active')  # 'active', 'resolved', 'archived'
+    related_urls = db.Column(JSONType, nullable=True)  # JSON array
+    related_phones = db.Column(JSONType, nullable=True)  # JSON array
 
     def to_dict(self):
         """Convert to dictionary."""
@@ -109,7 +151,7 @@ class Campaign(db.Model):
             'first_detected': self.first_detected.isoformat() if self.first_detected else None,
             'last_detected': self.last_detected.isoformat() if self.last_detected else None,
             'status': self.status,
-            'related_urls': json.loads(self.related_urls) if self.related_urls else [],
-            'related_phones': json.loads(self.related_phones) if self.related_phones else []
+            'related_urls': self.related_urls or [],
+            'related_phones': self.related_phones or []
         }
 
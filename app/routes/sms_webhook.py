@@ -4,16 +4,14 @@ SMS webhook routes.
 import logging
 from flask import Blueprint, request, jsonify, current_app
 from app.services.africas_talking.sms_service import SMSService
-from app.services.gemini.analyzer import GeminiAnalyzer
+from app.services.gemini.analyzer import get_analyzer
 from app.services.database.models import DatabaseService
 from app.services.database.blacklist import BlacklistService
-from app.services.notifications.alert_service import AlertService
-from app.services.notifications.social_media import SocialMediaService
+from app.services.notifications.alert_service import get_alert_service
 from app.utils.validators import (
     validate_phone_number,
     validate_sms_text,
-    extract_urls,
-    extract_phone_numbers,
+    extract_urls_and_phones,
     normalize_phone_number,
     sanitize_text
 )
@@ -22,34 +20,29 @@ from app.utils.security import (
     rate_limit,
     validate_request_data,
     require_webhook_security,
-    verify_webhook_signature_from_request,
     prevent_replay_attack,
-    ip_whitelist
+    ip_whitelist,
+    webhook_security_hook
 )
 
 logger = logging.getLogger(__name__)
 
 sms_bp = Blueprint('sms', __name__)
 
+# Signature, IP whitelist and replay checks run before any view in this blueprint
+sms_bp.before_request(webhook_security_hook)
+
 # Initialize services
 sms_service = None
-gemini_analyzer = None
-alert_service = None
-social_media_service = None
 
 
 def init_services():
     """Initialize services (called after app context is available)."""
-    global sms_service, gemini_analyzer, alert_service, social_media_service
+    global sms_service
     if sms_service is None:
         sms_service = SMSService()
-    if gemini_analyzer is None:
-        gemini_analyzer = GeminiAnalyzer()
-    if alert_service is None:
-        alert_service = AlertService()
-    if social_media_service is None:
-        social_media_service = SocialMediaService()
-    return sms_service, gemini_analyzer, alert_service, social_media_service
+    # The analyzer and alert service are shared per app via app.extensions
+    return sms_service, get_analyzer(), get_alert_service()
 
 
 @sms_bp.route('/sms', methods=['POST'])
@@ -65,155 +58,161 @@ def handle_sms_webhook():
     - linkId: Link ID for response
     """
     try:
-        # Security checks
-        webhook_secret = current_app.config.get('AT_WEBHOOK_SECRET', '')
-
-        # Verify signature if enabled and secret is configured
-        if webhook_secret and current_app.config.get('ENABLE_WEBHOOK_SIGNATURE', True):
-            if not verify_webhook_signature_from_request(webhook_secret):
-                logger.warning("Webhook signature verification failed")
-                return jsonify({'error': 'Invalid signature'}), 401
-
-        # Check IP whitelist if enabled
-        if current_app.config.get('ENABLE_IP_WHITELIST', True):
-            allowed_ips = current_app.config.get('AT_WEBHOOK_IP_WHITELIST', [])
-            if allowed_ips:
-                from app.utils.security import _is_ip_allowed
-                client_ip = request.remote_addr
-                if request.headers.get('X-Forwarded-For'):
-                    client_ip = request.headers.get('X-Forwarded-For').split(',')[0].strip()
-
-                if not _is_ip_allowed(client_ip, allowed_ips):
-                    logger.warning(f"IP whitelist violation: {client_ip}")
-                    return jsonify({'error': 'Unauthorized IP'}), 403
-
-        # Replay attack prevention
-        if current_app.config.get('ENABLE_REPLAY_PROTECTION', True):
-            request_id = request.form.get('id') or request.form.get('linkId', '')
-            if request_id:
-                import hashlib
-                from app.utils.security import _seen_nonces
-                nonce_hash = hashlib.sha256(request_id.encode()).hexdigest()
-                if nonce_hash in _seen_nonces:
-                    logger.warning(f"Replay attack detected: {request_id[:10]}...")
-                    return jsonify({'error': 'Duplicate request detected'}), 409
-                _seen_nonces.add(nonce_hash)
-
-        (
-            local_sms_service,
-            local_gemini_analyzer,
-            local_alert_service,
-            local_social_media_service
-        ) = init_services()
+        # Security checks already ran in webhook_security_hook
+
+        # Copy the form once; every later read is a plain dict lookup
+        form = request.form.to_dict(flat=True)
+
+        local_sms_service = init_services()[0]
 
         # Parse webhook data
-        webhook_data = local_sms_service.parse_webhook_data(request.form)
+        webhook_data = local_sms_service.parse_webhook_data(form)
         reporter_phone = webhook_data.get('from', '')
         message_text = webhook_data.get('text', '')
 
         # Validate input
         phone_valid, phone_error = validate_phone_number(reporter_phone)
         if not phone_valid:
-            logger.warning(f"Invalid phone number: {phone_error}")
+            logger.warning("Invalid phone number: %s", phone_error)
             return jsonify({'error': phone_error}), 400
 
         text_valid, text_error = validate_sms_text(message_text)
         if not text_valid:
-            logger.warning(f"Invalid SMS text: {text_error}")
+            logger.warning("Invalid SMS text: %s", text_error)
             return jsonify({'error': text_error}), 400
 
-        # Sanitize input
-        message_text = sanitize_text(message_text)
+        # Heavy work (blacklist lookups, Gemini, DB writes, reply SMS) runs in
+        # the background so Africa's Talking gets its 200 without waiting
+        current_app.extensions['executor'].submit(
+            process_sms_report,
+            current_app._get_current_object(),
+            reporter_phone,
+            message_text
+        )
 
-        # Extract URLs and phone numbers
-        detected_urls = extract_urls(message_text)
-        detected_phones = extract_phone_numbers(message_text)
-        normalized_reporter_phone = normalize_phone_number(reporter_phone)
+        return jsonify({'status': 'queued'}), 200
 
-        # Check blacklist first
-        original_sender = next(
-            (phone for phone in detected_phones if phone != normalized_reporter_phone),
-            None
-        )
+    except Exception as e:
+        logger.error("Error handling SMS webhook: %s", e, exc_info=True)
+        return jsonify({'error': 'Internal server error'}), 500
 
-        if not original_sender:
-            response_msg = (
-                "⚠️ Please include the sender phone number in the SMS you report "
-                "(e.g., 'From: +2547XXXXXXXX ...' or 'From: 07XXXXXXXX' or 'From: 2547XXXXXXXX') "
-                "so we can trace and blacklist the scammer."
-            )
-            local_sms_service.send_sms(response_msg, [reporter_phone])
-            return jsonify({
-                'status': 'ok',
-                'action': 'missing_sender_phone'
-            }), 200
 
-        if original_sender and BlacklistService.is_entity_blacklisted(phone_number=original_sender):
-            response_msg = "⚠️ This sender is already blacklisted. Thank you for reporting!"
-            local_sms_service.send_sms(response_msg, [reporter_phone])
-            return jsonify({'status': 'ok', 'action': 'blacklisted'}), 200
-
-        if detected_urls:
-            for url in detected_urls:
-                if BlacklistService.is_entity_blacklisted(url=url):
-                    response_msg = "⚠️ This link is already blacklisted. Thank you for reporting!"
-                    local_sms_service.send_sms(response_msg, [reporter_phone])
-                    return jsonify({'status': 'ok', 'action': 'blacklisted'}), 200
-
-        # Analyze with Gemini
-        logger.info(f"Analyzing message from {reporter_phone}")
-        analysis = local_gemini_analyzer.analyze_message(
-            message_text=message_text,
-            sender=original_sender,
-            urls=detected_urls,
-            phones=detected_phones
-        )
+def process_sms_report(app, reporter_phone: str, message_text: str) -> None:
+    """
+    Analyze a validated SMS report and reply to the reporter.
 
-        score = analysis.get('score', 5)
-        summary = analysis.get('summary', 'Message analyzed')
-        lesson = analysis.get('lesson', 'Stay safe!')
-        is_campaign = analysis.get('is_campaign', False)
-
-        # Save to database
-        scam_log = DatabaseService.save_scam_log(
-            reporter_phone=reporter_phone,
-            message_text=message_text,
-            score=score,
-            original_sender=original_sender,
-            analysis_json=analysis,
-            detected_urls=detected_urls,
-            is_campaign=is_campaign
-        )
+    Runs on the app's background executor, outside the request.
 
-        # Check and add to blacklist if threshold met
-        phone_blacklisted, url_blacklisted = BlacklistService.check_and_add_to_blacklist(
-            score=score,
-            phone_number=original_sender,
-            url=detected_urls[0] if detected_urls else None
-        )
+    Args:
+        app: Flask application (a fresh app context is pushed)
+        reporter_phone: Phone number of the reporter
+        message_text: Reported message text (validated, not yet sanitized)
+    """
+    with app.app_context():
+        try:
+            (
+                local_sms_service,
+                local_gemini_analyzer,
+                local_alert_service
+            ) = init_services()
+
+            # Repeat reports of a known scam message skip parsing and analysis
+            message_hash = BlacklistService.message_fingerprint(message_text)
+            if BlacklistService.is_message_blacklisted(message_hash):
+                response_msg = "⚠️ This message is already blacklisted. Thank you for reporting!"
+                local_sms_service.send_sms(response_msg, [reporter_phone])
+                return
+
+            # Sanitize input
+            message_text = sanitize_text(message_text)
+
+            # Extract URLs and phone numbers
+            normalized_reporter_phone = normalize_phone_number(reporter_phone)
+            detected_urls, detected_phones = extract_urls_and_phones(
+                message_text, exclude=normalized_reporter_phone
+            )
+
+            # First number in the message other than the reporter's is the sender
+            original_sender = detected_phones[0] if detected_phones else None
+
+            if not original_sender:
+                response_msg = (
+                    "⚠️ Please include the sender phone number in the SMS you report "
+                    "(e.g., 'From: +2547XXXXXXXX ...' or 'From: 07XXXXXXXX' or 'From: 2547XXXXXXXX') "
+                    "so we can trace and blacklist the scammer."
+                )
+                local_sms_service.send_sms(response_msg, [reporter_phone])
+                return
+
+            # Sender and all URLs are checked in a single query
+            blacklisted = BlacklistService.find_blacklisted_entities(
+                phone_number=original_sender,
+                urls=detected_urls,
+                message_text=message_text
+            )
 
-        # Format and send response
-        response_msg = format_analysis_response(score, summary, lesson)
-        local_sms_service.send_sms(response_msg, [reporter_phone])
+            if ('phone', original_sender) in blacklisted:
+                response_msg = "⚠️ This sender is already blacklisted. Thank you for reporting!"
+                local_sms_service.send_sms(response_msg, [reporter_phone])
+                return
+
+            if blacklisted:
+                response_msg = "⚠️ This link is already blacklisted. Thank you for reporting!"
+                local_sms_service.send_sms(response_msg, [reporter_phone])
+                return
+
+            # Analyze with Gemini
+            logger.info("Analyzing message from %s", reporter_phone)
+            analysis = local_gemini_analyzer.analyze_message(
+                message_text=message_text,
+                sender=original_sender,
+                urls=detected_urls,
+                phones=detected_phones
+            )
 
-        # Post to social media if high danger
-        if score >= 8 and current_app.config.get('ENABLE_SOCIAL_MEDIA', False):
-            local_social_media_service.post_campaign_alert(
-                scam_text=message_text,
-                lesson=lesson,
-                score=score
+            score = analysis.get('score', 5)
+            summary = analysis.get('summary', 'Message analyzed')
+            lesson = analysis.get('lesson', 'Stay safe!')
+            is_campaign = analysis.get('is_campaign', False)
+
+            # Save the log and any blacklist entries in one transaction
+            DatabaseService.save_scam_log(
+                reporter_phone=reporter_phone,
+                message_text=message_text,
+                score=score,
+                original_sender=original_sender,
+                analysis_json=analysis,
+                detected_urls=detected_urls,
+                is_campaign=is_campaign,
+                commit=False
             )
 
-        logger.info(f"SMS processed: Score={score}, Campaign={is_campaign}, Blacklisted={phone_blacklisted or url_blacklisted}")
+            # Check and add to blacklist if threshold met
+            phone_blacklisted, url_blacklisted = BlacklistService.check_and_add_to_blacklist(
+                score=score,
+                phone_number=original_sender,
+                url=detected_urls[0] if detected_urls else None,
+                message_hash=message_hash,
+                commit=False
+            )
+            DatabaseService.commit()
 
-        return jsonify({
-            'status': 'ok',
-            'score': score,
-            'is_campaign': is_campaign,
-            'blacklisted': phone_blacklisted or url_blacklisted
-        }), 200
+            # Format and send response
+            response_msg = format_analysis_response(score, summary, lesson)
+            local_sms_service.send_sms(response_msg, [reporter_phone])
 
-    except Exception as e:
-        logger.error(f"Error handling SMS webhook: {e}", exc_info=True)
-        return jsonify({'error': 'Internal server error'}), 500
+            # Post to social media if high danger (no-op when disabled)
+            if score >= 8:
+                current_app.extensions['social_post'](
+                    scam_text=message_text,
+                    lesson=lesson,
+                    score=score
+                )
+
+            logger.info(
+                "SMS processed: Score=%s, Campaign=%s, Blacklisted=%s",
+                score, is_campaign, phone_blacklisted or url_blacklisted
+            )
 
+        except Exception as e:
+            logger.error("Error processing SMS report: %s", e, exc_info=True)
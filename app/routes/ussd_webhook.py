@@ -36,7 +36,7 @@ def handle_ussd_webhook():
         init_service()
 
         # Parse webhook data
-        webhook_data = ussd_service.parse_webhook_data(request.form)
+        webhook_data = ussd_service.parse_webhook_data(request.form.to_dict(flat=True))
         phone_number = webhook_data.get('phone_number', '')
         session_id = webhook_data.get('session_id', '')
         text = webhook_data.get('text', '')
@@ -44,7 +44,7 @@ def handle_ussd_webhook():
         # Validate phone number
         phone_valid, phone_error = validate_phone_number(phone_number)
         if not phone_valid:
-            logger.warning(f"Invalid phone number: {phone_error}")
+            logger.warning("Invalid phone number: %s", phone_error)
             return ussd_service.create_ussd_response("Invalid phone number", end_session=True)
 
         # Handle menu navigation
@@ -78,7 +78,7 @@ def handle_ussd_webhook():
             return ussd_service.create_ussd_response(message, end_session=True)
 
     except Exception as e:
-        logger.error(f"Error handling USSD webhook: {e}", exc_info=True)
+        logger.error("Error handling USSD webhook: %s", e, exc_info=True)
         return ussd_service.create_ussd_response(
             "An error occurred. Please try again later.",
             end_session=True
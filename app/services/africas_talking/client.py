@@ -0,0 +1,54 @@
+"""
+Shared Africa's Talking SDK client.
+"""
+import threading
+import africastalking
+from flask import current_app
+import logging
+
+logger = logging.getLogger(__name__)
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _ensure_initialized() -> None:
+    """Initialize the Africa's Talking SDK once per process."""
+    global _initialized
+    if _initialized:
+        return
+
+    with _init_lock:
+        if _initialized:
+            return
+
+        username = current_app.config.get('AT_USERNAME', 'sandbox')
+        api_key = current_app.config.get('AT_API_KEY', '')
+
+        if not api_key:
+            logger.warning("AT_API_KEY not configured")
+
+        africastalking.initialize(username, api_key)
+        _initialized = True
+
+
+def get_sms():
+    """
+    Get the shared Africa's Talking SMS service.
+
+    Returns:
+        africastalking.SMS service handle
+    """
+    _ensure_initialized()
+    return africastalking.SMS
+
+
+def get_ussd():
+    """
+    Get the shared Africa's Talking USSD service.
+
+    Returns:
+        africastalking.USSD service handle
+    """
+    _ensure_initialized()
+    return africastalking.USSD
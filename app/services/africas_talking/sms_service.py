@@ -1,11 +1,13 @@
 """
 Africa's Talking SMS Service.
 """
-import africastalking
+import asyncio
 from flask import current_app
 import logging
 from typing import List, Dict, Optional
 
+from app.services.africas_talking.client import get_sms
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,14 +16,7 @@ class SMSService:
 
     def __init__(self):
         """Initialize Africa's Talking SMS service."""
-        username = current_app.config.get('AT_USERNAME', 'sandbox')
-        api_key = current_app.config.get('AT_API_KEY', '')
-
-        if not api_key:
-            logger.warning("AT_API_KEY not configured")
-
-        africastalking.initialize(username, api_key)
-        self.sms = africastalking.SMS
+        self.sms = get_sms()
 
     def send_sms(self, message: str, recipients: List[str], sender_id: Optional[str] = None) -> Dict:
         """
@@ -46,10 +41,10 @@ class SMSService:
                 recipients=recipients,
                 sender_id=sender_id
             )
-            logger.info(f"SMS sent to {len(recipients)} recipients: {response}")
+            logger.info("SMS sent to %s recipients: %s", len(recipients), response)
             return response
         except Exception as e:
-            logger.error(f"Error sending SMS: {e}")
+            logger.error("Error sending SMS: %s", e)
             raise
 
     def send_bulk_sms(self, message: str, recipients: List[str], sender_id: Optional[str] = None) -> Dict:
@@ -68,12 +63,34 @@ class SMSService:
         # Africa's Talking handles batching, but we can optimize here
         return self.send_sms(message, recipients, sender_id)
 
+    async def send_bulk_sms_async(
+        self,
+        message: str,
+        recipients: List[str],
+        sender_id: Optional[str] = None
+    ) -> Dict:
+        """
+        Send bulk SMS from an event loop.
+
+        The Africa's Talking SDK is blocking, so the request runs in a worker
+        thread and several batches can be in flight at once.
+
+        Args:
+            message: Message text
+            recipients: List of phone numbers
+            sender_id: Optional sender ID
+
+        Returns:
+            Response from Africa's Talking API
+        """
+        return await asyncio.to_thread(self.send_bulk_sms, message, recipients, sender_id)
+
     def parse_webhook_data(self, request_data: Dict) -> Dict:
         """
         Parse incoming webhook data from Africa's Talking.
 
         Args:
-            request_data: Request form data or JSON
+            request_data: Request form data as a plain dict (request.form.to_dict())
 
         Returns:
             Parsed data dictionary
@@ -1,11 +1,11 @@
 """
 Africa's Talking USSD Service.
 """
-import africastalking
-from flask import current_app
 import logging
 from typing import Dict, Optional
 
+from app.services.africas_talking.client import get_ussd
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,21 +14,14 @@ class USSDService:
 
     def __init__(self):
         """Initialize Africa's Talking USSD service."""
-        username = current_app.config.get('AT_USERNAME', 'sandbox')
-        api_key = current_app.config.get('AT_API_KEY', '')
-
-        if not api_key:
-            logger.warning("AT_API_KEY not configured")
-
-        africastalking.initialize(username, api_key)
-        self.ussd = africastalking.USSD
+        self.ussd = get_ussd()
 
     def parse_webhook_data(self, request_data: Dict) -> Dict:
         """
         Parse incoming USSD webhook data from Africa's Talking.
 
         Args:
-            request_data: Request form data or JSON
+            request_data: Request form data as a plain dict (request.form.to_dict())
 
         Returns:
             Parsed data dictionary
@@ -1,22 +1,133 @@
 """
 Community blacklist management.
 """
-from typing import Optional
-from flask import current_app
+import hashlib
+import re
+import string
+import threading
+import time
+from functools import partial
+from typing import Optional, List, Set, Tuple
 from app.services.database.models import DatabaseService
+from app.utils.cache import TTLCache
+from app.utils.validators import normalize_url
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Try to import pyahocorasick (optional dependency)
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    ahocorasick = None
+    AHOCORASICK_AVAILABLE = False
+
+# Process-local cache of lookups keyed by (entity_type, entity_value).
+# Entries added by other workers become visible once the TTL expires.
+_BLACKLIST_CACHE_SIZE = 50_000
+_BLACKLIST_CACHE_TTL_SECONDS = 300
+_blacklist_cache = TTLCache(maxsize=_BLACKLIST_CACHE_SIZE, ttl=_BLACKLIST_CACHE_TTL_SECONDS)
+
+
+# Aho-Corasick automaton over all blacklisted URLs, rebuilt lazily once it
+# is older than the lookup cache TTL
+_url_automaton = None
+_url_automaton_built_at = None  # monotonic time; None until first built
+_url_automaton_lock = threading.Lock()
+
+# The automaton runs over ASCII-lowercased text to find candidates; unlike
+# str.lower() this keeps every character at its original index
+_ASCII_LOWER_TABLE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+# A hit must end where the URL does: at end of text, whitespace, a path,
+# query or fragment separator, a character URLs cannot contain, or trailing
+# punctuation (mirrors the URL pattern in app.utils.validators)
+_URL_END_RE = re.compile(r'[\s/?#<>"{}|\\^`\[\]]|[.,;:!]*(?:\s|$)')
+
+
+def _get_url_automaton():
+    """Return the URL automaton, (re)building it when stale. None if empty."""
+    global _url_automaton, _url_automaton_built_at
+    with _url_automaton_lock:
+        if (_url_automaton_built_at is None
+                or time.monotonic() - _url_automaton_built_at > _BLACKLIST_CACHE_TTL_SECONDS):
+            automaton = None
+            urls = DatabaseService.get_blacklist_values('url')
+            if urls:
+                # URLs differing only in path case share a lowercased key,
+                # so each key maps to every normalized URL behind it
+                candidates = {}
+                for url in map(normalize_url, urls):
+                    candidates.setdefault(url.translate(_ASCII_LOWER_TABLE), set()).add(url)
+                automaton = ahocorasick.Automaton()
+                for key, values in candidates.items():
+                    automaton.add_word(key, (len(key), frozenset(values)))
+                automaton.make_automaton()
+            _url_automaton = automaton
+            _url_automaton_built_at = time.monotonic()
+        return _url_automaton
+
+
+def _cache_blacklisted(key: Tuple[str, str], commit: bool) -> None:
+    """Mark an entity blacklisted in the cache once its write is committed."""
+    if commit:
+        _blacklist_cache[key] = True
+    else:
+        DatabaseService.on_commit(partial(_blacklist_cache.__setitem__, key, True))
+
+
+def _is_blacklisted_cached(entity_type: str, entity_value: str) -> bool:
+    """Look up one entity, consulting the in-process cache first."""
+    key = (entity_type, entity_value)
+    cached = _blacklist_cache.get(key)
+    if cached is None:
+        cached = DatabaseService.is_blacklisted(entity_type, entity_value)
+        _blacklist_cache[key] = cached
+    return cached
+
 
 class BlacklistService:
     """Service for blacklist management."""
 
+    # Score thresholds, resolved from app config by reload_config()
+    phone_threshold = 8
+    url_threshold = 9
+
+    @classmethod
+    def reload_config(cls, config) -> None:
+        """
+        Resolve auto-blacklist thresholds from app config.
+
+        Args:
+            config: Flask app config
+        """
+        cls.phone_threshold = config.get('BLACKLIST_SCORE_THRESHOLD', 8)
+        cls.url_threshold = config.get('URL_BLACKLIST_SCORE_THRESHOLD', 9)
+
+    @staticmethod
+    def message_fingerprint(message_text: str) -> str:
+        """
+        Compute a content fingerprint for a reported message.
+
+        Whitespace and case are normalized so re-sent copies of the same
+        campaign SMS map to the same fingerprint.
+
+        Args:
+            message_text: Raw message text
+
+        Returns:
+            32-character hex digest
+        """
+        normalized = ' '.join(message_text.split()).lower()
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
     @staticmethod
     def check_and_add_to_blacklist(
         score: int,
         phone_number: Optional[str] = None,
-        url: Optional[str] = None
+        url: Optional[str] = None,
+        message_hash: Optional[str] = None,
+        commit: bool = True
     ) -> tuple:
         """
         Check score thresholds and add to blacklist if needed.
@@ -25,41 +136,68 @@ class BlacklistService:
             score: Danger score from analysis
             phone_number: Phone number to potentially blacklist
             url: URL to potentially blacklist
+            message_hash: Message fingerprint to potentially blacklist
+            commit: Commit each entry; pass False to leave the writes in the
+                caller's transaction. Cached state is then only updated once
+                that transaction commits.
 
         Returns:
             Tuple of (phone_blacklisted, url_blacklisted)
         """
         phone_blacklisted = False
         url_blacklisted = False
+        if url:
+            url = normalize_url(url)
 
         # Check phone blacklist threshold
-        if phone_number and score >= current_app.config.get('BLACKLIST_SCORE_THRESHOLD', 8):
+        if phone_number and score >= BlacklistService.phone_threshold:
             try:
                 DatabaseService.add_to_blacklist(
                     entity_type='phone',
                     entity_value=phone_number,
                     auto_blocked=True,
-                    reason=f'Auto-blocked due to high danger score: {score}/10'
+                    reason=f'Auto-blocked due to high danger score: {score}/10',
+                    commit=commit
                 )
+                _cache_blacklisted(('phone', phone_number), commit)
                 phone_blacklisted = True
                 logger.info(f"Auto-blacklisted phone: {phone_number} (score: {score})")
             except Exception as e:
                 logger.error(f"Error blacklisting phone {phone_number}: {e}")
 
         # Check URL blacklist threshold
-        if url and score >= current_app.config.get('URL_BLACKLIST_SCORE_THRESHOLD', 9):
+        if url and score >= BlacklistService.url_threshold:
             try:
                 DatabaseService.add_to_blacklist(
                     entity_type='url',
                     entity_value=url,
                     auto_blocked=True,
-                    reason=f'Auto-blocked due to high danger score: {score}/10'
+                    reason=f'Auto-blocked due to high danger score: {score}/10',
+                    commit=commit
                 )
+                # Exact lookups see the URL via the cache right away; the scan
+                # automaton picks it up on its next periodic rebuild, so
+                # auto-blacklisting never rebuilds it under the lock
+                _cache_blacklisted(('url', url), commit)
                 url_blacklisted = True
                 logger.info(f"Auto-blacklisted URL: {url} (score: {score})")
             except Exception as e:
                 logger.error(f"Error blacklisting URL {url}: {e}")
 
+        # Remember the message itself so repeat reports skip analysis
+        if message_hash and score >= BlacklistService.phone_threshold:
+            try:
+                DatabaseService.add_to_blacklist(
+                    entity_type='message',
+                    entity_value=message_hash,
+                    auto_blocked=True,
+                    reason=f'Auto-blocked due to high danger score: {score}/10',
+                    commit=commit
+                )
+                _cache_blacklisted(('message', message_hash), commit)
+            except Exception as e:
+                logger.error(f"Error blacklisting message {message_hash}: {e}")
+
         return phone_blacklisted, url_blacklisted
 
     @staticmethod
@@ -67,6 +205,8 @@ class BlacklistService:
         """
         Check if phone or URL is blacklisted.
 
+        The URL is matched exactly, after normalizing scheme and host.
+
         Args:
             phone_number: Phone number to check
             url: URL to check
@@ -74,9 +214,102 @@ class BlacklistService:
         Returns:
             True if any entity is blacklisted
         """
-        if phone_number and DatabaseService.is_blacklisted('phone', phone_number):
-            return True
-        if url and DatabaseService.is_blacklisted('url', url):
-            return True
-        return False
+        return bool(BlacklistService.find_blacklisted_entities(
+            phone_number=phone_number,
+            urls=[url] if url else None
+        ))
+
+    @staticmethod
+    def is_message_blacklisted(message_hash: str) -> bool:
+        """
+        Check if a message fingerprint is blacklisted.
+
+        Args:
+            message_hash: Fingerprint from message_fingerprint()
+
+        Returns:
+            True if the message was previously blacklisted
+        """
+        return _is_blacklisted_cached('message', message_hash)
+
+    @staticmethod
+    def scan_text_for_blacklisted_urls(message_text: str) -> Set[Tuple[str, str]]:
+        """
+        Find every blacklisted URL contained anywhere in a message.
+
+        Single pass over the text regardless of blacklist size. Scheme and
+        host match case-insensitively, the rest exactly, and a hit must end
+        at a URL boundary: a blacklisted URL is found when followed by an
+        extra path segment, query string or fragment, but not as the prefix
+        of a longer path (http://bit.ly/abc does not match http://bit.ly/abcdef).
+
+        Args:
+            message_text: Message text to scan
+
+        Returns:
+            Set of ('url', entity_value) pairs found in the text
+        """
+        automaton = _get_url_automaton()
+        if automaton is None:
+            return set()
+
+        found = set()
+        for end, (length, urls) in automaton.iter(message_text.translate(_ASCII_LOWER_TABLE)):
+            if not _URL_END_RE.match(message_text, end + 1):
+                continue
+            url = normalize_url(message_text[end + 1 - length:end + 1])
+            if url in urls:
+                found.add(('url', url))
+        return found
+
+    @staticmethod
+    def find_blacklisted_entities(
+        phone_number: Optional[str] = None,
+        urls: Optional[List[str]] = None,
+        message_text: Optional[str] = None
+    ) -> Set[Tuple[str, str]]:
+        """
+        Check a sender phone and any number of URLs in one round trip.
+
+        URLs are looked up exactly (after normalizing scheme and host). When
+        pyahocorasick is installed and message_text is given, the text is
+        also scanned for blacklisted URLs it contains with extra path or
+        query; see scan_text_for_blacklisted_urls().
+
+        Args:
+            phone_number: Phone number to check
+            urls: URLs to check
+            message_text: Full message text for multi-pattern URL scanning
+
+        Returns:
+            Set of blacklisted (entity_type, entity_value) pairs
+        """
+        keys = []
+        if phone_number:
+            keys.append(('phone', phone_number))
+        keys.extend(('url', normalize_url(url)) for url in urls or ())
+
+        url_hits = set()
+        if AHOCORASICK_AVAILABLE and message_text:
+            url_hits = BlacklistService.scan_text_for_blacklisted_urls(message_text)
+
+        # Serve what we can from the cache, query the rest in one round trip
+        blacklisted = set()
+        missing = []
+        for key in keys:
+            cached = _blacklist_cache.get(key)
+            if cached is None:
+                missing.append(key)
+            elif cached:
+                blacklisted.add(key)
+
+        if missing:
+            found = DatabaseService.get_blacklisted_entities(
+                phone_numbers=[value for kind, value in missing if kind == 'phone'],
+                urls=[value for kind, value in missing if kind == 'url']
+            )
+            for key in missing:
+                _blacklist_cache[key] = key in found
+            blacklisted |= found
 
+        return blacklisted | url_hits
@@ -0,0 +1,125 @@
+"""
+In-process Bloom filter over the blacklist.
+
+Most lookups are for numbers and URLs that were never blacklisted. The filter
+answers those without a database round trip; only possible hits fall through
+to SQL.
+"""
+import hashlib
+import math
+import threading
+import time
+from app.models import Blacklist
+import logging
+
+logger = logging.getLogger(__name__)
+
+_EXPECTED_ITEMS = 1_000_000
+_FALSE_POSITIVE_RATE = 0.01
+_BUILD_BATCH_SIZE = 5000
+
+# Rebuilt on this interval so entries written by other workers become visible,
+# matching the TTL of the blacklist lookup cache
+_REBUILD_INTERVAL_SECONDS = 300
+
+
+class BloomFilter:
+    """Bloom filter keyed by (entity_type, entity_value) pairs."""
+
+    def __init__(self, expected_items: int = _EXPECTED_ITEMS, fp_rate: float = _FALSE_POSITIVE_RATE):
+        """
+        Initialize an empty filter.
+
+        Args:
+            expected_items: Number of entries the filter is sized for
+            fp_rate: Target false positive rate at expected_items
+        """
+        self.num_bits = max(8, math.ceil(-expected_items * math.log(fp_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / expected_items * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, entity_type: str, entity_value: str):
+        # Kirsch-Mitzenmacher: derive all k positions from two 64-bit hashes
+        digest = hashlib.blake2b(
+            f'{entity_type}:{entity_value}'.encode('utf-8'), digest_size=16
+        ).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, entity_type: str, entity_value: str) -> None:
+        """Add an entity to the filter."""
+        bits = self._bits
+        for pos in self._positions(entity_type, entity_value):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def test(self, entity_type: str, entity_value: str) -> bool:
+        """
+        Check whether an entity may be in the filter.
+
+        Returns:
+            False if the entity is definitely absent, True if it may be present
+        """
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(entity_type, entity_value))
+
+
+_bloom = None
+_bloom_built_at = 0.0
+_bloom_stale = True
+_bloom_lock = threading.RLock()
+
+
+def _build() -> BloomFilter:
+    bloom = BloomFilter()
+    rows = Blacklist.query.with_entities(
+        Blacklist.entity_type,
+        Blacklist.entity_value
+    ).yield_per(_BUILD_BATCH_SIZE)
+    count = 0
+    for row in rows:
+        bloom.add(row.entity_type, row.entity_value)
+        count += 1
+    logger.info("Built blacklist Bloom filter with %d entries", count)
+    return bloom
+
+
+def _get_filter() -> BloomFilter:
+    """Return the process-wide filter, (re)building it when stale."""
+    global _bloom, _bloom_built_at, _bloom_stale
+    with _bloom_lock:
+        age = time.monotonic() - _bloom_built_at
+        if _bloom_stale or age > _REBUILD_INTERVAL_SECONDS:
+            _bloom = _build()
+            _bloom_built_at = time.monotonic()
+            _bloom_stale = False
+        return _bloom
+
+
+def might_contain(entity_type: str, entity_value: str) -> bool:
+    """
+    Check whether an entity may be blacklisted.
+
+    Args:
+        entity_type: 'phone', 'url' or 'message'
+        entity_value: The entity to check
+
+    Returns:
+        False if the entity is definitely not blacklisted
+    """
+    return _get_filter().test(entity_type, entity_value)
+
+
+def add(entity_type: str, entity_value: str) -> None:
+    """Record a newly blacklisted entity in the current filter."""
+    with _bloom_lock:
+        if _bloom is not None:
+            _bloom.add(entity_type, entity_value)
+
+
+def invalidate() -> None:
+    """Force a rebuild on next use, e.g. after entries are removed."""
+    global _bloom_stale
+    with _bloom_lock:
+        _bloom_stale = True
@@ -2,18 +2,75 @@
 Database operations for SMS Phishing Firewall.
 """
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from functools import partial
+from typing import Callable, Optional, List, Dict, Iterator, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import defer
 from app import db
-from app.models import ScamLog, Blacklist, Subscriber, Campaign
-import json
+from app.models import ScamLog, Blacklist, Subscriber, Campaign, utcnow
+from app.services.database import bloom
 import logging
 
 logger = logging.getLogger(__name__)
 
+_BULK_INSERT_BATCH_SIZE = 1000
+
+# Session.info key holding callbacks deferred until the transaction commits
+_ON_COMMIT_KEY = 'on_commit_callbacks'
+
+
+def _dialect_insert():
+    """Return the INSERT construct supporting ON CONFLICT for the bound engine."""
+    return sqlite.insert if db.engine.dialect.name == 'sqlite' else postgresql.insert
+
+
+@event.listens_for(db.session, 'after_commit')
+def _run_on_commit_callbacks(session) -> None:
+    """Run deferred callbacks once the outermost transaction has committed."""
+    # Releasing a savepoint also fires after_commit; only the real commit counts
+    if session.in_nested_transaction():
+        return
+    for callback in session.info.pop(_ON_COMMIT_KEY, ()):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Error in on-commit callback: {e}")
+
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _discard_on_commit_callbacks(session, transaction) -> None:
+    """Drop callbacks left over when the outermost transaction rolls back."""
+    if transaction.parent is None:
+        session.info.pop(_ON_COMMIT_KEY, None)
+
 
 class DatabaseService:
     """Service for database operations."""
 
+    @staticmethod
+    def on_commit(callback: Callable[[], None]) -> None:
+        """
+        Run a callback after the current transaction commits.
+
+        Use for process-local state (caches, filters) that must not get ahead
+        of the database: the callback is dropped if the transaction rolls back.
+
+        Args:
+            callback: Function called with no arguments
+        """
+        db.session.info.setdefault(_ON_COMMIT_KEY, []).append(callback)
+
+    @staticmethod
+    def commit() -> None:
+        """Commit writes made with commit=False, rolling back on failure."""
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error committing transaction: {e}")
+            raise
+
     @staticmethod
     def save_scam_log(
         reporter_phone: str,
@@ -22,7 +79,8 @@ class DatabaseService:
         original_sender: Optional[str] = None,
         analysis_json: Optional[Dict] = None,
         detected_urls: Optional[List[str]] = None,
-        is_campaign: bool = False
+        is_campaign: bool = False,
+        commit: bool = True
     ) -> ScamLog:
         """
         Save a scam log entry.
@@ -35,6 +93,8 @@ class DatabaseService:
             analysis_json: Full analysis from Gemini
             detected_urls: List of detected URLs
             is_campaign: Whether this is part of a campaign
+            commit: Commit immediately; pass False to batch with other writes
+                and call DatabaseService.commit() once at the end
 
         Returns:
             Created ScamLog instance
@@ -45,12 +105,15 @@ class DatabaseService:
                 original_sender=original_sender,
                 message_text=message_text,
                 score=score,
-                analysis_json=json.dumps(analysis_json) if analysis_json else None,
-                detected_urls=json.dumps(detected_urls) if detected_urls else None,
+                analysis_json=analysis_json or None,
+                detected_urls=detected_urls or None,
                 is_campaign=is_campaign
             )
             db.session.add(scam_log)
-            db.session.commit()
+            if commit:
+                db.session.commit()
+            else:
+                db.session.flush()
             logger.info(f"Saved scam log: ID={scam_log.id}, Score={score}")
             return scam_log
         except Exception as e:
@@ -77,56 +140,170 @@ class DatabaseService:
             ScamLog.timestamp.desc()
         ).limit(limit).all()
 
+    @staticmethod
+    def get_recent_scam_log_fields(
+        hours: int = 24,
+        limit: int = 100,
+        fields: Tuple[str, ...] = ('score', 'message_text', 'original_sender', 'detected_urls')
+    ) -> List[Tuple]:
+        """
+        Get selected columns of recent scam logs, newest first.
+
+        Only the requested columns are selected and rows come back as
+        lightweight named tuples instead of ScamLog instances. The field
+        'text_len' selects the message length computed by the database, so
+        the text itself need not be transferred.
+
+        Args:
+            hours: Number of hours to look back
+            limit: Maximum number of logs to return
+            fields: ScamLog column names to select, or 'text_len'
+
+        Returns:
+            List of rows with one attribute per field
+        """
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        return db.session.query(
+            *[
+                db.func.length(ScamLog.message_text).label('text_len') if field == 'text_len'
+                else getattr(ScamLog, field)
+                for field in fields
+            ]
+        ).filter(
+            ScamLog.timestamp >= cutoff_time
+        ).order_by(
+            ScamLog.timestamp.desc()
+        ).limit(limit).all()
+
+    @staticmethod
+    def get_scam_log_texts(log_ids: List[int]) -> Dict[int, str]:
+        """
+        Get the message text of several scam logs in one query.
+
+        Args:
+            log_ids: ScamLog ids
+
+        Returns:
+            Dictionary mapping id to message text
+        """
+        if not log_ids:
+            return {}
+        rows = ScamLog.query.with_entities(ScamLog.id, ScamLog.message_text).filter(
+            ScamLog.id.in_(log_ids)
+        ).all()
+        return {row.id: row.message_text for row in rows}
+
+    @staticmethod
+    def count_recent_scam_logs(hours: int = 24) -> int:
+        """
+        Count recent scam logs without loading them.
+
+        Args:
+            hours: Number of hours to look back
+
+        Returns:
+            Number of logs in the window
+        """
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        return db.session.query(db.func.count(ScamLog.id)).filter(
+            ScamLog.timestamp >= cutoff_time
+        ).scalar()
+
+    @staticmethod
+    def get_recent_scam_logs_light(
+        cursor: Optional[Tuple[datetime, int]] = None,
+        limit: int = 100
+    ) -> Tuple[List[ScamLog], Optional[Tuple[datetime, int]]]:
+        """
+        Page through scam logs newest first, skipping the heavy columns.
+
+        Uses keyset pagination on (timestamp, id), so each page is an index
+        range scan regardless of how deep the caller has paged. The JSON
+        columns and message text are deferred and only loaded if accessed.
+
+        Args:
+            cursor: Cursor returned with the previous page, None for the first page
+            limit: Maximum number of logs to return
+
+        Returns:
+            Tuple of (logs, next_cursor); next_cursor is None on the last page
+        """
+        query = ScamLog.query.options(
+            defer(ScamLog.analysis_json),
+            defer(ScamLog.detected_urls),
+            defer(ScamLog.message_text)
+        )
+        if cursor is not None:
+            last_ts, last_id = cursor
+            query = query.filter(db.or_(
+                ScamLog.timestamp < last_ts,
+                db.and_(ScamLog.timestamp == last_ts, ScamLog.id < last_id)
+            ))
+        rows = query.order_by(
+            ScamLog.timestamp.desc(),
+            ScamLog.id.desc()
+        ).limit(limit).all()
+
+        next_cursor = (rows[-1].timestamp, rows[-1].id) if len(rows) == limit else None
+        return rows, next_cursor
+
     @staticmethod
     def add_to_blacklist(
         entity_type: str,
         entity_value: str,
         auto_blocked: bool = False,
-        reason: Optional[str] = None
+        reason: Optional[str] = None,
+        commit: bool = True
     ) -> Blacklist:
         """
         Add entity to blacklist or update existing entry.
 
+        Uses a single INSERT ... ON CONFLICT DO UPDATE, so concurrent reports
+        of the same entity cannot race between lookup and insert.
+
         Args:
-            entity_type: 'phone' or 'url'
+            entity_type: 'phone', 'url' or 'message'
             entity_value: The entity to blacklist
             auto_blocked: Whether automatically blocked
             reason: Reason for blacklisting
+            commit: Commit immediately; pass False to batch with other writes
+                and call DatabaseService.commit() once at the end
 
         Returns:
             Blacklist instance
         """
+        stmt = _dialect_insert()(Blacklist).values(
+            entity_type=entity_type,
+            entity_value=entity_value,
+            hit_count=1,
+            auto_blocked=auto_blocked,
+            reason=reason
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Blacklist.entity_value],
+            set_={
+                'hit_count': Blacklist.hit_count + 1,
+                'last_seen': utcnow(),
+                'auto_blocked': db.or_(Blacklist.auto_blocked, stmt.excluded.auto_blocked),
+                'reason': db.func.coalesce(stmt.excluded.reason, Blacklist.reason),
+            }
+        ).returning(Blacklist).execution_options(populate_existing=True)
+
         try:
-            # Check if already exists
-            existing = Blacklist.query.filter_by(
-                entity_type=entity_type,
-                entity_value=entity_value
-            ).first()
-
-            if existing:
-                existing.hit_count += 1
-                existing.last_seen = datetime.utcnow()
-                if auto_blocked:
-                    existing.auto_blocked = True
-                if reason:
-                    existing.reason = reason
+            if commit:
+                entry = db.session.scalars(stmt).one()
                 db.session.commit()
-                logger.info(f"Updated blacklist entry: {entity_type}={entity_value}")
-                return existing
+                bloom.add(entity_type, entity_value)
             else:
-                blacklist_entry = Blacklist(
-                    entity_type=entity_type,
-                    entity_value=entity_value,
-                    hit_count=1,
-                    auto_blocked=auto_blocked,
-                    reason=reason
-                )
-                db.session.add(blacklist_entry)
-                db.session.commit()
-                logger.info(f"Added to blacklist: {entity_type}={entity_value}")
-                return blacklist_entry
+                # Savepoint so a failed upsert does not abort the caller's batch
+                with db.session.begin_nested():
+                    entry = db.session.scalars(stmt).one()
+                DatabaseService.on_commit(partial(bloom.add, entity_type, entity_value))
+            logger.info(f"Upserted blacklist entry: {entity_type}={entity_value}")
+            return entry
         except Exception as e:
-            db.session.rollback()
+            if commit:
+                db.session.rollback()
             logger.error(f"Error adding to blacklist: {e}")
             raise
 
@@ -142,11 +319,67 @@ class DatabaseService:
         Returns:
             True if blacklisted
         """
+        if not bloom.might_contain(entity_type, entity_value):
+            return False
         return Blacklist.query.filter_by(
             entity_type=entity_type,
             entity_value=entity_value
         ).first() is not None
 
+    @staticmethod
+    def get_blacklist_values(entity_type: str) -> List[str]:
+        """
+        Get all blacklisted values of one entity type.
+
+        Args:
+            entity_type: 'phone', 'url' or 'message'
+
+        Returns:
+            List of entity values
+        """
+        rows = Blacklist.query.with_entities(Blacklist.entity_value).filter_by(
+            entity_type=entity_type
+        ).all()
+        return [row.entity_value for row in rows]
+
+    @staticmethod
+    def get_blacklisted_entities(
+        phone_numbers: Optional[List[str]] = None,
+        urls: Optional[List[str]] = None
+    ) -> Set[Tuple[str, str]]:
+        """
+        Look up several phones and URLs in a single query.
+
+        Args:
+            phone_numbers: Phone numbers to check
+            urls: URLs to check
+
+        Returns:
+            Set of (entity_type, entity_value) pairs that are blacklisted
+        """
+        phone_numbers = [p for p in phone_numbers or () if bloom.might_contain('phone', p)]
+        urls = [u for u in urls or () if bloom.might_contain('url', u)]
+
+        conditions = []
+        if phone_numbers:
+            conditions.append(db.and_(
+                Blacklist.entity_type == 'phone',
+                Blacklist.entity_value.in_(phone_numbers)
+            ))
+        if urls:
+            conditions.append(db.and_(
+                Blacklist.entity_type == 'url',
+                Blacklist.entity_value.in_(urls)
+            ))
+        if not conditions:
+            return set()
+
+        rows = Blacklist.query.with_entities(
+            Blacklist.entity_type,
+            Blacklist.entity_value
+        ).filter(db.or_(*conditions)).all()
+        return {(row.entity_type, row.entity_value) for row in rows}
+
     @staticmethod
     def get_subscribers(region: Optional[str] = None, active_only: bool = True) -> List[Subscriber]:
         """
@@ -166,6 +399,34 @@ class DatabaseService:
             query = query.filter_by(region=region)
         return query.all()
 
+    @staticmethod
+    def iter_subscriber_phones(
+        region: Optional[str] = None,
+        active_only: bool = True,
+        chunk_size: int = 1000
+    ) -> Iterator[str]:
+        """
+        Stream subscriber phone numbers for bulk alerts.
+
+        Only the phone column is selected and rows are fetched chunk_size at
+        a time, so the full subscriber list is never held in memory.
+
+        Args:
+            region: Filter by region (optional)
+            active_only: Only return active subscribers
+            chunk_size: Rows fetched per round trip
+
+        Yields:
+            Phone numbers
+        """
+        query = Subscriber.query.with_entities(Subscriber.phone_number)
+        if active_only:
+            query = query.filter_by(is_active=True)
+        if region:
+            query = query.filter_by(region=region)
+        for row in query.yield_per(chunk_size):
+            yield row.phone_number
+
     @staticmethod
     def create_or_update_subscriber(
         phone_number: str,
@@ -173,7 +434,9 @@ class DatabaseService:
         alert_preferences: Optional[Dict] = None
     ) -> Subscriber:
         """
-        Create or update a subscriber.
+        Create or update a subscriber in a single upsert.
+
+        Region and preferences are kept from the existing row when not given.
 
         Args:
             phone_number: Subscriber phone number
@@ -183,31 +446,72 @@ class DatabaseService:
         Returns:
             Subscriber instance
         """
+        stmt = _dialect_insert()(Subscriber).values(
+            phone_number=phone_number,
+            region=region,
+            alert_preferences=alert_preferences or None,
+            is_active=True
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Subscriber.phone_number],
+            set_={
+                'region': db.func.coalesce(stmt.excluded.region, Subscriber.region),
+                'alert_preferences': db.func.coalesce(
+                    stmt.excluded.alert_preferences, Subscriber.alert_preferences
+                ),
+                'is_active': True,
+            }
+        ).returning(Subscriber).execution_options(populate_existing=True)
+
         try:
-            subscriber = Subscriber.query.filter_by(phone_number=phone_number).first()
-
-            if subscriber:
-                if region:
-                    subscriber.region = region
-                if alert_preferences:
-                    subscriber.alert_preferences = json.dumps(alert_preferences)
-                subscriber.is_active = True
-                db.session.commit()
-                return subscriber
-            else:
-                subscriber = Subscriber(
-                    phone_number=phone_number,
-                    region=region,
-                    alert_preferences=json.dumps(alert_preferences) if alert_preferences else None
-                )
-                db.session.add(subscriber)
-                db.session.commit()
-                return subscriber
+            subscriber = db.session.scalars(stmt).one()
+            db.session.commit()
+            return subscriber
         except Exception as e:
             db.session.rollback()
             logger.error(f"Error creating/updating subscriber: {e}")
             raise
 
+    @staticmethod
+    def bulk_create_subscribers(rows: List[Dict]) -> int:
+        """
+        Insert many subscribers, skipping phone numbers that already exist.
+
+        Rows are sent as multi-row INSERT ... ON CONFLICT DO NOTHING statements
+        of up to 1000 rows each, all in one transaction.
+
+        Args:
+            rows: Dicts with 'phone_number' and optional 'region' and
+                'alert_preferences'
+
+        Returns:
+            Number of subscribers inserted
+        """
+        insert = _dialect_insert()
+        inserted = 0
+        try:
+            for start in range(0, len(rows), _BULK_INSERT_BATCH_SIZE):
+                batch = [
+                    {
+                        'phone_number': row['phone_number'],
+                        'region': row.get('region'),
+                        'alert_preferences': row.get('alert_preferences') or None,
+                        'is_active': True,
+                    }
+                    for row in rows[start:start + _BULK_INSERT_BATCH_SIZE]
+                ]
+                stmt = insert(Subscriber).values(batch).on_conflict_do_nothing(
+                    index_elements=[Subscriber.phone_number]
+                )
+                inserted += db.session.execute(stmt).rowcount
+            db.session.commit()
+            logger.info(f"Bulk inserted {inserted} of {len(rows)} subscribers")
+            return inserted
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error bulk inserting subscribers: {e}")
+            raise
+
     @staticmethod
     def create_campaign(
         campaign_name: str,
@@ -231,8 +535,8 @@ class DatabaseService:
             campaign = Campaign(
                 campaign_name=campaign_name,
                 pattern_description=pattern_description,
-                related_urls=json.dumps(related_urls) if related_urls else None,
-                related_phones=json.dumps(related_phones) if related_phones else None,
+                related_urls=related_urls or None,
+                related_phones=related_phones or None,
                 affected_count=1
             )
             db.session.add(campaign)
@@ -263,7 +567,7 @@ class DatabaseService:
 
             if affected_count is not None:
                 campaign.affected_count = affected_count
-            campaign.last_detected = datetime.utcnow()
+            campaign.last_detected = utcnow()
             db.session.commit()
             return campaign
         except Exception as e:
@@ -8,15 +8,92 @@ Provides comprehensive evaluation metrics for phishing detection AI:
 - Statistical analysis
 """
 
-import json
+import heapq
 import logging
+from array import array
 from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from collections import defaultdict
 import math
+from app.utils import serialization
 
 logger = logging.getLogger(__name__)
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+def _positive_rank_sum(scores: array, labels: array) -> float:
+    """
+    Sum of the 1-based ranks of positive samples, ties sharing their average rank.
+
+    Args:
+        scores: Predicted scores, array('d')
+        labels: 1 for positive samples, array('b')
+
+    Returns:
+        Rank sum over positive samples
+    """
+    if NUMPY_AVAILABLE:
+        # Zero-copy views over the stored columns
+        scores_arr = np.frombuffer(scores, dtype=np.float64)
+        labels_arr = np.frombuffer(labels, dtype=np.int8).view(np.bool_)
+        _, inverse, counts = np.unique(scores_arr, return_inverse=True, return_counts=True)
+        # Average rank of each distinct score: last rank of the run minus half its width
+        ends = np.cumsum(counts)
+        avg_ranks = ends - (counts - 1) / 2.0
+        return float(avg_ranks[inverse][labels_arr].sum())
+
+    order = sorted(range(len(scores)), key=scores.__getitem__)
+    rank_sum = 0.0
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and scores[order[j + 1]] == scores[order[i]]:
+            j += 1
+        avg_rank = (i + j) / 2.0 + 1
+        rank_sum += avg_rank * sum(1 for k in order[i:j + 1] if labels[k])
+        i = j + 1
+    return rank_sum
+
+
+def _category_outcomes(
+    scores: array,
+    labels: array,
+    codes: array,
+    threshold: float,
+    num_categories: int
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Count classification outcomes per category at a threshold.
+
+    Args:
+        scores: Predicted scores, array('d')
+        labels: 1 for positive samples, array('b')
+        codes: Category code of each sample, array('H')
+        threshold: Scores >= threshold are predicted positive
+        num_categories: Number of distinct category codes
+
+    Returns:
+        (tp, tn, fp, fn) for each category code
+    """
+    if NUMPY_AVAILABLE and len(scores):
+        scores_arr = np.frombuffer(scores, dtype=np.float64)
+        labels_arr = np.frombuffer(labels, dtype=np.int8).view(np.bool_)
+        codes_arr = np.frombuffer(codes, dtype=np.uint16)
+        # Outcome index 2*actual + predicted: 0=TN, 1=FP, 2=FN, 3=TP
+        outcome = 2 * labels_arr.astype(np.intp) + (scores_arr >= threshold)
+        counts = np.bincount(4 * codes_arr.astype(np.intp) + outcome, minlength=4 * num_categories)
+        return [(tp, tn, fp, fn) for tn, fp, fn, tp in counts.reshape(-1, 4).tolist()]
+
+    counts = [[0, 0, 0, 0] for _ in range(num_categories)]
+    for score, label, code in zip(scores, labels, codes):
+        counts[code][2 * bool(label) + (score >= threshold)] += 1
+    return [(tp, tn, fp, fn) for tn, fp, fn, tp in counts]
+
 
 @dataclass
 class ConfusionMatrix:
@@ -28,7 +105,12 @@ class ConfusionMatrix:
 
     def to_dict(self) -> Dict:
         """Convert to dictionary."""
-        return asdict(self)
+        return {
+            "true_positives": self.true_positives,
+            "true_negatives": self.true_negatives,
+            "false_positives": self.false_positives,
+            "false_negatives": self.false_negatives,
+        }
 
     def __str__(self) -> str:
         """Pretty print confusion matrix."""
@@ -58,7 +140,18 @@ class ClassificationMetrics:
 
     def to_dict(self) -> Dict:
         """Convert to dictionary."""
-        return asdict(self)
+        return {
+            "name": self.name,
+            "count": self.count,
+            "accuracy": self.accuracy,
+            "precision": self.precision,
+            "recall": self.recall,
+            "f1_score": self.f1_score,
+            "tp": self.tp,
+            "fp": self.fp,
+            "fn": self.fn,
+            "tn": self.tn,
+        }
 
 
 class EvaluationMetrics:
@@ -81,15 +174,70 @@ class EvaluationMetrics:
             threshold: Score threshold for positive classification (0-1)
                       Scores >= threshold are classified as phishing
         """
-        self.threshold = threshold
+        self._threshold = threshold
         self.confusion_matrix = ConfusionMatrix()
-        self.all_scores: List[float] = []
-        self.all_labels: List[bool] = []
-        self.all_categories: List[str] = []
-        self.predictions: List[Dict] = []
+        # Column-per-field storage: typed arrays for the numeric columns
+        # (8 bytes per score, 1 per label) instead of a dict per prediction
+        self.all_scores = array('d')
+        self.all_labels = array('b')
+        self._category_codes = array('H')
+        self._category_names: List[str] = []
+        self._category_index: Dict[str, int] = {}
+        self._message_ids: List[Optional[str]] = []
+        self._message_texts: List[Optional[str]] = []
         self.category_metrics: Dict[str, ClassificationMetrics] = defaultdict(
             lambda: ClassificationMetrics(name="")
         )
+        # Running counts so summaries never rescan the predictions
+        self._phishing_count = 0
+        self._legitimate_count = 0
+        self._category_counts: Dict[str, ConfusionMatrix] = defaultdict(ConfusionMatrix)
+        # Categories whose ClassificationMetrics are out of date
+        self._dirty_categories = set()
+        # get_summary result, valid while _summary_key matches
+        self._summary_cache: Optional[Dict] = None
+        self._summary_key = None
+
+    @property
+    def threshold(self) -> float:
+        """Score threshold for positive classification."""
+        return self._threshold
+
+    @threshold.setter
+    def threshold(self, value: float) -> None:
+        """Change the threshold and reclassify all stored predictions."""
+        self._threshold = value
+        self.confusion_matrix = ConfusionMatrix()
+        self._category_counts.clear()
+        outcomes = _category_outcomes(
+            self.all_scores, self.all_labels, self._category_codes, value, len(self._category_names)
+        )
+        overall = self.confusion_matrix
+        for name, (tp, tn, fp, fn) in zip(self._category_names, outcomes):
+            self._category_counts[name] = ConfusionMatrix(tp, tn, fp, fn)
+            self._dirty_categories.add(name)
+            overall.true_positives += tp
+            overall.true_negatives += tn
+            overall.false_positives += fp
+            overall.false_negatives += fn
+        self._summary_key = None
+
+    def _count(self, actual_label: bool, predicted_label: bool, category: str) -> None:
+        """Add one outcome to the overall and per-category confusion matrices."""
+        category_cm = self._category_counts[category]
+        self._dirty_categories.add(category)
+        if actual_label and predicted_label:
+            self.confusion_matrix.true_positives += 1
+            category_cm.true_positives += 1
+        elif not actual_label and not predicted_label:
+            self.confusion_matrix.true_negatives += 1
+            category_cm.true_negatives += 1
+        elif not actual_label and predicted_label:
+            self.confusion_matrix.false_positives += 1
+            category_cm.false_positives += 1
+        else:  # actual_label and not predicted_label
+            self.confusion_matrix.false_negatives += 1
+            category_cm.false_negatives += 1
 
     def add_prediction(
         self,
@@ -109,33 +257,51 @@ class EvaluationMetrics:
             message_text: Optional message text for analysis
             category: Category of message (credential_theft, financial, social_eng, etc.)
         """
-        predicted_label = predicted_score >= self.threshold
+        self._count(actual_label, predicted_score >= self._threshold, category)
+        self._summary_key = None
 
-        # Update confusion matrix
-        if actual_label and predicted_label:
-            self.confusion_matrix.true_positives += 1
-        elif not actual_label and not predicted_label:
-            self.confusion_matrix.true_negatives += 1
-        elif not actual_label and predicted_label:
-            self.confusion_matrix.false_positives += 1
-        else:  # actual_label and not predicted_label
-            self.confusion_matrix.false_negatives += 1
+        if actual_label:
+            self._phishing_count += 1
+        else:
+            self._legitimate_count += 1
+
+        code = self._category_index.get(category)
+        if code is None:
+            code = self._category_index[category] = len(self._category_names)
+            self._category_names.append(category)
 
         # Track all scores and labels for ROC-AUC
         self.all_scores.append(predicted_score)
         self.all_labels.append(actual_label)
-        self.all_categories.append(category)
-
-        # Store prediction
-        self.predictions.append({
-            "message_id": message_id,
-            "message_text": message_text,
+        self._category_codes.append(code)
+        self._message_ids.append(message_id)
+        self._message_texts.append(message_text)
+
+    @property
+    def all_categories(self) -> List[str]:
+        """Category of each prediction, in insertion order."""
+        names = self._category_names
+        return [names[code] for code in self._category_codes]
+
+    def _prediction_record(self, index: int) -> Dict:
+        """Build the dict view of one stored prediction."""
+        actual_label = bool(self.all_labels[index])
+        predicted_score = self.all_scores[index]
+        predicted_label = predicted_score >= self.threshold
+        return {
+            "message_id": self._message_ids[index],
+            "message_text": self._message_texts[index],
             "actual_label": actual_label,
             "predicted_score": predicted_score,
             "predicted_label": predicted_label,
             "correct": actual_label == predicted_label,
-            "category": category
-        })
+            "category": self._category_names[self._category_codes[index]]
+        }
+
+    @property
+    def predictions(self) -> List[Dict]:
+        """All predictions as dicts, built on demand from the stored columns."""
+        return [self._prediction_record(i) for i in range(len(self.all_scores))]
 
     def accuracy(self) -> float:
         """
@@ -144,17 +310,13 @@ class EvaluationMetrics:
         Best for: Balanced datasets
         Range: 0-1 (higher is better)
         """
-        total = sum([
-            self.confusion_matrix.true_positives,
-            self.confusion_matrix.true_negatives,
-            self.confusion_matrix.false_positives,
-            self.confusion_matrix.false_negatives
-        ])
+        cm = self.confusion_matrix
+        tp = cm.true_positives
+        tn = cm.true_negatives
+        total = tp + tn + cm.false_positives + cm.false_negatives
         if total == 0:
             return 0.0
-        return (
-            self.confusion_matrix.true_positives + self.confusion_matrix.true_negatives
-        ) / total
+        return (tp + tn) / total
 
     def precision(self) -> float:
         """
@@ -164,12 +326,12 @@ class EvaluationMetrics:
         Best for: When false positives are costly
         Range: 0-1 (higher is better)
         """
-        denominator = (
-            self.confusion_matrix.true_positives + self.confusion_matrix.false_positives
-        )
+        cm = self.confusion_matrix
+        tp = cm.true_positives
+        denominator = tp + cm.false_positives
         if denominator == 0:
             return 0.0
-        return self.confusion_matrix.true_positives / denominator
+        return tp / denominator
 
     def recall(self) -> float:
         """
@@ -179,12 +341,12 @@ class EvaluationMetrics:
         Best for: When missing phishing is costly
         Range: 0-1 (higher is better)
         """
-        denominator = (
-            self.confusion_matrix.true_positives + self.confusion_matrix.false_negatives
-        )
+        cm = self.confusion_matrix
+        tp = cm.true_positives
+        denominator = tp + cm.false_negatives
         if denominator == 0:
             return 0.0
-        return self.confusion_matrix.true_positives / denominator
+        return tp / denominator
 
     def specificity(self) -> float:
         """
@@ -193,12 +355,12 @@ class EvaluationMetrics:
         Meaning: Of all legitimate messages, how many correctly identified?
         Range: 0-1 (higher is better)
         """
-        denominator = (
-            self.confusion_matrix.true_negatives + self.confusion_matrix.false_positives
-        )
+        cm = self.confusion_matrix
+        tn = cm.true_negatives
+        denominator = tn + cm.false_positives
         if denominator == 0:
             return 0.0
-        return self.confusion_matrix.true_negatives / denominator
+        return tn / denominator
 
     def f1_score(self) -> float:
         """
@@ -235,26 +397,14 @@ class EvaluationMetrics:
         if len(self.all_scores) == 0:
             return 0.0
 
-        # Separate positive and negative scores
-        positive_scores = [
-            score for score, label in zip(self.all_scores, self.all_labels) if label
-        ]
-        negative_scores = [
-            score for score, label in zip(self.all_scores, self.all_labels) if not label
-        ]
-
-        if len(positive_scores) == 0 or len(negative_scores) == 0:
+        n_pos = self._phishing_count
+        n_neg = self._legitimate_count
+        if n_pos == 0 or n_neg == 0:
             return 0.0
 
-        # Count pairs where positive score > negative score
-        correct_pairs = 0
-        for pos_score in positive_scores:
-            for neg_score in negative_scores:
-                if pos_score > neg_score:
-                    correct_pairs += 1
-
-        total_pairs = len(positive_scores) * len(negative_scores)
-        return correct_pairs / total_pairs if total_pairs > 0 else 0.0
+        # Mann-Whitney U: O(n log n) instead of comparing every pair
+        rank_sum = _positive_rank_sum(self.all_scores, self.all_labels)
+        return (rank_sum - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
 
     def matthews_correlation_coefficient(self) -> float:
         """
@@ -264,10 +414,11 @@ class EvaluationMetrics:
         Range: -1 to 1 (higher is better, 0 = random)
         Best for: Imbalanced datasets, comparable across thresholds
         """
-        tp = self.confusion_matrix.true_positives
-        tn = self.confusion_matrix.true_negatives
-        fp = self.confusion_matrix.false_positives
-        fn = self.confusion_matrix.false_negatives
+        cm = self.confusion_matrix
+        tp = cm.true_positives
+        tn = cm.true_negatives
+        fp = cm.false_positives
+        fn = cm.false_negatives
 
         numerator = (tp * tn) - (fp * fn)
         denominator = math.sqrt((tp + fp) * (tp + fn) * (tn + fp) * (tn + fn))
@@ -280,23 +431,18 @@ class EvaluationMetrics:
         """
         Calculate metrics broken down by message category.
 
+        Only categories that received predictions since the last call are
+        recomputed.
+
         Returns:
             Dict mapping category name to ClassificationMetrics
         """
-        categories = set(self.all_categories)
-
-        for category in categories:
-            category_preds = [
-                p for p in self.predictions if p["category"] == category
-            ]
-
-            if not category_preds:
-                continue
-
-            tp = sum(1 for p in category_preds if p["actual_label"] and p["predicted_label"])
-            tn = sum(1 for p in category_preds if not p["actual_label"] and not p["predicted_label"])
-            fp = sum(1 for p in category_preds if not p["actual_label"] and p["predicted_label"])
-            fn = sum(1 for p in category_preds if p["actual_label"] and not p["predicted_label"])
+        for category in self._dirty_categories:
+            cm = self._category_counts[category]
+            tp = cm.true_positives
+            tn = cm.true_negatives
+            fp = cm.false_positives
+            fn = cm.false_negatives
 
             total = tp + tn + fp + fn
             accuracy = (tp + tn) / total if total > 0 else 0.0
@@ -317,6 +463,7 @@ class EvaluationMetrics:
                 tn=tn
             )
 
+        self._dirty_categories.clear()
         return self.category_metrics
 
     def get_summary(self) -> Dict:
@@ -326,18 +473,28 @@ class EvaluationMetrics:
         Returns:
             Dictionary with all calculated metrics
         """
-        return {
-            "total_predictions": len(self.predictions),
-            "phishing_count": sum(1 for p in self.predictions if p["actual_label"]),
-            "legitimate_count": sum(1 for p in self.predictions if not p["actual_label"]),
+        key = (len(self.all_scores), self._threshold)
+        if key == self._summary_key:
+            return self._summary_cache
+
+        # Each base rate is computed once; F1 and FPR are derived from them
+        precision = self.precision()
+        recall = self.recall()
+        specificity = self.specificity()
+        f1 = 2 * precision * recall / (precision + recall) if (precision + recall) > 0 else 0.0
+
+        self._summary_cache = {
+            "total_predictions": len(self.all_scores),
+            "phishing_count": self._phishing_count,
+            "legitimate_count": self._legitimate_count,
             "threshold": self.threshold,
             "metrics": {
                 "accuracy": round(self.accuracy(), 4),
-                "precision": round(self.precision(), 4),
-                "recall": round(self.recall(), 4),
-                "specificity": round(self.specificity(), 4),
-                "f1_score": round(self.f1_score(), 4),
-                "false_positive_rate": round(self.false_positive_rate(), 4),
+                "precision": round(precision, 4),
+                "recall": round(recall, 4),
+                "specificity": round(specificity, 4),
+                "f1_score": round(f1, 4),
+                "false_positive_rate": round(1.0 - specificity, 4),
                 "roc_auc": round(self.roc_auc(), 4),
                 "mcc": round(self.matthews_correlation_coefficient(), 4),
             },
@@ -347,6 +504,8 @@ class EvaluationMetrics:
                 for cat, metrics in self.per_category_metrics().items()
             }
         }
+        self._summary_key = key
+        return self._summary_cache
 
     def get_misclassifications(self, limit: int = 10) -> List[Dict]:
         """
@@ -358,24 +517,38 @@ class EvaluationMetrics:
         Returns:
             List of incorrect predictions sorted by most confident errors
         """
-        misclassified = [p for p in self.predictions if not p["correct"]]
-        # Sort by how confident the model was in the wrong answer
-        misclassified.sort(
-            key=lambda p: max(p["predicted_score"], 1 - p["predicted_score"]),
-            reverse=True
+        threshold = self.threshold
+        scores = self.all_scores
+
+        if NUMPY_AVAILABLE and len(scores):
+            scores_arr = np.frombuffer(scores, dtype=np.float64)
+            labels_arr = np.frombuffer(self.all_labels, dtype=np.int8).view(np.bool_)
+            wrong = np.flatnonzero((scores_arr >= threshold) != labels_arr)
+            confidence = np.maximum(scores_arr[wrong], 1 - scores_arr[wrong])
+            # Stable sort, so tied scores (the norm for 0-10 integer scores)
+            # keep insertion order, exactly as heapq.nlargest does below
+            top = wrong[np.argsort(-confidence, kind='stable')[:max(limit, 0)]]
+            return [self._prediction_record(i) for i in top.tolist()]
+
+        wrong = (
+            i for i, (score, label) in enumerate(zip(scores, self.all_labels))
+            if (score >= threshold) != bool(label)
         )
-        return misclassified[:limit]
+        # Rank by how confident the model was in the wrong answer; only the
+        # top `limit` are kept, so this is O(N log limit) rather than a full sort
+        top = heapq.nlargest(limit, wrong, key=lambda i: max(scores[i], 1 - scores[i]))
+        return [self._prediction_record(i) for i in top]
 
     def save_summary_json(self, filepath: str) -> None:
         """Save evaluation summary to JSON file."""
-        with open(filepath, 'w') as f:
-            json.dump(self.get_summary(), f, indent=2)
+        with open(filepath, 'wb') as f:
+            f.write(serialization.dumps_bytes(self.get_summary(), indent=True))
         logger.info(f"Saved evaluation summary to {filepath}")
 
     def save_predictions_json(self, filepath: str) -> None:
         """Save all predictions to JSON file for detailed analysis."""
-        with open(filepath, 'w') as f:
-            json.dump(self.predictions, f, indent=2)
+        with open(filepath, 'wb') as f:
+            f.write(serialization.dumps_bytes(self.predictions, indent=True))
         logger.info(f"Saved predictions to {filepath}")
 
     def __str__(self) -> str:
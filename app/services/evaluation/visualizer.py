@@ -8,24 +8,65 @@ Generates charts and graphs for evaluation reports:
 - Category performance breakdown
 """
 
+import importlib.util
 import logging
-from typing import Dict, List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
-try:
-    import matplotlib
-    matplotlib.use('Agg')  # Use non-interactive backend
-    import matplotlib.pyplot as plt
-    import matplotlib.patches as mpatches
-    from sklearn.metrics import confusion_matrix, roc_curve, auc
-    import numpy as np
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
+# Plotting libraries are imported on first use: loading matplotlib's font
+# manager is expensive, and most processes never draw a chart.
+MATPLOTLIB_AVAILABLE = all(
+    importlib.util.find_spec(name) is not None
+    for name in ('matplotlib', 'numpy', 'PIL')
+)
+if not MATPLOTLIB_AVAILABLE:
     logger.warning("Matplotlib not available. Visualizations will be skipped.")
 
+plt = Figure = FigureCanvasAgg = np = Image = None
+_plotting_loaded = False
+_plotting_lock = threading.Lock()
+
+
+def _load_plotting() -> bool:
+    """
+    Import the plotting libraries once per process.
+
+    Returns:
+        True if matplotlib and friends are usable
+    """
+    global plt, Figure, FigureCanvasAgg, np, Image
+    global MATPLOTLIB_AVAILABLE, _plotting_loaded
+
+    if _plotting_loaded:
+        return MATPLOTLIB_AVAILABLE
+
+    with _plotting_lock:
+        if not _plotting_loaded:
+            try:
+                import matplotlib
+                matplotlib.use('Agg')  # Use non-interactive backend
+                import matplotlib.pyplot as plt
+                from matplotlib.figure import Figure
+                from matplotlib.backends.backend_agg import FigureCanvasAgg
+                import numpy as np
+                from PIL import Image  # Installed with matplotlib
+            except ImportError as e:
+                MATPLOTLIB_AVAILABLE = False
+                logger.warning(f"Matplotlib not available. Visualizations will be skipped: {e}")
+            _plotting_loaded = True
+
+    return MATPLOTLIB_AVAILABLE
+
+# Bar colors in the metrics comparison chart: poor, good, excellent
+_METRIC_BAND_COLORS = ('#e74c3c', '#f39c12', '#2ecc71')
+
+# Bar order in the per-category chart
+_CATEGORY_METRIC_KEYS = ('accuracy', 'precision', 'recall', 'f1_score')
+
 
 class EvaluationVisualizer:
     """Generate evaluation visualizations."""
@@ -38,18 +79,100 @@ class EvaluationVisualizer:
             dpi: Resolution for saved images
             style: Matplotlib style
         """
+        self.dpi = dpi
+        # Reusable Figures keyed by figsize, one set per thread so charts can
+        # be rendered concurrently (see render_all)
+        self._local = threading.local()
+        self.style = style
+        self._styled = False
+
         if not MATPLOTLIB_AVAILABLE:
-            logger.warning("Visualizations require matplotlib and scikit-learn")
-            return
+            logger.warning("Visualizations require matplotlib")
+
+    def _ready(self) -> bool:
+        """Load the plotting libraries and apply the style on first use."""
+        if not _load_plotting():
+            return False
+
+        if not self._styled:
+            with _plotting_lock:
+                if not self._styled:
+                    try:
+                        plt.style.use(self.style)
+                    except Exception:
+                        pass  # Fall back to default style
+                    _prime_fonts()
+                    self._styled = True
+        return True
+
+    def warm_up(self) -> bool:
+        """
+        Load plotting libraries and fonts ahead of the first chart.
 
-        self.dpi = dpi
-        try:
-            plt.style.use(style)
-        except Exception:
-            pass  # Fall back to default style
+        Returns:
+            True if visualizations are available
+        """
+        return self._ready()
+
+    def _figure(self, figsize: tuple):
+        """
+        Get a blank Figure and Axes of the given size.
+
+        Figures are created once per size and thread and then reused, so
+        consecutive charts skip Figure, canvas and renderer construction.
+        They are built without pyplot, whose global figure registry is not
+        thread-safe.
+
+        Args:
+            figsize: Figure size
+
+        Returns:
+            Tuple of (figure, axes)
+        """
+        figs = getattr(self._local, 'figs', None)
+        if figs is None:
+            figs = self._local.figs = {}
+
+        fig = figs.get(figsize)
+        if fig is None:
+            # Constrained layout is solved as part of the single draw in
+            # _save, instead of a separate tight_layout pass per chart
+            fig = figs[figsize] = Figure(figsize=figsize, dpi=self.dpi, layout='constrained')
+            # Extra padding (inches) so boxed annotations at the edge are not clipped
+            fig.get_layout_engine().set(w_pad=0.1, h_pad=0.1)
+            FigureCanvasAgg(fig)
+            return fig, fig.add_subplot()
+
+        # Clearing the whole figure also drops extra axes such as a colorbar,
+        # which would otherwise leave the next chart's axes shrunk
+        fig.clear()
+        return fig, fig.add_subplot()
 
     @staticmethod
+    def _save(fig, output_path: str) -> None:
+        """
+        Render a figure and write it as PNG.
+
+        Pillow encodes the Agg buffer directly at a low compression level,
+        which is much faster than Matplotlib's own PNG writer.
+
+        Args:
+            fig: Figure to save
+            output_path: Destination path
+        """
+        canvas = fig.canvas
+        canvas.draw()
+        # Wrap the renderer's buffer in place instead of copying it into an array
+        Image.frombuffer(
+            'RGBA', canvas.get_width_height(), canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1
+        ).save(output_path, format='PNG', compress_level=1)
+
+    def close_all(self) -> None:
+        """Release the figures cached for the calling thread."""
+        self._local.figs = {}
+
     def plot_confusion_matrix(
+        self,
         cm_values: Dict,
         output_path: str = None,
         figsize: tuple = (8, 6)
@@ -65,7 +188,7 @@ class EvaluationVisualizer:
         Returns:
             Path to saved figure or None
         """
-        if not MATPLOTLIB_AVAILABLE:
+        if not self._ready():
             return None
 
         tp = cm_values.get('true_positives', 0)
@@ -75,7 +198,7 @@ class EvaluationVisualizer:
 
         cm = np.array([[tn, fp], [fn, tp]])
 
-        fig, ax = plt.subplots(figsize=figsize)
+        fig, ax = self._figure(figsize)
 
         # Create heatmap
         im = ax.imshow(cm, cmap='Blues', aspect='auto')
@@ -90,14 +213,13 @@ class EvaluationVisualizer:
         ax.set_title('Confusion Matrix', fontsize=14, fontweight='bold', pad=20)
 
         # Add text annotations
-        for i in range(2):
-            for j in range(2):
-                text_color = 'white' if cm[i, j] > cm.max() / 2 else 'black'
-                ax.text(j, i, cm[i, j], ha='center', va='center',
-                       color=text_color, fontsize=14, fontweight='bold')
+        half = cm.max() / 2
+        for (i, j), value in np.ndenumerate(cm):
+            ax.text(j, i, value, ha='center', va='center',
+                   color='white' if value > half else 'black', fontsize=14, fontweight='bold')
 
         # Add colorbar
-        cbar = plt.colorbar(im, ax=ax)
+        cbar = fig.colorbar(im, ax=ax)
         cbar.set_label('Count', rotation=270, labelpad=20)
 
         # Add legend
@@ -106,20 +228,20 @@ class EvaluationVisualizer:
             f'FP: {fp} | FN: {fn}\n'
             f'Total: {tp + tn + fp + fn}'
         )
-        ax.text(0.5, -0.35, legend_text, ha='center', transform=ax.transAxes,
-               fontsize=11, bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
-
-        plt.tight_layout()
+        # Offset in points rather than axes fraction, so constrained layout
+        # can reserve room below the axes for it
+        ax.annotate(legend_text, xy=(0.5, 0), xycoords='axes fraction',
+                    xytext=(0, -50), textcoords='offset points', ha='center', va='top',
+                    fontsize=11, bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
 
         if output_path:
-            plt.savefig(output_path, dpi=100, bbox_inches='tight')
+            self._save(fig, output_path)
             logger.info(f"Saved confusion matrix to {output_path}")
 
-        plt.close()
         return output_path
 
-    @staticmethod
     def plot_roc_curve(
+        self,
         y_true: List[bool],
         y_scores: List[float],
         output_path: str = None,
@@ -137,17 +259,14 @@ class EvaluationVisualizer:
         Returns:
             Path to saved figure or None
         """
-        if not MATPLOTLIB_AVAILABLE:
+        if not self._ready():
             return None
 
-        # Convert boolean to int
-        y_true_int = [int(y) for y in y_true]
-
         # Calculate ROC curve
-        fpr, tpr, thresholds = roc_curve(y_true_int, y_scores)
-        roc_auc = auc(fpr, tpr)
+        fpr, tpr = _binary_roc(y_true, y_scores)
+        roc_auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1])) / 2)
 
-        fig, ax = plt.subplots(figsize=figsize)
+        fig, ax = self._figure(figsize)
 
         # Plot ROC curve
         ax.plot(fpr, tpr, color='darkorange', lw=2.5,
@@ -165,17 +284,14 @@ class EvaluationVisualizer:
         ax.legend(loc='lower right', fontsize=11)
         ax.grid(True, alpha=0.3)
 
-        plt.tight_layout()
-
         if output_path:
-            plt.savefig(output_path, dpi=100, bbox_inches='tight')
+            self._save(fig, output_path)
             logger.info(f"Saved ROC curve to {output_path}")
 
-        plt.close()
         return output_path
 
-    @staticmethod
     def plot_metrics_comparison(
+        self,
         metrics: Dict[str, float],
         output_path: str = None,
         figsize: tuple = (10, 6)
@@ -191,7 +307,7 @@ class EvaluationVisualizer:
         Returns:
             Path to saved figure or None
         """
-        if not MATPLOTLIB_AVAILABLE:
+        if not self._ready():
             return None
 
         # Filter only numeric metrics (0-1 range)
@@ -200,12 +316,12 @@ class EvaluationVisualizer:
             if isinstance(v, (int, float)) and -1 <= v <= 1
         }
 
-        fig, ax = plt.subplots(figsize=figsize)
+        fig, ax = self._figure(figsize)
 
         names = list(plot_metrics.keys())
-        values = list(plot_metrics.values())
-        colors = ['#2ecc71' if v >= 0.8 else '#f39c12' if v >= 0.6 else '#e74c3c'
-                 for v in values]
+        values = np.fromiter(plot_metrics.values(), dtype=float, count=len(plot_metrics))
+        # Band index: 0 below 0.6, 1 from 0.6, 2 from 0.8
+        colors = np.take(_METRIC_BAND_COLORS, (values >= 0.6).astype(np.intp) + (values >= 0.8))
 
         bars = ax.bar(names, values, color=colors, edgecolor='black', linewidth=1.5)
 
@@ -224,18 +340,16 @@ class EvaluationVisualizer:
         ax.legend()
         ax.grid(True, alpha=0.3, axis='y')
 
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
+        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
 
         if output_path:
-            plt.savefig(output_path, dpi=100, bbox_inches='tight')
+            self._save(fig, output_path)
             logger.info(f"Saved metrics comparison to {output_path}")
 
-        plt.close()
         return output_path
 
-    @staticmethod
     def plot_category_performance(
+        self,
         category_metrics: Dict[str, Dict],
         output_path: str = None,
         figsize: tuple = (12, 6)
@@ -251,7 +365,7 @@ class EvaluationVisualizer:
         Returns:
             Path to saved figure or None
         """
-        if not MATPLOTLIB_AVAILABLE:
+        if not self._ready():
             return None
 
         if not category_metrics:
@@ -259,20 +373,22 @@ class EvaluationVisualizer:
             return None
 
         categories = list(category_metrics.keys())
-        accuracy_vals = [category_metrics[cat].get('accuracy', 0) for cat in categories]
-        precision_vals = [category_metrics[cat].get('precision', 0) for cat in categories]
-        recall_vals = [category_metrics[cat].get('recall', 0) for cat in categories]
-        f1_vals = [category_metrics[cat].get('f1_score', 0) for cat in categories]
+        # One row per category, one column per metric
+        vals = np.fromiter(
+            (metrics.get(key, 0) for metrics in category_metrics.values() for key in _CATEGORY_METRIC_KEYS),
+            dtype=float,
+            count=len(categories) * len(_CATEGORY_METRIC_KEYS)
+        ).reshape(-1, len(_CATEGORY_METRIC_KEYS))
 
         x = np.arange(len(categories))
         width = 0.2
 
-        fig, ax = plt.subplots(figsize=figsize)
+        fig, ax = self._figure(figsize)
 
-        ax.bar(x - 1.5*width, accuracy_vals, width, label='Accuracy', color='#3498db')
-        ax.bar(x - 0.5*width, precision_vals, width, label='Precision', color='#2ecc71')
-        ax.bar(x + 0.5*width, recall_vals, width, label='Recall', color='#e74c3c')
-        ax.bar(x + 1.5*width, f1_vals, width, label='F1-Score', color='#f39c12')
+        ax.bar(x - 1.5*width, vals[:, 0], width, label='Accuracy', color='#3498db')
+        ax.bar(x - 0.5*width, vals[:, 1], width, label='Precision', color='#2ecc71')
+        ax.bar(x + 0.5*width, vals[:, 2], width, label='Recall', color='#e74c3c')
+        ax.bar(x + 1.5*width, vals[:, 3], width, label='F1-Score', color='#f39c12')
 
         ax.set_ylabel('Score', fontsize=12, fontweight='bold')
         ax.set_xlabel('Message Category', fontsize=12, fontweight='bold')
@@ -283,17 +399,14 @@ class EvaluationVisualizer:
         ax.set_ylim([0, 1.1])
         ax.grid(True, alpha=0.3, axis='y')
 
-        plt.tight_layout()
-
         if output_path:
-            plt.savefig(output_path, dpi=100, bbox_inches='tight')
+            self._save(fig, output_path)
             logger.info(f"Saved category performance to {output_path}")
 
-        plt.close()
         return output_path
 
-    @staticmethod
     def plot_class_distribution(
+        self,
         y_true: List[bool],
         output_path: str = None,
         figsize: tuple = (8, 6)
@@ -309,13 +422,14 @@ class EvaluationVisualizer:
         Returns:
             Path to saved figure or None
         """
-        if not MATPLOTLIB_AVAILABLE:
+        if not self._ready():
             return None
 
-        phishing_count = sum(1 for y in y_true if y)
-        legitimate_count = sum(1 for y in y_true if not y)
+        labels_arr = np.asarray(y_true, dtype=np.bool_)
+        phishing_count = int(np.count_nonzero(labels_arr))
+        legitimate_count = labels_arr.size - phishing_count
 
-        fig, ax = plt.subplots(figsize=figsize)
+        fig, ax = self._figure(figsize)
 
         labels = ['Phishing', 'Legitimate']
         sizes = [phishing_count, legitimate_count]
@@ -333,11 +447,74 @@ class EvaluationVisualizer:
         legend_labels = [f'{label}: {size}' for label, size in zip(labels, sizes)]
         ax.legend(legend_labels, loc='upper right')
 
-        plt.tight_layout()
-
         if output_path:
-            plt.savefig(output_path, dpi=100, bbox_inches='tight')
+            self._save(fig, output_path)
             logger.info(f"Saved class distribution to {output_path}")
 
-        plt.close()
         return output_path
+
+
+def _prime_fonts() -> None:
+    """
+    Draw a throwaway figure so font lookup and glyph loading happen once,
+    up front, rather than during the first real chart.
+    """
+    fig = Figure(figsize=(1, 1))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_title('x', fontweight='bold')
+    ax.set_xlabel('x')
+    ax.text(0, 0, '0')
+    fig.canvas.draw()
+
+
+def _binary_roc(y_true: List[bool], y_scores: List[float]) -> Tuple:
+    """
+    ROC curve for binary labels, one point per distinct score.
+
+    Args:
+        y_true: Actual labels
+        y_scores: Predicted scores
+
+    Returns:
+        Tuple of (fpr, tpr) arrays, starting at (0, 0)
+    """
+    scores = np.asarray(y_scores, dtype=float)
+    labels = np.asarray(y_true, dtype=bool)
+
+    order = np.argsort(-scores, kind='mergesort')
+    scores = scores[order]
+    labels = labels[order]
+
+    # Last index of each run of tied scores
+    ends = np.r_[np.flatnonzero(np.diff(scores)), scores.size - 1]
+    tps = np.r_[0, np.cumsum(labels)[ends]]
+    fps = np.r_[0, ends + 1 - tps[1:]]
+
+    # Undefined (nan) when only one class is present
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return fps / fps[-1], tps / tps[-1]
+
+
+def render_all(visualizer: EvaluationVisualizer, tasks: List[Tuple[str, Dict]]) -> List[Optional[str]]:
+    """
+    Render independent charts concurrently.
+
+    Agg rasterization and PNG encoding spend most of their time in native
+    code, so charts drawn on separate threads overlap well.
+
+    Args:
+        visualizer: Visualizer to draw with
+        tasks: List of (plot method name, keyword arguments)
+
+    Returns:
+        Result of each plot call, in task order
+    """
+    if not tasks:
+        return []
+    with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix='chart') as executor:
+        futures = [
+            executor.submit(getattr(visualizer, method), **kwargs)
+            for method, kwargs in tasks
+        ]
+    return [future.result() for future in futures]
@@ -0,0 +1,99 @@
+"""
+Background Chart Rendering
+
+Runs EvaluationVisualizer in separate processes so the caller can keep
+working (writing reports, computing metrics) while charts are drawn.
+Matplotlib's global state stays isolated in the workers.
+"""
+
+import logging
+import multiprocessing
+import time
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Workers are started after the Gemini event-loop and HTTP client threads;
+# forking a multi-threaded parent can deadlock the child on locks those
+# threads held (logging, SSL), so always start them fresh
+_mp_context = multiprocessing.get_context('spawn')
+
+
+def run(queue, dpi: int = 100) -> None:
+    """
+    Worker loop: render each batch of chart tasks until a None sentinel arrives.
+
+    Args:
+        queue: Queue of task lists, see render_all
+        dpi: Resolution for saved images
+    """
+    from app.services.evaluation.visualizer import EvaluationVisualizer, render_all
+
+    visualizer = EvaluationVisualizer(dpi=dpi)
+    # Load matplotlib and fonts while the parent is still busy
+    visualizer.warm_up()
+    while True:
+        tasks = queue.get()
+        if tasks is None:
+            break
+        try:
+            render_all(visualizer, tasks)
+        except Exception as e:
+            logger.error(f"Error rendering charts: {e}")
+
+
+class ChartWorker:
+    """Handle to a pool of chart rendering processes."""
+
+    def __init__(self, dpi: int = 100, processes: int = 1):
+        """
+        Initialize worker.
+
+        Args:
+            dpi: Resolution for saved images
+            processes: Number of rendering processes
+        """
+        self._queue = _mp_context.Queue()
+        self._processes = [
+            _mp_context.Process(
+                target=run, args=(self._queue, dpi), name=f'chart-worker-{i}', daemon=True
+            )
+            for i in range(max(1, processes))
+        ]
+
+    def start(self) -> 'ChartWorker':
+        """Start the worker processes."""
+        for process in self._processes:
+            process.start()
+        return self
+
+    def submit(self, tasks: List[Tuple[str, Dict]]) -> None:
+        """
+        Queue a batch of charts for concurrent rendering.
+
+        With one process the batch is drawn on threads inside it; with
+        several, each chart goes to whichever process is free, so drawing
+        is not limited by a single interpreter lock.
+
+        Args:
+            tasks: List of (plot method name, keyword arguments)
+        """
+        if len(self._processes) == 1:
+            self._queue.put(tasks)
+            return
+        for task in tasks:
+            self._queue.put([task])
+
+    def join(self, timeout: float = None) -> None:
+        """
+        Wait for all queued charts to be written.
+
+        Args:
+            timeout: Maximum seconds to wait
+        """
+        for _ in self._processes:
+            self._queue.put(None)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for process in self._processes:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            process.join(remaining)
@@ -1,14 +1,87 @@
 """
 Gemini AI Analyzer for threat detection.
 """
+import asyncio
+import copy
+import hashlib
 import importlib
 import json
 import logging
+import random
+import re
+import threading
+import time
 from typing import Dict, Optional, List
 from flask import current_app
+from app.utils import serialization
+from app.utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Fallback for unparseable responses: pull out just the score
+_SCORE_RE = re.compile(r'score["\']?\s*[:=]\s*(\d+)', re.IGNORECASE)
+_JSON_DECODER = json.JSONDecoder()
+
+# Structured output for the Gemini API: the model returns bare JSON in this
+# shape, so _parse_response takes its direct-parse path
+_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "score": {"type": "INTEGER"},
+        "summary": {"type": "STRING"},
+        "lesson": {"type": "STRING"},
+        "is_campaign": {"type": "BOOLEAN"},
+        "techniques": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "confidence": {"type": "NUMBER"},
+    },
+    "required": ["score", "summary", "lesson", "is_campaign", "techniques", "confidence"],
+}
+_GEMINI_API_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": _RESPONSE_SCHEMA,
+}
+
+
+def _gemini_api_config(response_schema: Optional[Dict]) -> Optional[Dict]:
+    """Gemini API request config for a JSON response schema (None for free text)."""
+    if response_schema is _RESPONSE_SCHEMA:
+        return _GEMINI_API_CONFIG
+    if response_schema is None:
+        return None
+    return {"response_mime_type": "application/json", "response_schema": response_schema}
+
+# Requests kept in flight by analyze_batch
+_BATCH_CONCURRENCY = 20
+
+# Keep-alive connections held open to the Gemini API; above the batch
+# concurrency so overlapping requests reuse TLS sessions instead of reconnecting
+_HTTP_POOL_SIZE = 64
+
+# Rate limiting and server-side failures worth retrying; anything else
+# (bad request, auth) fails on the first attempt
+_TRANSIENT_ERROR_RE = re.compile(r'\b(429|500|502|503|504)\b|RESOURCE_EXHAUSTED|UNAVAILABLE')
+_RETRY_BASE_DELAY_SECONDS = 1.0
+
+# Gemini API batch jobs: how often to poll, and the states a job ends in
+_BATCH_JOB_POLL_SECONDS = 30
+_BATCH_JOB_DONE_STATES = {
+    'JOB_STATE_SUCCEEDED', 'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'
+}
+
+# Campaigns resend the same text many times; successful analyses are reused
+# for identical message, sender, URLs and phones. Errors are never cached.
+_RESPONSE_CACHE_SIZE = 4096
+_RESPONSE_CACHE_TTL_SECONDS = 3600
+_response_cache = TTLCache(maxsize=_RESPONSE_CACHE_SIZE, ttl=_RESPONSE_CACHE_TTL_SECONDS)
+
+# Shared by every request; treated as read-only
+_GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 1024,
+}
+
 try:
     # Try Vertex AI first (for GCP)
     from google.cloud import aiplatform
@@ -20,13 +93,51 @@ except ImportError:
 try:
     # Fallback to Gemini API SDK
     from google import genai
+    import httpx  # Installed with google-genai
     GEMINI_API_AVAILABLE = True
 except ImportError:
     genai = None
+    httpx = None
     GEMINI_API_AVAILABLE = False
 
 from app.services.gemini.prompt_templates import SYSTEM_INSTRUCTION, ANALYSIS_PROMPT_TEMPLATE
 
+_SYSTEM_PREFIX = SYSTEM_INSTRUCTION + "\n\n"
+
+# vertexai.generative_models is heavy, so it is only imported once Vertex AI
+# is actually used; the resolved class is kept for later analyzers
+_generative_model_class = None
+
+
+def _get_generative_model_class():
+    """Return vertexai's GenerativeModel class, importing it on first use."""
+    global _generative_model_class
+    if _generative_model_class is None:
+        _generative_model_class = importlib.import_module('vertexai.generative_models').GenerativeModel
+    return _generative_model_class
+
+_analyzer_lock = threading.Lock()
+
+
+def get_analyzer() -> 'GeminiAnalyzer':
+    """
+    Return the current app's shared analyzer, creating it on first use.
+
+    Reusing one instance keeps the SDK client and its connection pool alive
+    across requests.
+
+    Returns:
+        GeminiAnalyzer stored in app.extensions['gemini_analyzer']
+    """
+    extensions = current_app.extensions
+    analyzer = extensions.get('gemini_analyzer')
+    if analyzer is None:
+        with _analyzer_lock:
+            analyzer = extensions.get('gemini_analyzer')
+            if analyzer is None:
+                analyzer = extensions['gemini_analyzer'] = GeminiAnalyzer()
+    return analyzer
+
 
 class GeminiAnalyzer:
     """Service for analyzing SMS messages with Gemini AI."""
@@ -36,8 +147,13 @@ class GeminiAnalyzer:
         self.use_vertex_ai = current_app.config.get('USE_VERTEX_AI', False)
         self.model_name = current_app.config.get('GEMINI_MODEL', 'gemini-2.0-flash')
         self.model_candidates = self._build_model_candidates()
+        self._model_lock = threading.Lock()
+        self._analyze_secondary_async = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
 
-        if self.use_vertex_ai and VERTEX_AI_AVAILABLE:
+        vertex_primary = self.use_vertex_ai and VERTEX_AI_AVAILABLE
+        if vertex_primary:
             self._init_vertex_ai()
         elif GEMINI_API_AVAILABLE:
             self._init_gemini_api()
@@ -45,6 +161,9 @@ class GeminiAnalyzer:
             logger.error("Neither Vertex AI nor Gemini API SDK available")
             raise ImportError("Please install google-cloud-aiplatform or google-genai")
 
+        if current_app.config.get('CAMPAIGN_HEDGED_REQUESTS', False):
+            self._init_secondary_backend(vertex_primary)
+
     def _build_model_candidates(self) -> List[str]:
         """Build ordered list of model candidates for Gemini API fallback."""
         configured_candidates = current_app.config.get('GEMINI_MODEL_CANDIDATES', '')
@@ -84,9 +203,9 @@ class GeminiAnalyzer:
             raise ValueError("GCP_PROJECT_ID required for Vertex AI")
 
         aiplatform.init(project=project_id, location=location)
-        generative_models = importlib.import_module('vertexai.generative_models')
-        model_class = getattr(generative_models, 'GenerativeModel')
-        self.model = model_class(self.model_name)
+        self.model = _get_generative_model_class()(self.model_name)
+        self._analyze = self._analyze_with_vertex_ai
+        self._analyze_async = self._analyze_with_vertex_ai_async
         logger.info(f"Initialized Vertex AI with model: {self.model_name}")
 
     def _init_gemini_api(self):
@@ -98,9 +217,67 @@ class GeminiAnalyzer:
         if not api_key:
             raise ValueError("GEMINI_API_KEY required")
 
-        self.client = genai.Client(api_key=api_key)
+        limits = httpx.Limits(
+            max_connections=_HTTP_POOL_SIZE, max_keepalive_connections=_HTTP_POOL_SIZE
+        )
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options={
+                'client_args': {'limits': limits},
+                'async_client_args': {'limits': limits},
+            }
+        )
+        self._analyze = self._analyze_with_gemini_api
+        self._analyze_async = self._analyze_with_gemini_api_async
         logger.info(f"Initialized Gemini API SDK with preferred model: {self.model_name}")
 
+    def _init_secondary_backend(self, vertex_primary: bool):
+        """Also set up the backend not chosen as primary, for hedged requests."""
+        primary = (self._analyze, self._analyze_async)
+        try:
+            if vertex_primary:
+                self._init_gemini_api()
+            else:
+                self._init_vertex_ai()
+            self._analyze_secondary_async = self._analyze_async
+        except Exception as e:
+            logger.warning(f"Hedged requests disabled, second backend unavailable: {e}")
+        finally:
+            self._analyze, self._analyze_async = primary
+
+    async def _analyze_hedged_async(self, prompt: str, response_schema: Optional[Dict]) -> str:
+        """
+        Send a prompt to both backends and return the first successful response.
+
+        Falls back to the primary backend alone when only one is set up.
+
+        Args:
+            prompt: Full prompt text
+            response_schema: Schema for the Gemini API response, or None
+
+        Returns:
+            Raw response text
+        """
+        if self._analyze_secondary_async is None:
+            return await self._analyze_async(prompt, response_schema=response_schema)
+
+        pending = {
+            asyncio.create_task(self._analyze_async(prompt, response_schema=response_schema)),
+            asyncio.create_task(self._analyze_secondary_async(prompt, response_schema=response_schema)),
+        }
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
     def analyze_message(
         self,
         message_text: str,
@@ -121,76 +298,299 @@ class GeminiAnalyzer:
             Analysis dictionary with score, summary, lesson, etc.
         """
         try:
-            # Format URLs and phones for prompt
-            urls_str = ', '.join(urls) if urls else 'None'
-            phones_str = ', '.join(phones) if phones else 'None'
-            sender_str = sender or 'Unknown'
-
-            # Build prompt
-            prompt = ANALYSIS_PROMPT_TEMPLATE.format(
-                message_text=message_text,
-                sender=sender_str,
-                urls=urls_str,
-                phones=phones_str
-            )
+            key = self._cache_key(message_text, sender, urls, phones)
+            cached = _response_cache.get(key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+
+            prompt = self._build_prompt(message_text, sender, urls, phones)
 
             # Get response from Gemini
-            if self.use_vertex_ai and hasattr(self, 'model'):
-                response = self._analyze_with_vertex_ai(prompt)
-            else:
-                response = self._analyze_with_gemini_api(prompt)
+            response = self._analyze(prompt)
 
-            # Parse JSON response
-            analysis = self._parse_response(response)
+            analysis = self._finalize(response)
+            _response_cache[key] = copy.deepcopy(analysis)
+            return analysis
 
-            # Validate and set defaults
-            analysis.setdefault('score', 5)
-            analysis.setdefault('summary', 'Message analyzed')
-            analysis.setdefault('lesson', 'Be cautious with suspicious messages')
-            analysis.setdefault('is_campaign', False)
-            analysis.setdefault('techniques', [])
-            analysis.setdefault('confidence', 0.8)
+        except Exception as e:
+            logger.error(f"Error analyzing message: {e}")
+            return self._error_result(e)
 
-            # Ensure score is in valid range
-            analysis['score'] = max(1, min(10, int(analysis['score'])))
+    async def analyze_message_async(
+        self,
+        message_text: str,
+        sender: Optional[str] = None,
+        urls: Optional[List[str]] = None,
+        phones: Optional[List[str]] = None,
+        max_attempts: int = 1
+    ) -> Dict:
+        """
+        Async variant of analyze_message for use inside an event loop.
+
+        Args:
+            message_text: The SMS message text
+            sender: Sender phone number (optional)
+            urls: Detected URLs in message (optional)
+            phones: Detected phone numbers in message (optional)
+            max_attempts: Tries per request when Gemini is rate limited or
+                returns a server error
+
+        Returns:
+            Analysis dictionary with score, summary, lesson, etc.
+        """
+        try:
+            key = self._cache_key(message_text, sender, urls, phones)
+            cached = _response_cache.get(key)
+            if cached is not None:
+                return copy.deepcopy(cached)
 
-            logger.info(f"Analysis complete: Score={analysis['score']}, Campaign={analysis['is_campaign']}")
+            prompt = self._build_prompt(message_text, sender, urls, phones)
+
+            response = await self._analyze_with_retry_async(prompt, max_attempts)
+
+            analysis = self._finalize(response)
+            _response_cache[key] = copy.deepcopy(analysis)
             return analysis
 
         except Exception as e:
             logger.error(f"Error analyzing message: {e}")
-            # Return safe default
-            return {
-                'score': 5,
-                'summary': 'Analysis error occurred',
-                'lesson': 'Please forward suspicious messages to our shortcode',
-                'is_campaign': False,
-                'techniques': [],
-                'confidence': 0.0,
-                'error': str(e)
+            return self._error_result(e)
+
+    async def _analyze_with_retry_async(self, prompt: str, max_attempts: int) -> str:
+        """Send a prompt, retrying transient errors with jittered exponential backoff."""
+        for attempt in range(max_attempts):
+            try:
+                return await self._analyze_async(prompt)
+            except Exception as e:
+                if attempt + 1 >= max_attempts or not _TRANSIENT_ERROR_RE.search(str(e)):
+                    raise
+                # Full jitter keeps concurrent workers from retrying in lockstep
+                delay = random.uniform(0, _RETRY_BASE_DELAY_SECONDS * 2 ** attempt)
+                logger.warning(f"Transient Gemini error, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+
+    def run_async(self, coro):
+        """
+        Run a coroutine on the analyzer's event loop and wait for its result.
+
+        The async SDK client pools connections per event loop, so every batch
+        runs on one long-lived loop thread; a fresh loop per call (asyncio.run)
+        would find the pooled connections bound to a closed loop. Safe to call
+        from any thread except the loop's own. The coroutine runs without the
+        caller's Flask app context.
+
+        Args:
+            coro: Coroutine to run
+
+        Returns:
+            The coroutine's result
+        """
+        loop = self._loop
+        if loop is None:
+            with self._loop_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(
+                        target=loop.run_forever, name='gemini-loop', daemon=True
+                    ).start()
+                    self._loop = loop
+                loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def analyze_batch(
+        self,
+        messages: List[Dict],
+        concurrency: int = _BATCH_CONCURRENCY,
+        max_attempts: int = 1
+    ) -> List[Dict]:
+        """
+        Analyze many messages with overlapping Gemini requests.
+
+        Blocks the calling thread; inside an event loop use
+        analyze_message_async instead.
+
+        Args:
+            messages: Dicts with 'message_text' and optional 'sender',
+                'urls' and 'phones' keys
+            concurrency: Maximum number of requests in flight
+            max_attempts: Tries per message on rate limiting or server errors
+
+        Returns:
+            Analysis dictionaries in the same order as messages
+        """
+        async def run_all():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(message):
+                async with semaphore:
+                    return await self.analyze_message_async(
+                        message_text=message['message_text'],
+                        sender=message.get('sender'),
+                        urls=message.get('urls'),
+                        phones=message.get('phones'),
+                        max_attempts=max_attempts
+                    )
+
+            return await asyncio.gather(*map(one, messages), return_exceptions=True)
+
+        results = self.run_async(run_all())
+        return [
+            self._error_result(result) if isinstance(result, BaseException) else result
+            for result in results
+        ]
+
+    def analyze_batch_job(self, messages: List[Dict], poll_interval: float = _BATCH_JOB_POLL_SECONDS) -> List[Dict]:
+        """
+        Analyze many messages as one Gemini API batch job.
+
+        Batch jobs are billed at a discount and run on the provider's
+        schedule, so this suits offline work such as evaluations. Blocks
+        until the job finishes, which can take minutes.
+
+        Args:
+            messages: Dicts with 'message_text' and optional 'sender',
+                'urls' and 'phones' keys
+            poll_interval: Seconds between job status checks
+
+        Returns:
+            Analysis dictionaries in the same order as messages
+
+        Raises:
+            RuntimeError: If the Gemini API client is not in use or the job
+                does not succeed
+        """
+        client = getattr(self, 'client', None)
+        if client is None:
+            raise RuntimeError("Batch jobs require the Gemini API SDK backend")
+
+        batch_requests = [
+            {
+                'contents': [{
+                    'role': 'user',
+                    'parts': [{'text': _SYSTEM_PREFIX + self._build_prompt(
+                        message['message_text'],
+                        message.get('sender'),
+                        message.get('urls'),
+                        message.get('phones')
+                    )}]
+                }],
+                'config': _GEMINI_API_CONFIG
             }
+            for message in messages
+        ]
+
+        job = client.batches.create(model=self.model_name, src=batch_requests)
+        logger.info(f"Submitted batch job {job.name} with {len(batch_requests)} requests")
 
-    def _analyze_with_vertex_ai(self, prompt: str) -> str:
-        """Analyze using Vertex AI."""
-        generation_config = {
-            "temperature": 0.3,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 1024,
+        while job.state.name not in _BATCH_JOB_DONE_STATES:
+            time.sleep(poll_interval)
+            job = client.batches.get(name=job.name)
+            logger.info(f"Batch job {job.name}: {job.state.name}")
+
+        if job.state.name != 'JOB_STATE_SUCCEEDED':
+            raise RuntimeError(f"Batch job {job.name} ended in {job.state.name}: {job.error}")
+
+        results = []
+        # Responses come back in request order
+        for item in job.dest.inlined_responses:
+            if item.error is not None:
+                results.append(self._error_result(RuntimeError(item.error.message)))
+                continue
+            try:
+                results.append(self._finalize(item.response.text or ''))
+            except Exception as e:
+                logger.error(f"Error parsing batch response: {e}")
+                results.append(self._error_result(e))
+        return results
+
+    @staticmethod
+    def _build_prompt(
+        message_text: str,
+        sender: Optional[str],
+        urls: Optional[List[str]],
+        phones: Optional[List[str]]
+    ) -> str:
+        """Fill the analysis prompt template for one message."""
+        # Format URLs and phones for prompt
+        urls_str = ', '.join(urls) if urls else 'None'
+        phones_str = ', '.join(phones) if phones else 'None'
+        sender_str = sender or 'Unknown'
+
+        return ANALYSIS_PROMPT_TEMPLATE.format(
+            message_text=message_text,
+            sender=sender_str,
+            urls=urls_str,
+            phones=phones_str
+        )
+
+    @staticmethod
+    def _cache_key(
+        message_text: str,
+        sender: Optional[str],
+        urls: Optional[List[str]],
+        phones: Optional[List[str]]
+    ) -> bytes:
+        """
+        Response cache key over everything the prompt is built from.
+
+        Only the per-message fields are hashed; the template text is the
+        same for every call, so hits skip formatting and encoding it.
+        """
+        fields = (message_text, sender or '', '\x1f'.join(urls or ()), '\x1f'.join(phones or ()))
+        return hashlib.blake2b('\x1e'.join(fields).encode('utf-8'), digest_size=16).digest()
+
+    def _finalize(self, response: str) -> Dict:
+        """Parse a raw response and fill in defaults."""
+        # Parse JSON response
+        analysis = self._parse_response(response)
+
+        # Validate and set defaults
+        analysis.setdefault('score', 5)
+        analysis.setdefault('summary', 'Message analyzed')
+        analysis.setdefault('lesson', 'Be cautious with suspicious messages')
+        analysis.setdefault('is_campaign', False)
+        analysis.setdefault('techniques', [])
+        analysis.setdefault('confidence', 0.8)
+
+        # Ensure score is in valid range
+        analysis['score'] = max(1, min(10, int(analysis['score'])))
+
+        logger.info(f"Analysis complete: Score={analysis['score']}, Campaign={analysis['is_campaign']}")
+        return analysis
+
+    @staticmethod
+    def _error_result(error: BaseException) -> Dict:
+        """Safe default returned when analysis fails."""
+        return {
+            'score': 5,
+            'summary': 'Analysis error occurred',
+            'lesson': 'Please forward suspicious messages to our shortcode',
+            'is_campaign': False,
+            'techniques': [],
+            'confidence': 0.0,
+            'error': str(error)
         }
 
+    def _analyze_with_vertex_ai(self, prompt: str, response_schema: Optional[Dict] = None) -> str:
+        """Analyze using Vertex AI (response_schema is only used by the Gemini API)."""
         response = self.model.generate_content(
             contents=[SYSTEM_INSTRUCTION, prompt],
-            generation_config=generation_config
+            generation_config=_GENERATION_CONFIG
         )
 
         return response.text or ''
 
-    def _analyze_with_gemini_api(self, prompt: str) -> str:
-        """Analyze using Gemini API SDK."""
+    async def _analyze_with_vertex_ai_async(self, prompt: str, response_schema: Optional[Dict] = None) -> str:
+        """Analyze using Vertex AI from an event loop."""
+        # The Vertex SDK call is blocking; keep it off the event loop
+        return await asyncio.to_thread(self._analyze_with_vertex_ai, prompt)
+
+    def _analyze_with_gemini_api(self, prompt: str, response_schema: Optional[Dict] = _RESPONSE_SCHEMA) -> str:
+        """Analyze using Gemini API SDK, constraining output to response_schema."""
         # Combine system instruction with prompt for Gemini API
         # (Gemini API only accepts "user" and "model" roles, not "system")
-        combined_prompt = f"{SYSTEM_INSTRUCTION}\n\n{prompt}"
+        combined_prompt = _SYSTEM_PREFIX + prompt
+        config = _gemini_api_config(response_schema)
         last_error = None
 
         for model in self.model_candidates:
@@ -199,14 +599,12 @@ class GeminiAnalyzer:
                     model=model,
                     contents=[
                         {"role": "user", "parts": [{"text": combined_prompt}]}
-                    ]
+                    ],
+                    config=config
                 )
 
                 if model != self.model_name:
-                    logger.warning(
-                        f"Model '{self.model_name}' unavailable, switched to '{model}'"
-                    )
-                    self.model_name = model
+                    self._switch_model(model)
 
                 return response.text or ''
             except Exception as e:
@@ -224,6 +622,50 @@ class GeminiAnalyzer:
             f"No compatible Gemini model found. Tried: {', '.join(self.model_candidates)}"
         ) from last_error
 
+    async def _analyze_with_gemini_api_async(self, prompt: str, response_schema: Optional[Dict] = _RESPONSE_SCHEMA) -> str:
+        """Analyze using the Gemini API SDK's async client."""
+        combined_prompt = _SYSTEM_PREFIX + prompt
+        config = _gemini_api_config(response_schema)
+        last_error = None
+
+        for model in self.model_candidates:
+            try:
+                response = await self.client.aio.models.generate_content(
+                    model=model,
+                    contents=[
+                        {"role": "user", "parts": [{"text": combined_prompt}]}
+                    ],
+                    config=config
+                )
+
+                if model != self.model_name:
+                    self._switch_model(model)
+
+                return response.text or ''
+            except Exception as e:
+                error_text = str(e)
+                last_error = e
+                model_not_found = '404' in error_text or 'NOT_FOUND' in error_text
+
+                if model_not_found:
+                    logger.warning(f"Gemini model unavailable: {model}, trying fallback")
+                    continue
+
+                raise
+
+        raise RuntimeError(
+            f"No compatible Gemini model found. Tried: {', '.join(self.model_candidates)}"
+        ) from last_error
+
+    def _switch_model(self, model: str) -> None:
+        """Record a fallback model; the analyzer is shared across threads."""
+        with self._model_lock:
+            if model != self.model_name:
+                logger.warning(
+                    f"Model '{self.model_name}' unavailable, switched to '{model}'"
+                )
+                self.model_name = model
+
     def _parse_response(self, response_text: str) -> Dict:
         """
         Parse JSON response from Gemini.
@@ -238,29 +680,30 @@ class GeminiAnalyzer:
         # Sometimes Gemini wraps JSON in markdown code blocks
         text = response_text.strip()
 
-        # Remove markdown code blocks if present
+        # Remove markdown code blocks if present: drop the opening fence line
+        # (with its language tag) and the closing fence, without splitting
+        # the whole response into lines
         if text.startswith('```'):
-            lines = text.split('\n')
-            text = '\n'.join(lines[1:-1]) if len(lines) > 2 else text
+            body = text.partition('\n')[2]
+            if body:
+                text = body.removesuffix('```').rstrip()
 
-        # Try to find JSON object
+        # Well-formed responses parse directly
         try:
-            # Look for JSON object
-            start_idx = text.find('{')
-            end_idx = text.rfind('}') + 1
+            analysis = serialization.loads(text)
+            if isinstance(analysis, dict):
+                return analysis
+        except ValueError:
+            pass
 
-            if start_idx >= 0 and end_idx > start_idx:
-                json_str = text[start_idx:end_idx]
-                return json.loads(json_str)
-            else:
-                # Try parsing entire text
-                return json.loads(text)
-        except json.JSONDecodeError as e:
+        # Otherwise decode from the first brace up to its matching close
+        try:
+            return _JSON_DECODER.raw_decode(text, text.index('{'))[0]
+        except ValueError as e:
             logger.warning(f"Failed to parse JSON response: {e}")
             logger.warning(f"Response text: {response_text[:200]}")
             # Try to extract score from text as fallback
-            import re
-            score_match = re.search(r'score["\']?\s*[:=]\s*(\d+)', text, re.IGNORECASE)
+            score_match = _SCORE_RE.search(text)
             score = int(score_match.group(1)) if score_match else 5
 
             return {
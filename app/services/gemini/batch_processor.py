@@ -1,27 +1,244 @@
 """
 Batch processor for campaign detection using Gemini.
 """
+import asyncio
+import hashlib
 import json
 import logging
+import statistics
+import threading
+import time
+from itertools import chain
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 from flask import current_app
 
-from app.services.gemini.analyzer import GeminiAnalyzer
-from app.services.gemini.prompt_templates import CAMPAIGN_DETECTION_PROMPT
+from app.services.gemini.analyzer import get_analyzer
+from app.services.gemini.prompt_templates import (
+    CAMPAIGN_DETECTION_PREAMBLE,
+    CAMPAIGN_DETECTION_MESSAGES_TEMPLATE,
+)
 from app.services.database.models import DatabaseService
 from app.models import ScamLog
+from app.utils import serialization
+from app.utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    # Optional: semantic clustering of reported messages
+    from sentence_transformers import SentenceTransformer
+    import hdbscan
+    SEMANTIC_CLUSTERING_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    SentenceTransformer = None
+    hdbscan = None
+    SEMANTIC_CLUSTERING_AVAILABLE = False
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Gemini requests in flight while analyzing campaign groups; bounded to
+# stay under API rate limits
+_CAMPAIGN_CONCURRENCY = 8
+
+# Structured output for campaign analysis on the Gemini API
+_CAMPAIGN_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "campaigns": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "name": {"type": "STRING"},
+                    "pattern": {"type": "STRING"},
+                    "affected_count": {"type": "INTEGER"},
+                    "urls": {"type": "ARRAY", "items": {"type": "STRING"}},
+                    "phones": {"type": "ARRAY", "items": {"type": "STRING"}},
+                    "threat_level": {"type": "STRING", "enum": ["low", "medium", "high"]},
+                },
+                "required": ["name", "pattern", "threat_level"],
+            },
+        },
+    },
+    "required": ["campaigns"],
+}
+
+# Prefilter: groups with widely varying scores or nearly all-distinct senders
+# are not analyzed, and neither are loose semantic clusters
+_MAX_GROUP_SCORE_STDDEV = 2.5
+_MAX_GROUP_SENDER_RATIO = 0.8
+_MIN_CLUSTER_COHESION = 0.6
+
+# Columns loaded for grouping; text_len is computed by the database
+_SCAM_LOG_FIELDS = ('id', 'score', 'text_len', 'original_sender', 'detected_urls')
+
+_EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+_EMBEDDING_TEXT_CHARS = 200
+_EMBEDDING_BATCH_SIZE = 64
+
+# Campaign groups often survive from one detection run to the next, so
+# Gemini's response is reused for a repeated prompt or, with embeddings
+# available, for a group whose messages mean nearly the same thing
+_RESPONSE_CACHE_SIZE = 256
+_RESPONSE_CACHE_TTL_SECONDS = 24 * 3600
+_SEMANTIC_MATCH_THRESHOLD = 0.95
+_INT8_MAX = 127
+
+# Loading the embedding model takes seconds, so it is shared per process
+_embedding_model = None
+_embedding_model_lock = threading.Lock()
+
+
+def _get_embedding_model():
+    """Return the shared SentenceTransformer, loading it on first use."""
+    global _embedding_model
+    with _embedding_model_lock:
+        if _embedding_model is None:
+            _embedding_model = SentenceTransformer(_EMBEDDING_MODEL_NAME)
+            logger.info(f"Loaded embedding model: {_EMBEDDING_MODEL_NAME}")
+        return _embedding_model
+
+
+def _quantize(vector):
+    """
+    Quantize a vector to int8, scaling its largest component to +/-127.
+
+    Returns:
+        Tuple of (int8 vector, Euclidean norm of the int8 vector)
+    """
+    peak = float(np.abs(vector).max()) or 1.0
+    quantized = np.rint(vector * (_INT8_MAX / peak)).astype(np.int8)
+    return quantized, float(np.linalg.norm(quantized.astype(np.float32))) or 1.0
+
+
+class _SemanticResponseCache:
+    """
+    Bounded cache of responses looked up by cosine similarity of unit vectors.
+
+    Vectors are stored as int8, a quarter of the float32 size, and compared
+    with an integer dot product.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, threshold: float):
+        """
+        Initialize cache.
+
+        Args:
+            maxsize: Maximum number of entries kept before evicting the oldest
+            ttl: Seconds an entry stays valid after it was added
+            threshold: Minimum cosine similarity for a hit
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._vectors = None  # (n, dim) int8 matrix, oldest entry first
+        self._norms = None  # Norm of each int8 row
+        self._values: List[str] = []
+        self._expires: List[float] = []
+        self._lock = threading.Lock()
+
+    def get(self, vector) -> Optional[str]:
+        """Return the value of the most similar live entry above threshold."""
+        with self._lock:
+            self._expire()
+            if not self._values:
+                return None
+            quantized, norm = _quantize(vector)
+            dots = np.einsum('ij,j->i', self._vectors, quantized, dtype=np.int32)
+            similarities = dots / (self._norms * norm)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            return self._values[best]
+
+    def add(self, vector, value: str) -> None:
+        """Store a value under a unit vector."""
+        with self._lock:
+            self._expire()
+            quantized, norm = _quantize(vector)
+            row = quantized[np.newaxis, :]
+            if self._vectors is None:
+                self._vectors = row
+                self._norms = np.array([norm], dtype=np.float32)
+            else:
+                self._vectors = np.vstack((self._vectors, row))
+                self._norms = np.append(self._norms, np.float32(norm))
+            self._values.append(value)
+            self._expires.append(time.monotonic() + self.ttl)
+            if len(self._values) > self.maxsize:
+                self._drop(len(self._values) - self.maxsize)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        expired = 0
+        while expired < len(self._expires) and self._expires[expired] <= now:
+            expired += 1
+        if expired:
+            self._drop(expired)
+
+    def _drop(self, count: int) -> None:
+        """Remove the count oldest entries."""
+        self._vectors = self._vectors[count:]
+        self._norms = self._norms[count:]
+        del self._values[:count]
+        del self._expires[:count]
+
+
+_response_cache = TTLCache(maxsize=_RESPONSE_CACHE_SIZE, ttl=_RESPONSE_CACHE_TTL_SECONDS)
+# Cache keys hash the full prompt; the fixed preamble is hashed once here
+_PREAMBLE_HASHER = hashlib.blake2b(CAMPAIGN_DETECTION_PREAMBLE.encode('utf-8'), digest_size=16)
+
+_semantic_response_cache = (
+    _SemanticResponseCache(_RESPONSE_CACHE_SIZE, _RESPONSE_CACHE_TTL_SECONDS, _SEMANTIC_MATCH_THRESHOLD)
+    if SEMANTIC_CLUSTERING_AVAILABLE else None
+)
+
+
+def _group_vector(embeddings):
+    """Unit-length mean of a group's message embeddings."""
+    centroid = embeddings.mean(axis=0)
+    return centroid / (np.linalg.norm(centroid) or 1.0)
+
+
+_detector_lock = threading.Lock()
+
+
+def get_campaign_detector() -> 'CampaignDetector':
+    """
+    Return the current app's shared campaign detector, creating it on first use.
+
+    Returns:
+        CampaignDetector stored in app.extensions['campaign_detector']
+    """
+    extensions = current_app.extensions
+    detector = extensions.get('campaign_detector')
+    if detector is None:
+        with _detector_lock:
+            detector = extensions.get('campaign_detector')
+            if detector is None:
+                detector = extensions['campaign_detector'] = CampaignDetector()
+    return detector
+
 
 class CampaignDetector:
     """Service for detecting scam campaigns from batch analysis."""
 
     def __init__(self):
         """Initialize campaign detector."""
-        self.analyzer = GeminiAnalyzer()
+        self.analyzer = get_analyzer()
         self.threshold = current_app.config.get('CAMPAIGN_DETECTION_THRESHOLD', 5)
+        self.use_semantic_clustering = (
+            SEMANTIC_CLUSTERING_AVAILABLE
+            and current_app.config.get('CAMPAIGN_SEMANTIC_CLUSTERING', True)
+        )
+        self.hedged = current_app.config.get('CAMPAIGN_HEDGED_REQUESTS', False)
 
     def detect_campaigns(self, hours: int = 24) -> List[Dict]:
         """
@@ -34,8 +251,10 @@ class CampaignDetector:
             List of detected campaigns
         """
         try:
-            # Get recent scam logs
-            recent_logs = DatabaseService.get_recent_scam_logs(hours=hours, limit=100)
+            # Get recent scam logs; message text is only needed up front
+            # for embedding, bucketing uses the length computed in SQL
+            fields = _SCAM_LOG_FIELDS + ('message_text',) if self.use_semantic_clustering else _SCAM_LOG_FIELDS
+            recent_logs = DatabaseService.get_recent_scam_log_fields(hours=hours, limit=100, fields=fields)
 
             if len(recent_logs) < self.threshold:
                 logger.info(f"Not enough reports ({len(recent_logs)}) for campaign detection")
@@ -43,15 +262,40 @@ class CampaignDetector:
 
             # Group logs by similarity (simple grouping by score and similar text)
             # For production, use more sophisticated clustering
-            grouped_logs = self._group_similar_logs(recent_logs)
+            # Embed every message in one batch; clustering and the response
+            # cache both index into this matrix
+            embeddings = self._embed_logs(recent_logs) if self.use_semantic_clustering else None
+            grouped_logs = self._group_similar_logs(recent_logs, embeddings)
+
+            # Drop groups that do not look coordinated before paying for Gemini
+            groups = [
+                group for group in grouped_logs
+                if len(group) >= self.threshold and self._looks_coordinated(group)
+            ]
+            if len(groups) < len(grouped_logs):
+                logger.info(f"Prefilter skipped {len(grouped_logs) - len(groups)} of {len(grouped_logs)} groups")
+
+            vectors = [None] * len(groups)
+            if embeddings is not None:
+                row_of = {id(log): i for i, log in enumerate(recent_logs)}
+                vectors = [
+                    _group_vector(embeddings[[row_of[id(log)] for log in group[:20]]])
+                    for group in groups
+                ]
+
+            # Texts of the messages that go into prompts
+            if self.use_semantic_clustering:
+                texts = {log.id: log.message_text for log in recent_logs}
+            else:
+                texts = DatabaseService.get_scam_log_texts(
+                    [log.id for group in groups for log in group[:20]]
+                )
 
-            # Analyze each group with Gemini
-            detected_campaigns = []
-            for group in grouped_logs:
-                if len(group) >= self.threshold:
-                    campaign = self._analyze_campaign_group(group)
-                    if campaign:
-                        detected_campaigns.append(campaign)
+            # Analyze the groups with Gemini concurrently
+            campaigns = self.analyzer.run_async(
+                self._analyze_campaign_groups(groups, vectors, texts)
+            )
+            detected_campaigns = [campaign for campaign in campaigns if campaign]
 
             logger.info(f"Detected {len(detected_campaigns)} campaigns")
             return detected_campaigns
@@ -60,65 +304,192 @@ class CampaignDetector:
             logger.error(f"Error detecting campaigns: {e}")
             return []
 
-    def _group_similar_logs(self, logs: List[ScamLog]) -> List[List[ScamLog]]:
+    @staticmethod
+    def _embed_logs(logs: List[ScamLog]):
+        """
+        Embed all messages with one encode call.
+
+        Args:
+            logs: Scam log rows from get_recent_scam_log_fields
+
+        Returns:
+            Matrix of unit vectors, one row per log, or None on failure
+        """
+        try:
+            return _get_embedding_model().encode(
+                [log.message_text[:_EMBEDDING_TEXT_CHARS] for log in logs],
+                batch_size=_EMBEDDING_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+        except Exception as e:
+            logger.error(f"Error embedding scam logs: {e}")
+            return None
+
+    def _group_similar_logs(self, logs: List[ScamLog], embeddings=None) -> List[List[ScamLog]]:
         """
         Group similar scam logs together.
 
+        Messages are clustered by meaning when their embeddings are given,
+        otherwise bucketed by score and text length.
+
         Args:
-            logs: List of ScamLog instances
+            logs: Scam log rows from get_recent_scam_log_fields
+            embeddings: Matrix from _embed_logs (optional)
 
         Returns:
             List of grouped logs
         """
-        # Simple grouping: same score range and similar text length
-        # In production, use semantic similarity or clustering
-        groups = {}
+        if embeddings is not None:
+            try:
+                return self._cluster_by_embedding(logs, embeddings)
+            except Exception as e:
+                logger.error(f"Semantic clustering failed, using simple grouping: {e}")
 
-        for log in logs:
-            # Create a simple key for grouping
-            score_range = (log.score // 2) * 2  # Group by score ranges
-            text_length_range = (len(log.message_text) // 50) * 50  # Group by text length
+        return self._bucket_by_score_and_length(logs)
+
+    def _cluster_by_embedding(self, logs: List[ScamLog], embeddings) -> List[List[ScamLog]]:
+        """
+        Cluster logs by message embedding with HDBSCAN.
+
+        Args:
+            logs: Scam log rows from get_recent_scam_log_fields
+            embeddings: Matrix from _embed_logs
+
+        Returns:
+            One group per cluster; noise points are dropped
+        """
+        if len(logs) < self.threshold:
+            return []
 
-            key = f"{score_range}_{text_length_range}"
+        labels = hdbscan.HDBSCAN(min_cluster_size=max(2, self.threshold)).fit_predict(embeddings)
+
+        groups = []
+        for label in np.unique(labels):
+            if label == -1:
+                continue
+            members = np.flatnonzero(labels == label)
+            # Mean pairwise cosine similarity of unit vectors, from the norm of
+            # their sum: (|sum|^2 - n) / (n * (n - 1))
+            n = len(members)
+            total = embeddings[members].sum(axis=0)
+            cohesion = (float(total @ total) - n) / (n * (n - 1))
+            if cohesion >= _MIN_CLUSTER_COHESION:
+                groups.append([logs[i] for i in members])
+        return groups
+
+    @staticmethod
+    def _looks_coordinated(group: List[ScamLog]) -> bool:
+        """
+        Cheap check that a group could be one campaign.
+
+        Args:
+            group: Group of similar logs
+
+        Returns:
+            False when scores vary widely or almost every sender differs
+        """
+        if NUMPY_AVAILABLE:
+            score_spread = float(np.fromiter((log.score for log in group), dtype=float, count=len(group)).std())
+        else:
+            score_spread = statistics.pstdev(log.score for log in group)
+        if score_spread > _MAX_GROUP_SCORE_STDDEV:
+            return False
+
+        distinct_senders = len({log.original_sender for log in group})
+        return distinct_senders / len(group) <= _MAX_GROUP_SENDER_RATIO
+
+    def _bucket_by_score_and_length(self, logs: List[ScamLog]) -> List[List[ScamLog]]:
+        """
+        Group logs with the same score range and similar text length.
+
+        Args:
+            logs: Scam log rows from get_recent_scam_log_fields
 
-            if key not in groups:
-                groups[key] = []
-            groups[key].append(log)
+        Returns:
+            Groups with at least threshold members, in order of first appearance
+        """
+        if NUMPY_AVAILABLE and logs:
+            scores = np.fromiter((log.score for log in logs), dtype=np.int32, count=len(logs))
+            lengths = np.fromiter((log.text_len for log in logs), dtype=np.int32, count=len(logs))
+            # Score range in the high digits, length range in the low ones
+            buckets = (scores // 2) * 100_000 + lengths // 50
+            _, first_index, inverse, counts = np.unique(
+                buckets, return_index=True, return_inverse=True, return_counts=True
+            )
+
+            # Log positions sorted by bucket (stable, so arrival order is kept
+            # within a bucket); only buckets that qualify are materialized
+            order = np.argsort(inverse, kind='stable')
+            ends = np.cumsum(counts)
+            kept = np.flatnonzero(counts >= self.threshold)
+            kept = kept[np.argsort(first_index[kept])]
+
+            return [
+                [logs[i] for i in order[ends[bucket] - counts[bucket]:ends[bucket]].tolist()]
+                for bucket in kept.tolist()
+            ]
+
+        groups = {}
+        for log in logs:
+            key = (log.score // 2, log.text_len // 50)
+            groups.setdefault(key, []).append(log)
 
         # Return groups with at least threshold members
         return [group for group in groups.values() if len(group) >= self.threshold]
 
-    def _analyze_campaign_group(self, logs: List[ScamLog]) -> Optional[Dict]:
+    async def _analyze_campaign_groups(
+        self,
+        groups: List[List[ScamLog]],
+        vectors: List,
+        texts: Dict[int, str]
+    ) -> List[Optional[Dict]]:
+        """
+        Analyze several groups with overlapping Gemini requests.
+
+        Args:
+            groups: Groups of similar scam log rows
+            vectors: Unit mean embedding of each group's prompted messages, or None
+            texts: Message text by log id, for at least the first 20 logs per group
+
+        Returns:
+            Campaign dictionary or None for each group, in order
+        """
+        semaphore = asyncio.Semaphore(_CAMPAIGN_CONCURRENCY)
+
+        async def run(group, vector):
+            async with semaphore:
+                return await self._analyze_campaign_group(group, texts, vector)
+
+        return await asyncio.gather(*map(run, groups, vectors))
+
+    async def _analyze_campaign_group(self, logs: List[ScamLog], texts: Dict[int, str], vector=None) -> Optional[Dict]:
         """
         Analyze a group of logs to detect a campaign.
 
         Args:
-            logs: List of similar ScamLog instances
+            logs: List of similar scam log rows
+            texts: Message text by log id, for at least the first 20 logs
+            vector: Unit mean embedding of the prompted messages (optional)
 
         Returns:
             Campaign dictionary or None
         """
         try:
-            # Format messages for Gemini
-            messages_text = []
-            for i, log in enumerate(logs[:20], 1):  # Limit to 20 for context
-                messages_text.append(
-                    f"Message {i}:\n"
-                    f"Text: {log.message_text[:200]}\n"
-                    f"Sender: {log.original_sender}\n"
-                    f"Score: {log.score}\n"
-                )
+            # Format messages for Gemini, one f-string per message
+            messages = '\n\n'.join(
+                f"Message {i}:\nText: {texts.get(log.id, '')[:200]}\n"
+                f"Sender: {log.original_sender}\nScore: {log.score}\n"
+                for i, log in enumerate(logs[:20], 1)  # Limit to 20 for context
+            )
 
-            prompt = CAMPAIGN_DETECTION_PROMPT.format(
+            request_text = CAMPAIGN_DETECTION_MESSAGES_TEMPLATE.format(
                 count=len(logs),
-                messages='\n\n'.join(messages_text)
+                messages=messages
             )
 
-            # Use Vertex AI or Gemini API
-            if self.analyzer.use_vertex_ai and hasattr(self.analyzer, 'model'):
-                response = self.analyzer._analyze_with_vertex_ai(prompt)
-            else:
-                response = self.analyzer._analyze_with_gemini_api(prompt)
+            response = await self._cached_campaign_response(request_text, vector)
 
             # Parse response
             campaign_data = self._parse_campaign_response(response)
@@ -127,19 +498,12 @@ class CampaignDetector:
                 # Use first campaign detected
                 campaign = campaign_data['campaigns'][0]
 
-                # Extract URLs and phones from logs
-                all_urls = set()
-                all_phones = set()
-
-                for log in logs:
-                    if log.detected_urls:
-                        try:
-                            urls = json.loads(log.detected_urls)
-                            all_urls.update(urls)
-                        except:
-                            pass
-                    if log.original_sender:
-                        all_phones.add(log.original_sender)
+                # Extract URLs and phones from logs (detected_urls is
+                # already decoded by the JSON column type)
+                all_urls = set(chain.from_iterable(
+                    log.detected_urls for log in logs if log.detected_urls
+                ))
+                all_phones = {log.original_sender for log in logs if log.original_sender}
 
                 campaign['urls'] = list(all_urls)
                 campaign['phones'] = list(all_phones)
@@ -153,25 +517,65 @@ class CampaignDetector:
             logger.error(f"Error analyzing campaign group: {e}")
             return None
 
+    async def _cached_campaign_response(self, request_text: str, vector=None) -> str:
+        """
+        Get Gemini's response for a campaign prompt, reusing earlier responses.
+
+        Args:
+            request_text: Per-request part of the prompt, after the preamble
+            vector: Unit mean embedding of the prompted messages, for
+                similarity lookups (optional)
+
+        Returns:
+            Raw response text
+        """
+        hasher = _PREAMBLE_HASHER.copy()
+        hasher.update(request_text.encode('utf-8'))
+        key = hasher.digest()
+        response = _response_cache.get(key)
+        if response is not None:
+            logger.info("Reusing campaign analysis for identical group")
+            return response
+
+        if vector is not None:
+            response = _semantic_response_cache.get(vector)
+            if response is not None:
+                logger.info("Reusing campaign analysis for similar group")
+                return response
+
+        # Use Vertex AI or Gemini API, whichever the analyzer was set up
+        # with, or race both when hedging is enabled
+        analyze = self.analyzer._analyze_hedged_async if self.hedged else self.analyzer._analyze_async
+        response = await analyze(
+            CAMPAIGN_DETECTION_PREAMBLE + request_text, response_schema=_CAMPAIGN_RESPONSE_SCHEMA
+        )
+
+        _response_cache[key] = response
+        if vector is not None:
+            _semantic_response_cache.add(vector, response)
+        return response
+
     def _parse_campaign_response(self, response_text: str) -> Dict:
         """Parse campaign detection response."""
-        try:
-            text = response_text.strip()
+        text = response_text.strip()
 
-            # Remove markdown code blocks if present
-            if text.startswith('```'):
-                lines = text.split('\n')
-                text = '\n'.join(lines[1:-1]) if len(lines) > 2 else text
+        # Remove markdown code blocks if present
+        if text.startswith('```'):
+            body = text.partition('\n')[2]
+            if body:
+                text = body.removesuffix('```').rstrip()
 
-            # Find JSON object
-            start_idx = text.find('{')
-            end_idx = text.rfind('}') + 1
+        # Schema-constrained responses parse directly
+        try:
+            campaign_data = serialization.loads(text)
+            if isinstance(campaign_data, dict):
+                return campaign_data
+        except ValueError:
+            pass
 
-            if start_idx >= 0 and end_idx > start_idx:
-                json_str = text[start_idx:end_idx]
-                return json.loads(json_str)
-            else:
-                return json.loads(text)
-        except json.JSONDecodeError as e:
+        # Otherwise decode from the first brace up to its matching close
+        try:
+            return _JSON_DECODER.raw_decode(text, text.index('{'))[0]
+        except ValueError as e:
             logger.warning(f"Failed to parse campaign response: {e}")
             return {'campaigns': []}
@@ -55,11 +55,12 @@ Provide a comprehensive analysis focusing on:
 
 Respond ONLY with valid JSON, no additional text."""
 
-CAMPAIGN_DETECTION_PROMPT = """You are analyzing multiple reported SMS messages to detect scam campaigns.
+# Campaign detection prompt: the fixed instructions come first and the
+# per-request messages last, so successive requests share a common prefix
+# that Gemini can serve from its implicit context cache
+CAMPAIGN_DETECTION_PREAMBLE = """You are analyzing multiple reported SMS messages to detect scam campaigns.
 
-Analyze the following {count} messages and identify if they are part of the same campaign:
-
-{messages}
+Identify whether the messages listed below are part of the same campaign.
 
 For each potential campaign, provide:
 1. Campaign name/description
@@ -80,5 +81,10 @@ Respond in JSON format:
             "threat_level": "<low|medium|high>"
         }
     ]
-}"""
+}
+
+"""
+
+CAMPAIGN_DETECTION_MESSAGES_TEMPLATE = """Analyze the following {count} messages:
 
+{messages}"""
@@ -1,8 +1,11 @@
 """
 Bulk alert service for campaign notifications.
 """
+import asyncio
 import logging
-from typing import List, Optional
+import threading
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
 from flask import current_app
 
 from app.services.africas_talking.sms_service import SMSService
@@ -11,6 +14,29 @@ from app.utils.formatters import format_campaign_alert
 
 logger = logging.getLogger(__name__)
 
+# Recipients per Africa's Talking request, and requests in flight at once
+_BULK_SMS_CHUNK_SIZE = 500
+_BULK_SMS_CONCURRENCY = 4
+
+_alert_service_lock = threading.Lock()
+
+
+def get_alert_service() -> 'AlertService':
+    """
+    Return the current app's shared alert service, creating it on first use.
+
+    Returns:
+        AlertService stored in app.extensions['alert_service']
+    """
+    extensions = current_app.extensions
+    service = extensions.get('alert_service')
+    if service is None:
+        with _alert_service_lock:
+            service = extensions.get('alert_service')
+            if service is None:
+                service = extensions['alert_service'] = AlertService()
+    return service
+
 
 class AlertService:
     """Service for sending bulk alerts."""
@@ -42,27 +68,22 @@ class AlertService:
             return {'success': False, 'reason': 'disabled'}
 
         try:
-            # Get subscribers
-            subscribers = DatabaseService.get_subscribers(region=region, active_only=True)
-
-            if not subscribers:
-                logger.warning("No subscribers found for campaign alert")
-                return {'success': False, 'reason': 'no_subscribers'}
-
             # Format alert message
             message = format_campaign_alert(campaign_name, affected_count)
 
-            # Get phone numbers
-            phone_numbers = [sub.phone_number for sub in subscribers]
+            # Stream subscriber numbers straight into the batched sender
+            phone_numbers = DatabaseService.iter_subscriber_phones(region=region, active_only=True)
+            total, sent = self._send_in_chunks(message, phone_numbers)
 
-            # Send bulk SMS
-            response = self.sms_service.send_bulk_sms(message, phone_numbers)
+            if not total:
+                logger.warning("No subscribers found for campaign alert")
+                return {'success': False, 'reason': 'no_subscribers'}
 
-            logger.info(f"Campaign alert sent to {len(phone_numbers)} subscribers")
+            logger.info(f"Campaign alert sent to {sent} subscribers")
 
             return {
                 'success': True,
-                'recipients': len(phone_numbers),
+                'recipients': sent,
                 'campaign': campaign_name
             }
 
@@ -94,24 +115,78 @@ class AlertService:
             from app.utils.formatters import format_blacklist_notification
 
             if subscribers is None:
-                # Get all active subscribers
-                db_subscribers = DatabaseService.get_subscribers(active_only=True)
-                subscribers = [sub.phone_number for sub in db_subscribers]
-
-            if not subscribers:
-                return {'success': False, 'reason': 'no_subscribers'}
+                # Stream all active subscribers
+                subscribers = DatabaseService.iter_subscriber_phones(active_only=True)
 
             message = format_blacklist_notification(entity_type, entity_value)
-            response = self.sms_service.send_bulk_sms(message, subscribers)
+            total, sent = self._send_in_chunks(message, subscribers)
+
+            if not total:
+                return {'success': False, 'reason': 'no_subscribers'}
 
-            logger.info(f"Blacklist notification sent to {len(subscribers)} subscribers")
+            logger.info(f"Blacklist notification sent to {sent} subscribers")
 
             return {
                 'success': True,
-                'recipients': len(subscribers)
+                'recipients': sent
             }
 
         except Exception as e:
             logger.error(f"Error sending blacklist notification: {e}")
             return {'success': False, 'error': str(e)}
 
+    def _send_in_chunks(self, message: str, phone_numbers: Iterable[str]) -> Tuple[int, int]:
+        """
+        Send one message to many recipients in concurrent batches.
+
+        Batches are dispatched as they are read, so sending starts before
+        a streamed recipient list has been fully fetched.
+
+        Args:
+            message: Message text
+            phone_numbers: Recipient phone numbers
+
+        Returns:
+            Tuple of (recipients, recipients in batches that were accepted)
+
+        Raises:
+            Exception: The first batch error, if every batch failed
+        """
+        async def send_all():
+            semaphore = asyncio.Semaphore(_BULK_SMS_CONCURRENCY)
+
+            async def send(chunk):
+                try:
+                    return await self.sms_service.send_bulk_sms_async(message, chunk)
+                finally:
+                    semaphore.release()
+
+            sizes = []
+            tasks = []
+            for chunk in _batched(phone_numbers, _BULK_SMS_CHUNK_SIZE):
+                await semaphore.acquire()
+                sizes.append(len(chunk))
+                tasks.append(asyncio.create_task(send(chunk)))
+            return sizes, await asyncio.gather(*tasks, return_exceptions=True)
+
+        sizes, results = asyncio.run(send_all())
+
+        sent = 0
+        errors = []
+        for size, result in zip(sizes, results):
+            if isinstance(result, Exception):
+                logger.error(f"Bulk SMS batch of {size} failed: {result}")
+                errors.append(result)
+            else:
+                sent += size
+
+        if errors and not sent:
+            raise errors[0]
+        return sum(sizes), sent
+
+
+def _batched(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Yield successive lists of up to size items."""
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
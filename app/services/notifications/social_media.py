@@ -3,17 +3,22 @@ Social media posting service.
 """
 import logging
 from typing import Optional
+import requests
 from flask import current_app
 
 logger = logging.getLogger(__name__)
 
-# Try to import tweepy (optional dependency)
+# Try to import requests-oauthlib (optional dependency)
 try:
-    import tweepy
+    from requests_oauthlib import OAuth1
     TWITTER_AVAILABLE = True
 except ImportError:
+    OAuth1 = None
     TWITTER_AVAILABLE = False
-    logger.warning("tweepy not installed, Twitter posting disabled")
+    logger.warning("requests-oauthlib not installed, Twitter posting disabled")
+
+_TWITTER_TWEETS_URL = 'https://api.twitter.com/2/tweets'
+_TWITTER_TIMEOUT_SECONDS = 10
 
 
 class SocialMediaService:
@@ -22,13 +27,13 @@ class SocialMediaService:
     def __init__(self):
         """Initialize social media service."""
         self.enabled = current_app.config.get('ENABLE_SOCIAL_MEDIA', False)
-        self.twitter_client = None
+        self.twitter_session: Optional[requests.Session] = None
 
         if self.enabled and TWITTER_AVAILABLE:
             self._init_twitter()
 
     def _init_twitter(self):
-        """Initialize Twitter client."""
+        """Initialize a signed HTTP session for the Twitter v2 API."""
         try:
             api_key = current_app.config.get('TWITTER_API_KEY')
             api_secret = current_app.config.get('TWITTER_API_SECRET')
@@ -36,9 +41,9 @@ class SocialMediaService:
             access_token_secret = current_app.config.get('TWITTER_ACCESS_TOKEN_SECRET')
 
             if all([api_key, api_secret, access_token, access_token_secret]):
-                auth = tweepy.OAuthHandler(api_key, api_secret)
-                auth.set_access_token(access_token, access_token_secret)
-                self.twitter_client = tweepy.API(auth)
+                session = requests.Session()
+                session.auth = OAuth1(api_key, api_secret, access_token, access_token_secret)
+                self.twitter_session = session
                 logger.info("Twitter client initialized")
             else:
                 logger.warning("Twitter credentials incomplete")
@@ -75,13 +80,19 @@ class SocialMediaService:
             )
 
             # Post to Twitter if available
-            if self.twitter_client:
-                response = self.twitter_client.update_status(tweet)
-                logger.info(f"Posted to Twitter: {response.id}")
+            if self.twitter_session:
+                response = self.twitter_session.post(
+                    _TWITTER_TWEETS_URL,
+                    json={'text': tweet},
+                    timeout=_TWITTER_TIMEOUT_SECONDS
+                )
+                response.raise_for_status()
+                tweet_id = response.json()['data']['id']
+                logger.info(f"Posted to Twitter: {tweet_id}")
                 return {
                     'success': True,
                     'platform': 'twitter',
-                    'tweet_id': response.id
+                    'tweet_id': tweet_id
                 }
             else:
                 logger.warning("Twitter client not available")
@@ -90,4 +101,3 @@ class SocialMediaService:
         except Exception as e:
             logger.error(f"Error posting to social media: {e}")
             return {'success': False, 'error': str(e)}
-
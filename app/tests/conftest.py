@@ -0,0 +1,48 @@
+"""
+Shared pytest fixtures.
+"""
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.services.database import blacklist, bloom
+
+
+def _reset_blacklist_state():
+    """Drop process-local blacklist caches so tests do not leak into each other."""
+    blacklist._blacklist_cache.clear()
+    blacklist._url_automaton_built_at = None
+    bloom.invalidate()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Application in testing mode with a fresh database."""
+    # A file rather than :memory:, so background report threads get their
+    # own connections as they do in deployment
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'test.db'}")
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        _reset_blacklist_state()
+        yield app
+        db.session.remove()
+        db.drop_all()
+    _reset_blacklist_state()
+    app.extensions['executor'].shutdown(wait=True)
+
+
+@pytest.fixture
+def failing_commit(app):
+    """Make the next session commit fail, as a lost database connection would."""
+    failures = [RuntimeError('commit failed')]
+
+    def fail(session):
+        # Savepoint releases fire before_commit too; fail only the real commit
+        if failures and not session.in_nested_transaction():
+            raise failures.pop()
+
+    event.listen(db.session, 'before_commit', fail)
+    yield
+    event.remove(db.session, 'before_commit', fail)
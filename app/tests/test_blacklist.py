@@ -0,0 +1,118 @@
+"""
+Tests for the community blacklist service.
+"""
+import pytest
+
+from app import db
+from app.models import Blacklist
+from app.services.database.blacklist import BlacklistService, _blacklist_cache
+from app.services.database.models import DatabaseService
+
+SENDER = '+254700000001'
+URL = 'http://bit.ly/abc'
+
+
+def test_deferred_entries_cached_after_commit(app):
+    BlacklistService.check_and_add_to_blacklist(10, phone_number=SENDER, url=URL, commit=False)
+    assert ('phone', SENDER) not in _blacklist_cache
+
+    DatabaseService.commit()
+
+    assert _blacklist_cache.get(('phone', SENDER)) is True
+    assert _blacklist_cache.get(('url', URL)) is True
+    assert BlacklistService.is_entity_blacklisted(phone_number=SENDER)
+
+
+def test_failed_commit_leaves_cache_untouched(app, failing_commit):
+    BlacklistService.check_and_add_to_blacklist(10, phone_number=SENDER, url=URL, commit=False)
+
+    with pytest.raises(RuntimeError):
+        DatabaseService.commit()
+
+    assert db.session.query(Blacklist).count() == 0
+    assert ('phone', SENDER) not in _blacklist_cache
+    assert not BlacklistService.is_entity_blacklisted(phone_number=SENDER, url=URL)
+    assert not BlacklistService.find_blacklisted_entities(phone_number=SENDER, urls=[URL])
+
+
+def test_failed_commit_callbacks_do_not_leak_into_next_commit(app, failing_commit):
+    BlacklistService.check_and_add_to_blacklist(10, phone_number=SENDER, commit=False)
+    with pytest.raises(RuntimeError):
+        DatabaseService.commit()
+
+    DatabaseService.add_to_blacklist('phone', '+254700000002', commit=False)
+    DatabaseService.commit()
+
+    assert ('phone', SENDER) not in _blacklist_cache
+    assert not BlacklistService.is_entity_blacklisted(phone_number=SENDER)
+
+
+@pytest.fixture
+def blacklisted_url(app):
+    """Blacklist URL and return it."""
+    DatabaseService.add_to_blacklist('url', URL, auto_blocked=True)
+    return URL
+
+
+@pytest.mark.parametrize('text', [
+    f'Claim your prize at {URL}',
+    f'Claim your prize at {URL}.',
+    f'Claim your prize at {URL}/form now',
+    f'Claim your prize at {URL}?ref=sms',
+    f'Claim your prize at {URL}#top',
+    'Claim your prize at HTTP://BIT.LY/abc',
+])
+def test_scan_matches_url_at_boundary(blacklisted_url, text):
+    pytest.importorskip('ahocorasick')
+    assert BlacklistService.scan_text_for_blacklisted_urls(text) == {('url', URL)}
+
+
+@pytest.mark.parametrize('text', [
+    'Claim your prize at http://bit.ly/abcdef',
+    'Claim your prize at http://bit.ly/abc-def',
+    'Claim your prize at HTTP://BIT.LY/ABC',
+])
+def test_scan_ignores_url_prefix_and_path_case(blacklisted_url, text):
+    pytest.importorskip('ahocorasick')
+    assert BlacklistService.scan_text_for_blacklisted_urls(text) == set()
+
+
+def test_scan_keeps_urls_differing_only_in_path_case(app):
+    pytest.importorskip('ahocorasick')
+    DatabaseService.add_to_blacklist('url', 'http://bit.ly/ABC')
+    DatabaseService.add_to_blacklist('url', URL)
+
+    found = BlacklistService.scan_text_for_blacklisted_urls('see http://bit.ly/ABC and http://bit.ly/abc')
+
+    assert found == {('url', 'http://bit.ly/ABC'), ('url', URL)}
+
+
+@pytest.mark.parametrize('message_text', [None, 'Claim your prize at http://bit.ly/abcdef'])
+def test_find_blacklisted_entities_exact_lookup(blacklisted_url, message_text):
+    assert BlacklistService.find_blacklisted_entities(
+        urls=['http://BIT.ly/abc'], message_text=message_text
+    ) == {('url', URL)}
+    assert not BlacklistService.find_blacklisted_entities(
+        urls=['http://bit.ly/abcdef', 'http://bit.ly/ABC'], message_text=message_text
+    )
+
+
+def test_is_entity_blacklisted_matches_single_url_exactly(blacklisted_url):
+    assert BlacklistService.is_entity_blacklisted(url=URL)
+    assert BlacklistService.is_entity_blacklisted(url='HTTP://Bit.ly/abc')
+    assert not BlacklistService.is_entity_blacklisted(url='http://bit.ly/abcdef')
+    assert not BlacklistService.is_entity_blacklisted(url=f'{URL}/more')
+
+
+def test_auto_blacklisted_url_found_without_rebuilding_automaton(app, monkeypatch):
+    pytest.importorskip('ahocorasick')
+    from app.services.database import blacklist
+
+    BlacklistService.scan_text_for_blacklisted_urls('warm up the automaton')
+    BlacklistService.check_and_add_to_blacklist(10, url=URL, commit=False)
+    DatabaseService.commit()
+
+    monkeypatch.setattr(blacklist, 'ahocorasick', None)  # any rebuild would fail
+    assert BlacklistService.find_blacklisted_entities(
+        urls=[URL], message_text=f'Claim at {URL}'
+    ) == {('url', URL)}
@@ -0,0 +1,61 @@
+"""
+Tests for the orjson-backed Flask JSON provider.
+"""
+import json
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+pytest.importorskip('orjson')
+
+PAYLOAD = {
+    'zeta': 1,
+    'alpha': {'when': datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc), 'b': [2, 1], 'a': None},
+    'day': date(2024, 5, 1),
+    'amount': Decimal('10.50'),
+    'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+}
+
+
+def flask_response(app, *args, **kwargs):
+    """Response from Flask's own provider, for comparison."""
+    return DefaultJSONProvider(app).response(*args, **kwargs)
+
+
+@pytest.mark.parametrize('args, kwargs', [
+    ((PAYLOAD,), {}),
+    ((), PAYLOAD),
+    ((1, 'two'), {}),
+    ((), {}),
+])
+def test_response_matches_flask_default(app, args, kwargs):
+    response = app.json.response(*args, **kwargs)
+    expected = flask_response(app, *args, **kwargs)
+
+    assert response.get_data() == expected.get_data()
+    assert response.mimetype == expected.mimetype
+
+
+def test_response_pretty_prints_in_debug(app):
+    app.debug = True
+
+    response = app.json.response(PAYLOAD)
+
+    assert response.get_data() == flask_response(app, PAYLOAD).get_data()
+    assert b'\n  "alpha"' in response.get_data()
+
+
+def test_dumps_matches_flask_default(app):
+    # Same document and key order; only the separator whitespace differs
+    dumped = app.json.dumps(PAYLOAD)
+
+    assert json.loads(dumped) == json.loads(DefaultJSONProvider(app).dumps(PAYLOAD))
+    assert list(json.loads(dumped)) == sorted(PAYLOAD)
+
+
+def test_response_rejects_args_and_kwargs(app):
+    with pytest.raises(TypeError):
+        app.json.response(1, a=2)
@@ -0,0 +1,49 @@
+"""
+Tests for evaluation metrics.
+"""
+import random
+
+import pytest
+
+from app.services.evaluation import metrics as metrics_module
+from app.services.evaluation.metrics import EvaluationMetrics
+
+# Gemini scores are integers 0-10 scaled to 0-1, so ties are the norm
+TIED_SCORES = (0.0, 0.1, 0.2, 0.8, 0.9, 1.0)
+
+
+def build_metrics(seed: int, count: int = 60) -> EvaluationMetrics:
+    rng = random.Random(seed)
+    metrics = EvaluationMetrics(threshold=0.5)
+    for i in range(count):
+        metrics.add_prediction(
+            actual_label=rng.random() < 0.5,
+            predicted_score=rng.choice(TIED_SCORES),
+            message_id=str(i)
+        )
+    return metrics
+
+
+def misclassified_ids(metrics: EvaluationMetrics, limit: int, use_numpy: bool, monkeypatch) -> list:
+    monkeypatch.setattr(metrics_module, 'NUMPY_AVAILABLE', use_numpy)
+    return [record['message_id'] for record in metrics.get_misclassifications(limit=limit)]
+
+
+@pytest.mark.parametrize('limit', [-1, 0, 1, 5, 100])
+def test_misclassifications_numpy_matches_fallback_on_ties(limit, monkeypatch):
+    pytest.importorskip('numpy')
+    for seed in range(50):
+        metrics = build_metrics(seed)
+        assert misclassified_ids(metrics, limit, True, monkeypatch) == \
+            misclassified_ids(metrics, limit, False, monkeypatch)
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_misclassifications_ties_keep_insertion_order(use_numpy, monkeypatch):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    metrics = EvaluationMetrics(threshold=0.5)
+    for i, (label, score) in enumerate([(False, 0.9), (True, 0.0), (False, 1.0), (False, 0.9), (True, 0.1)]):
+        metrics.add_prediction(actual_label=label, predicted_score=score, message_id=str(i))
+
+    assert misclassified_ids(metrics, 4, use_numpy, monkeypatch) == ['1', '2', '0', '3']
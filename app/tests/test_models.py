@@ -0,0 +1,27 @@
+"""
+Tests for models and database services.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql
+
+from app import db
+from app.models import ScamLog, utcnow
+from app.services.database.models import DatabaseService
+
+
+def test_utcnow_pinned_to_utc_on_postgresql():
+    assert str(utcnow().compile(dialect=postgresql.dialect())) == "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
+def test_recent_scam_logs_use_utc_cutoff(app):
+    DatabaseService.save_scam_log('+254711000001', 'new scam', 9)
+    old = DatabaseService.save_scam_log('+254711000001', 'old scam', 9)
+    old.timestamp = datetime.utcnow() - timedelta(hours=25)
+    db.session.commit()
+
+    recent = DatabaseService.get_recent_scam_logs(hours=24)
+
+    assert [log.message_text for log in recent] == ['new scam']
+    assert DatabaseService.count_recent_scam_logs(hours=24) == 1
+    assert abs(db.session.get(ScamLog, recent[0].id).timestamp - datetime.utcnow()) < timedelta(minutes=1)
@@ -0,0 +1,177 @@
+"""
+Tests for the SMS webhook route.
+"""
+import hashlib
+import hmac
+
+import pytest
+
+from app.routes import sms_webhook
+from app.services.africas_talking.sms_service import SMSService
+from app.services.database.blacklist import BlacklistService
+from app.services.database.models import DatabaseService
+from app.utils.security import SecurityPolicy
+
+SECRET = 'test-webhook-secret'
+REPORTER = '+254711000001'
+
+
+def sign(form):
+    """Sign form data the way verify_webhook_signature_from_request expects."""
+    payload = '&'.join(f'{key}={form[key]}' for key in sorted(form)).encode('utf-8')
+    return hmac.new(SECRET.encode('utf-8'), payload, hashlib.sha256).hexdigest()
+
+
+def post_report(client, **form):
+    """POST a signed SMS webhook request."""
+    return client.post('/webhook/sms', data=form, headers={'X-Webhook-Signature': sign(form)})
+
+
+class FakeSMSService:
+    """SMSService that records replies instead of calling Africa's Talking."""
+
+    parse_webhook_data = SMSService.parse_webhook_data
+
+    def __init__(self):
+        self.sent = []
+
+    def send_sms(self, message, recipients, sender_id=None):
+        self.sent.append((message, recipients))
+        return {'status': 'success'}
+
+
+class FakeAnalyzer:
+    """Analyzer returning a fixed verdict and counting calls."""
+
+    def __init__(self, score):
+        self.score = score
+        self.calls = 0
+
+    def analyze_message(self, message_text, sender=None, urls=None, phones=None):
+        self.calls += 1
+        return {'score': self.score, 'summary': 'Prize scam', 'lesson': 'Never pay to claim a prize.'}
+
+
+@pytest.fixture
+def sms_service():
+    return FakeSMSService()
+
+
+@pytest.fixture
+def analyzer():
+    return FakeAnalyzer(score=10)
+
+
+@pytest.fixture
+def client(app, monkeypatch, sms_service, analyzer):
+    """Test client with signature and replay checks on, IP whitelist off."""
+    monkeypatch.setattr(sms_webhook, 'init_services', lambda: (sms_service, analyzer, None))
+    app.extensions['sec_policy'] = SecurityPolicy.from_config({
+        'AT_WEBHOOK_SECRET': SECRET,
+        'ENABLE_IP_WHITELIST': False,
+    })
+    return app.test_client()
+
+
+@pytest.fixture
+def queued(app, monkeypatch):
+    """Record reports handed to the background executor instead of running them."""
+    submitted = []
+    monkeypatch.setattr(
+        app.extensions['executor'], 'submit', lambda fn, *args: submitted.append(args)
+    )
+    return submitted
+
+
+def test_unsigned_request_rejected(client, queued):
+    response = client.post('/webhook/sms', data={'from': REPORTER, 'text': 'hi'})
+
+    assert response.status_code == 401
+    assert not queued
+
+
+def test_missing_fields_do_not_spend_nonce(client, queued):
+    response = post_report(client, id='at-1', **{'from': REPORTER})
+    assert response.status_code == 400
+    assert 'text' in response.get_json()['error']
+
+    # The corrected retry reuses the request ID and must not look like a replay
+    response = post_report(client, id='at-1', text='Win KES 10,000 now', **{'from': REPORTER})
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'queued'}
+    assert len(queued) == 1
+
+
+def test_replayed_request_rejected(client, queued):
+    form = {'id': 'at-2', 'from': REPORTER, 'text': 'Win KES 10,000 now'}
+
+    assert post_report(client, **form).status_code == 200
+    assert post_report(client, **form).status_code == 409
+    assert len(queued) == 1
+
+
+@pytest.fixture
+def background(app, monkeypatch):
+    """Run queued reports on the real executor; returns a function awaiting them."""
+    executor = app.extensions['executor']
+    submit = executor.submit
+    futures = []
+    monkeypatch.setattr(executor, 'submit', lambda *args: futures.append(submit(*args)))
+
+    def wait():
+        for future in futures:
+            future.result(timeout=10)
+    return wait
+
+
+SCAM_TEXT = 'From 0722000111: You won KES 50,000! Claim at http://bit.ly/abc today'
+SCAM_SENDER = '+254722000111'
+
+
+def test_queued_report_is_analyzed_saved_and_blacklisted(client, background, sms_service, analyzer):
+    response = post_report(client, id='at-3', text=SCAM_TEXT, **{'from': REPORTER})
+    assert response.get_json() == {'status': 'queued'}
+    background()
+
+    assert analyzer.calls == 1
+    assert [recipients for _, recipients in sms_service.sent] == [[REPORTER]]
+    assert DatabaseService.count_recent_scam_logs() == 1
+    assert BlacklistService.find_blacklisted_entities(
+        phone_number=SCAM_SENDER, urls=['http://bit.ly/abc']
+    ) == {('phone', SCAM_SENDER), ('url', 'http://bit.ly/abc')}
+
+    # A different message from the same sender is answered without analysis
+    post_report(client, id='at-4', text='From 0722000111: Send KES 100 to unlock', **{'from': REPORTER})
+    background()
+
+    assert analyzer.calls == 1
+    assert 'already blacklisted' in sms_service.sent[-1][0]
+
+
+def test_queued_report_below_threshold_not_blacklisted(client, background, sms_service, analyzer):
+    analyzer.score = 3
+
+    post_report(client, id='at-5', text=SCAM_TEXT, **{'from': REPORTER})
+    background()
+
+    assert len(sms_service.sent) == 1
+    assert DatabaseService.count_recent_scam_logs() == 1
+    assert not BlacklistService.is_entity_blacklisted(phone_number=SCAM_SENDER)
+
+
+def test_queued_report_failed_commit_leaves_sender_unlisted(
+    client, background, failing_commit, sms_service, analyzer
+):
+    post_report(client, id='at-6', text=SCAM_TEXT, **{'from': REPORTER})
+    background()
+
+    assert not sms_service.sent
+    assert DatabaseService.count_recent_scam_logs() == 0
+
+    # The retry is analyzed again instead of hitting a stale cached entry
+    post_report(client, id='at-7', text=SCAM_TEXT, **{'from': REPORTER})
+    background()
+
+    assert analyzer.calls == 2
+    assert 'already blacklisted' not in sms_service.sent[-1][0]
+    assert BlacklistService.is_entity_blacklisted(phone_number=SCAM_SENDER)
@@ -0,0 +1,42 @@
+"""
+Tests for input validation utilities.
+"""
+import pytest
+
+from app.utils.validators import extract_urls_and_phones, normalize_phone_number, normalize_url
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('+254712345678', '+254712345678'),
+    ('0712 345 678', '+254712345678'),
+    ('(0712)-345-678', '+254712345678'),
+    ('0712 345 678', '+254712345678'),
+    ('712345678', '+254712345678'),
+    ('', ''),
+])
+def test_normalize_phone_number(raw, expected):
+    assert normalize_phone_number(raw) == expected
+
+
+@pytest.mark.parametrize('raw', [
+    ' 13٧(3885٠162',    # Arabic-Indic 7 and 0 among ASCII digits
+    '٠712345678',            # Arabic-Indic leading zero
+    '٠٧١٢٣٤٥٦٧٨',  # all Arabic-Indic
+    '０712345678',            # fullwidth leading zero
+    '０７１２３４５６７８',  # all fullwidth
+])
+def test_normalize_phone_number_rejects_non_ascii_digits(raw):
+    assert normalize_phone_number(raw) == ''
+
+
+def test_extract_phones_ignores_non_ascii_digits():
+    assert extract_urls_and_phones('Call ٠712345678 or 0722000111') == ([], ['+254722000111'])
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('HTTP://BIT.LY/AbC', 'http://bit.ly/AbC'),
+    ('https://Example.com:8080?Q=1', 'https://example.com:8080?Q=1'),
+    ('http://bit.ly/abc', 'http://bit.ly/abc'),
+])
+def test_normalize_url_lowercases_scheme_and_host_only(raw, expected):
+    assert normalize_url(raw) == expected
@@ -1,13 +1,38 @@
 """
 Message formatting utilities.
 """
+from functools import lru_cache
 from typing import Optional
 
+SMS_MAX_LENGTH = 160
 
+# (emoji, severity) for scores 0-10: below 5 low risk, 5-7 suspicious, 8+ high risk
+_SEVERITY_BY_SCORE = (
+    (("✅", "LOW RISK"),) * 5
+    + (("⚠️", "SUSPICIOUS"),) * 3
+    + (("🚨", "HIGH RISK"),) * 3
+)
+
+# Fixed parts of alert messages, with the room left for the variable parts
+_CAMPAIGN_PREFIX = "🚨 SCAM ALERT: "
+_CAMPAIGN_MIDDLE = " detected. "
+_CAMPAIGN_TAIL = "+ reports. Stay safe! #CyberSecurityKenya"
+_CAMPAIGN_NAME_BUDGET = SMS_MAX_LENGTH - len(_CAMPAIGN_PREFIX) - len(_CAMPAIGN_MIDDLE) - len(_CAMPAIGN_TAIL)
+
+_BLOCKED_PHONE_PREFIX = "⚠️ Number "
+_BLOCKED_URL_PREFIX = "⚠️ Link "
+_BLOCKED_SUFFIX = " has been blocked due to scam activity."
+_BLOCKED_PHONE_BUDGET = SMS_MAX_LENGTH - len(_BLOCKED_PHONE_PREFIX) - len(_BLOCKED_SUFFIX)
+
+
+@lru_cache(maxsize=1024)
 def format_analysis_response(score: int, summary: str, lesson: Optional[str] = None) -> str:
     """
     Format analysis response for SMS (max 160 characters).
 
+    Results are cached, since repeat reports of a campaign produce the
+    same analysis.
+
     Args:
         score: Danger score (1-10)
         summary: Short summary
@@ -17,35 +42,28 @@ def format_analysis_response(score: int, summary: str, lesson: Optional[str] = N
         Formatted message (max 160 chars)
     """
     # Base message
-    if score >= 8:
-        emoji = "🚨"
-        severity = "HIGH RISK"
-    elif score >= 5:
-        emoji = "⚠️"
-        severity = "SUSPICIOUS"
-    else:
-        emoji = "✅"
-        severity = "LOW RISK"
-
+    emoji, severity = _SEVERITY_BY_SCORE[min(max(int(score), 0), 10)]
     message = f"{emoji} {severity}: {summary} Score: {score}/10"
 
-    # Add lesson if provided and space allows
-    if lesson and len(message) + len(lesson) + 3 <= 160:
-        message += f" | {lesson}"
-    elif lesson:
-        # Truncate lesson if needed
-        available = 160 - len(message) - 3
-        if available > 10:
+    # Add lesson if provided, truncated if needed to fit
+    if lesson:
+        available = SMS_MAX_LENGTH - len(message) - 3
+        if len(lesson) <= available:
+            message += f" | {lesson}"
+        elif available > 10:
             message += f" | {lesson[:available]}"
 
     # Ensure we don't exceed 160 characters
-    return message[:160]
+    return message[:SMS_MAX_LENGTH]
 
 
 def format_campaign_alert(campaign_name: str, affected_count: int) -> str:
     """
     Format campaign alert message.
 
+    A long campaign name is shortened so the report count and hashtag
+    always fit.
+
     Args:
         campaign_name: Name of the campaign
         affected_count: Number of affected users
@@ -53,8 +71,11 @@ def format_campaign_alert(campaign_name: str, affected_count: int) -> str:
     Returns:
         Formatted alert message
     """
-    message = f"🚨 SCAM ALERT: {campaign_name} detected. {affected_count}+ reports. Stay safe! #CyberSecurityKenya"
-    return message[:160]
+    count = str(affected_count)
+    available = _CAMPAIGN_NAME_BUDGET - len(count)
+    if len(campaign_name) > available:
+        campaign_name = campaign_name[:max(available, 0)]
+    return ''.join((_CAMPAIGN_PREFIX, campaign_name, _CAMPAIGN_MIDDLE, count, _CAMPAIGN_TAIL))[:SMS_MAX_LENGTH]
 
 
 def format_blacklist_notification(entity_type: str, entity_value: str) -> str:
@@ -69,11 +90,8 @@ def format_blacklist_notification(entity_type: str, entity_value: str) -> str:
         Formatted notification message
     """
     if entity_type == 'phone':
-        message = f"⚠️ Number {entity_value} has been blocked due to scam activity."
-    else:
-        # Truncate URL if too long
-        display_url = entity_value[:50] + "..." if len(entity_value) > 50 else entity_value
-        message = f"⚠️ Link {display_url} has been blocked due to scam activity."
-
-    return message[:160]
+        return ''.join((_BLOCKED_PHONE_PREFIX, entity_value[:_BLOCKED_PHONE_BUDGET], _BLOCKED_SUFFIX))
 
+    # Truncate URL if too long; the result always fits in one SMS
+    display_url = entity_value[:50] + "..." if len(entity_value) > 50 else entity_value
+    return ''.join((_BLOCKED_URL_PREFIX, display_url, _BLOCKED_SUFFIX))
@@ -3,25 +3,228 @@ Security utilities for webhook protection.
 """
 import hmac
 import hashlib
+import ipaddress
+import socket
+import threading
 import time
-import hashlib as hash_lib
+from bisect import bisect_right
+from dataclasses import dataclass
 from functools import wraps
-from typing import Optional, List
+from typing import Callable, Iterable, Optional, List, FrozenSet, Tuple, Union
 from flask import request, jsonify, current_app
-from collections import defaultdict
+from collections import deque
 import logging
 
-logger = logging.getLogger(__name__)
+from app.utils.cache import TTLCache
 
-# Simple in-memory rate limiter (use Redis in production)
-_rate_limit_store = defaultdict(list)
+logger = logging.getLogger(__name__)
 
-# Replay attack prevention - store seen nonces/timestamps
-_seen_nonces = set()
+# Both stores are split into shards, each with its own lock, so concurrent
+# worker threads rarely wait on each other
+_STORE_SHARDS = 16
+
+# Simple in-memory rate limiter (use Redis in production): per client, a
+# ring buffer of the monotonic times of its last max_per_minute requests
+_RATE_LIMIT_WINDOW_SECONDS = 60
+_rate_limit_shards = [({}, threading.Lock()) for _ in range(_STORE_SHARDS)]
+
+# Replay attack prevention - bounded store of seen nonce hashes
+_NONCE_CACHE_SIZE = 100_000
+_NONCE_TTL_SECONDS = 3600
+_seen_nonce_shards = [
+    TTLCache(maxsize=_NONCE_CACHE_SIZE // _STORE_SHARDS, ttl=_NONCE_TTL_SECONDS)
+    for _ in range(_STORE_SHARDS)
+]
 _replay_window_seconds = 300  # 5 minutes
 
+# Webhook signatures are hex-encoded HMAC-SHA256 digests
+_SIGNATURE_DIGEST_SIZE = hashlib.sha256().digest_size
+
+# Bound once; register_nonce runs on every webhook
+_blake2b = hashlib.blake2b
+
+# Used by ip_whitelist() when AT_WEBHOOK_IP_WHITELIST is empty
+DEFAULT_WEBHOOK_IP_WHITELIST = (
+    '54.75.249.0/24',  # Example - check AT docs for actual IPs
+    '54.75.250.0/24',
+)
+
+
+def _parse_ip_whitelist(entries: Iterable[str]) -> Tuple[Tuple, FrozenSet, Tuple]:
+    """
+    Pre-parse whitelist entries for matching.
+
+    IPv4 entries become merged, sorted integer ranges searched with bisect;
+    IPv6 entries are kept as single addresses and networks.
+
+    Args:
+        entries: IP addresses or CIDR blocks
+
+    Returns:
+        Tuple of ((IPv4 range starts, IPv4 range ends), IPv6 addresses,
+        IPv6 networks); invalid entries are skipped
+    """
+    v4_ranges = []
+    hosts = set()
+    networks = []
+    for entry in entries:
+        try:
+            network = ipaddress.ip_network(entry, strict=False)
+        except ValueError:
+            logger.error(f"Ignoring invalid IP whitelist entry: {entry}")
+            continue
+        if network.version == 4:
+            v4_ranges.append((int(network.network_address), int(network.broadcast_address)))
+        elif network.num_addresses == 1:
+            hosts.add(network.network_address)
+        else:
+            networks.append(network)
+
+    # Merge overlapping and adjacent ranges so each address falls in at most one
+    starts, ends = [], []
+    for start, end in sorted(v4_ranges):
+        if ends and start <= ends[-1] + 1:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+
+    return (tuple(starts), tuple(ends)), frozenset(hosts), tuple(networks)
+
+
+def _ip_matches(ip: str, exact: FrozenSet[str], v4_ranges: Tuple, hosts: FrozenSet, networks: Tuple) -> bool:
+    """Match an IP against a pre-parsed whitelist, trying the raw string first."""
+    if ip in exact:
+        return True
+
+    try:
+        packed = socket.inet_pton(socket.AF_INET, ip)
+    except (OSError, TypeError):
+        packed = None
+    if packed is not None:
+        starts, ends = v4_ranges
+        value = int.from_bytes(packed, 'big')
+        index = bisect_right(starts, value) - 1
+        return index >= 0 and value <= ends[index]
+
+    try:
+        ip_obj = ipaddress.ip_address(ip)
+    except ValueError:
+        logger.error(f"Error checking IP whitelist: invalid address {ip!r}")
+        return False
+
+    if ip_obj in hosts:
+        return True
+    return any(ip_obj in network for network in networks)
+
+
+def build_ip_matcher(allowed_ips: Iterable[str]) -> Callable[[str], bool]:
+    """
+    Parse an IP whitelist once and return a function that checks addresses.
+
+    Args:
+        allowed_ips: IP addresses or CIDR blocks
+
+    Returns:
+        Function taking an IP string and returning True if it is allowed
+    """
+    exact = frozenset(allowed_ips)
+    v4_ranges, hosts, networks = _parse_ip_whitelist(exact)
+    return lambda ip: _ip_matches(ip, exact, v4_ranges, hosts, networks)
+
+
+@dataclass(frozen=True, slots=True)
+class SecurityPolicy:
+    """Webhook security settings resolved once from app config."""
+    webhook_secret: str = ''
+    # UTF-8 encoded secret, used as the HMAC key
+    webhook_secret_key: bytes = b''
+    verify_signature: bool = True
+    ip_whitelist_enabled: bool = True
+    ip_whitelist: FrozenSet[str] = frozenset()
+    replay_protection: bool = True
+    rate_limit_per_minute: int = 10
+    # Pre-parsed whitelist: sorted IPv4 integer ranges for bisect; IPv6
+    # single addresses for hash lookup and CIDR blocks for scanning
+    ip_whitelist_v4_ranges: Tuple = ((), ())
+    ip_whitelist_hosts: FrozenSet = frozenset()
+    ip_whitelist_networks: Tuple = ()
+
+    @classmethod
+    def from_config(cls, config) -> 'SecurityPolicy':
+        """
+        Build a policy from a Flask config mapping.
+
+        Args:
+            config: Flask app config
+
+        Returns:
+            SecurityPolicy instance
+        """
+        ip_whitelist = frozenset(config.get('AT_WEBHOOK_IP_WHITELIST', ()))
+        v4_ranges, hosts, networks = _parse_ip_whitelist(ip_whitelist)
+
+        webhook_secret = config.get('AT_WEBHOOK_SECRET', '')
+        return cls(
+            webhook_secret=webhook_secret,
+            webhook_secret_key=webhook_secret.encode('utf-8'),
+            verify_signature=config.get('ENABLE_WEBHOOK_SIGNATURE', True),
+            ip_whitelist_enabled=config.get('ENABLE_IP_WHITELIST', True),
+            ip_whitelist=ip_whitelist,
+            replay_protection=config.get('ENABLE_REPLAY_PROTECTION', True),
+            rate_limit_per_minute=config.get('RATE_LIMIT_PER_MINUTE', 10),
+            ip_whitelist_v4_ranges=v4_ranges,
+            ip_whitelist_hosts=hosts,
+            ip_whitelist_networks=networks
+        )
+
+    def allows_ip(self, ip: str) -> bool:
+        """
+        Check a client IP against the pre-parsed whitelist.
+
+        Args:
+            ip: Client IP address
+
+        Returns:
+            True if IP is allowed
+        """
+        return _ip_matches(
+            ip, self.ip_whitelist, self.ip_whitelist_v4_ranges,
+            self.ip_whitelist_hosts, self.ip_whitelist_networks
+        )
+
+
+def get_client_ip() -> Optional[str]:
+    """
+    Get the client IP, honouring the first X-Forwarded-For hop if behind a proxy.
+
+    Returns:
+        Client IP address string
+    """
+    forwarded_for = request.headers.get('X-Forwarded-For')
+    if forwarded_for:
+        return forwarded_for.partition(',')[0].strip()
+    return request.remote_addr
 
-def verify_webhook_signature(signature: str, payload: str, secret: str) -> bool:
+
+def register_nonce(nonce: str) -> bool:
+    """
+    Record a request nonce for replay protection.
+
+    Args:
+        nonce: Unique request ID (e.g. Africa's Talking 'id' or 'linkId')
+
+    Returns:
+        True if the nonce is new, False if it was already seen (replay)
+    """
+    # Dedup keys only need collision resistance, so a 16-byte BLAKE2b digest
+    # kept as raw bytes is enough and cheaper than SHA-256 hex
+    nonce_hash = _blake2b(nonce.encode(), digest_size=16).digest()
+    # The digest is uniformly distributed, so its first byte picks the shard
+    return _seen_nonce_shards[nonce_hash[0] % _STORE_SHARDS].add(nonce_hash)
+
+
+def verify_webhook_signature(signature: str, payload: bytes, secret: Union[str, bytes]) -> bool:
     """
     Verify webhook signature using HMAC-SHA256.
 
@@ -32,8 +235,8 @@ def verify_webhook_signature(signature: str, payload: str, secret: str) -> bool:
 
     Args:
         signature: Signature from request headers
-        payload: Request payload (raw body or form data)
-        secret: Secret key for verification
+        payload: Request payload bytes (raw body or form data)
+        secret: Secret key for verification, str or pre-encoded bytes
 
     Returns:
         True if signature is valid
@@ -42,21 +245,28 @@ def verify_webhook_signature(signature: str, payload: str, secret: str) -> bool:
         return False
 
     try:
-        # Calculate expected signature
-        expected = hmac.new(
-            secret.encode('utf-8'),
-            payload.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
+        received = bytes.fromhex(signature)
+    except ValueError:
+        return False
+    # Reject anything that is not a SHA-256 digest before the constant-time
+    # compare; the length is fixed by the protocol, so this leaks nothing
+    if len(received) != _SIGNATURE_DIGEST_SIZE:
+        return False
+
+    try:
+        key = secret.encode('utf-8') if isinstance(secret, str) else secret
+
+        # One-shot HMAC; compare raw digests rather than hex strings
+        expected = hmac.digest(key, payload, 'sha256')
 
         # Use constant-time comparison to prevent timing attacks
-        return hmac.compare_digest(signature, expected)
+        return hmac.compare_digest(received, expected)
     except Exception as e:
         logger.error(f"Error verifying signature: {e}")
         return False
 
 
-def verify_webhook_signature_from_request(secret: str) -> bool:
+def verify_webhook_signature_from_request(secret: Union[str, bytes]) -> bool:
     """
     Verify webhook signature from Flask request.
 
@@ -66,7 +276,7 @@ def verify_webhook_signature_from_request(secret: str) -> bool:
     - Authorization: Bearer <token>
 
     Args:
-        secret: Secret key from config
+        secret: Secret key from config, str or pre-encoded bytes
 
     Returns:
         True if signature is valid
@@ -83,26 +293,25 @@ def verify_webhook_signature_from_request(secret: str) -> bool:
     )
 
     # Check Authorization header (Bearer token)
-    auth_header = request.headers.get('Authorization', '')
-    if auth_header.startswith('Bearer '):
-        signature = signature or auth_header.replace('Bearer ', '')
+    if not signature:
+        auth_header = request.headers.get('Authorization', '')
+        if auth_header.startswith('Bearer '):
+            signature = auth_header[7:].strip()
 
     if not signature:
         logger.warning("No signature found in request headers")
         return False
 
-    # Get raw payload
+    # Get raw payload as bytes
     # For form-encoded data (Africa's Talking uses this)
-    if request.form:
-        # Reconstruct form data as string for signature verification
-        payload_parts = []
-        for key in sorted(request.form.keys()):
-            payload_parts.append(f"{key}={request.form[key]}")
-        payload = "&".join(payload_parts)
-    elif request.data:
-        payload = request.data.decode('utf-8')
+    form = request.form
+    if form:
+        # Reconstruct form data for signature verification
+        payload = b"&".join(
+            f"{key}={form[key]}".encode('utf-8') for key in sorted(form.keys())
+        )
     else:
-        payload = ""
+        payload = request.get_data(cache=True)
 
     return verify_webhook_signature(signature, payload, secret)
 
@@ -137,18 +346,9 @@ def prevent_replay_attack(nonce_field: str = 'id', timestamp_field: str = 'date'
                 timestamp_str = request.json.get(timestamp_field)
 
             # Check if nonce already seen
-            if nonce:
-                nonce_hash = hash_lib.sha256(nonce.encode()).hexdigest()
-                if nonce_hash in _seen_nonces:
-                    logger.warning(f"Replay attack detected: duplicate nonce {nonce[:10]}...")
-                    return jsonify({'error': 'Duplicate request detected'}), 409
-
-                # Add to seen nonces
-                _seen_nonces.add(nonce_hash)
-
-                # Clean old nonces (simple cleanup - use Redis in production)
-                if len(_seen_nonces) > 10000:
-                    _seen_nonces.clear()
+            if nonce and not register_nonce(nonce):
+                logger.warning(f"Replay attack detected: duplicate nonce {nonce[:10]}...")
+                return jsonify({'error': 'Duplicate request detected'}), 409
 
             # Check timestamp if provided
             if timestamp_str:
@@ -192,34 +392,22 @@ def ip_whitelist(allowed_ips: Optional[List[str]] = None):
     Returns:
         Decorator function
     """
+    # Explicit lists are parsed once here; the config list once per app
+    matcher = build_ip_matcher(allowed_ips) if allowed_ips is not None else None
+
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Get allowed IPs from config if not provided
-            ips_to_check = allowed_ips
-            if ips_to_check is None:
-                config_ips = current_app.config.get('AT_WEBHOOK_IP_WHITELIST', [])
-                if not config_ips:
-                    # Default Africa's Talking IP ranges (update with actual IPs)
-                    config_ips = [
-                        '54.75.249.0/24',  # Example - check AT docs for actual IPs
-                        '54.75.250.0/24',
-                    ]
-                ips_to_check = config_ips
-
             # If whitelist is disabled, allow all
-            if not current_app.config.get('ENABLE_IP_WHITELIST', True):
+            if not current_app.extensions['sec_policy'].ip_whitelist_enabled:
                 return f(*args, **kwargs)
 
-            # Get client IP
-            client_ip = request.remote_addr
-
-            # Check X-Forwarded-For header (if behind proxy)
-            if request.headers.get('X-Forwarded-For'):
-                client_ip = request.headers.get('X-Forwarded-For').split(',')[0].strip()
+            # Get client IP (X-Forwarded-For aware)
+            client_ip = get_client_ip()
 
             # Check if IP is in whitelist
-            if not _is_ip_allowed(client_ip, ips_to_check):
+            is_allowed = matcher or current_app.extensions['ip_matcher']
+            if not is_allowed(client_ip):
                 logger.warning(f"IP whitelist violation: {client_ip}")
                 return jsonify({'error': 'Unauthorized'}), 403
 
@@ -228,39 +416,6 @@ def ip_whitelist(allowed_ips: Optional[List[str]] = None):
     return decorator
 
 
-def _is_ip_allowed(ip: str, allowed_ips: list) -> bool:
-    """
-    Check if IP address is in allowed list (supports CIDR).
-
-    Args:
-        ip: IP address to check
-        allowed_ips: List of allowed IPs or CIDR blocks
-
-    Returns:
-        True if IP is allowed
-    """
-    import ipaddress
-
-    try:
-        ip_obj = ipaddress.ip_address(ip)
-
-        for allowed in allowed_ips:
-            if '/' in allowed:
-                # CIDR block
-                network = ipaddress.ip_network(allowed, strict=False)
-                if ip_obj in network:
-                    return True
-            else:
-                # Single IP
-                if ip == allowed:
-                    return True
-    except Exception as e:
-        logger.error(f"Error checking IP whitelist: {e}")
-        return False
-
-    return False
-
-
 def rate_limit(max_per_minute: int = 10):
     """
     Rate limiting decorator.
@@ -279,27 +434,46 @@ def rate_limit(max_per_minute: int = 10):
             if 'from' in request.form:
                 client_id = request.form.get('from')
 
-            # Clean old entries (older than 1 minute)
-            current_time = time.time()
-            _rate_limit_store[client_id] = [
-                timestamp for timestamp in _rate_limit_store[client_id]
-                if current_time - timestamp < 60
-            ]
-
-            # Check rate limit
-            if len(_rate_limit_store[client_id]) >= max_per_minute:
+            # Check rate limit and record this request
+            if not _allow_request(client_id, max_per_minute):
                 return jsonify({
                     'error': 'Rate limit exceeded. Please try again later.'
                 }), 429
 
-            # Record this request
-            _rate_limit_store[client_id].append(current_time)
-
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
 
+def _allow_request(client_id: str, max_per_minute: int) -> bool:
+    """
+    Record a request if the client is under its per-minute limit.
+
+    Args:
+        client_id: Client identifier (IP or phone number)
+        max_per_minute: Maximum requests per minute
+
+    Returns:
+        True if the request is allowed
+    """
+    if max_per_minute <= 0:
+        return False
+
+    store, lock = _rate_limit_shards[hash(client_id) % _STORE_SHARDS]
+    with lock:
+        now = time.monotonic()
+        window = store.get(client_id)
+        if window is None or window.maxlen != max_per_minute:
+            window = store[client_id] = deque(window or (), maxlen=max_per_minute)
+
+        # Full buffer whose oldest entry is still inside the window: over the limit
+        if len(window) == max_per_minute and now - window[0] < _RATE_LIMIT_WINDOW_SECONDS:
+            return False
+
+        window.append(now)
+        return True
+
+
 def validate_request_data(required_fields: list):
     """
     Validate that required fields are present in request.
@@ -313,21 +487,77 @@ def validate_request_data(required_fields: list):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            missing_fields = []
-            for field in required_fields:
-                if field not in request.form and field not in request.json:
-                    missing_fields.append(field)
-
-            if missing_fields:
-                return jsonify({
-                    'error': f'Missing required fields: {", ".join(missing_fields)}'
-                }), 400
+            error = _check_required_fields(required_fields)
+            if error is not None:
+                return error
 
             return f(*args, **kwargs)
+        # Read by webhook_security_hook, which validates before the replay check
+        decorated_function.required_fields = tuple(required_fields)
         return decorated_function
     return decorator
 
 
+def _check_required_fields(required_fields: Iterable[str]):
+    """Return a 400 response naming missing request fields, or None."""
+    # Read fields from the form, and only parse JSON when there is none
+    source = request.form or request.get_json(silent=True) or {}
+    missing_fields = [field for field in required_fields if field not in source]
+
+    if missing_fields:
+        return jsonify({
+            'error': f'Missing required fields: {", ".join(missing_fields)}'
+        }), 400
+    return None
+
+
+def webhook_security_hook():
+    """
+    Run the webhook security checks before the view, as a before_request hook.
+
+    Register on a webhook blueprint with bp.before_request(webhook_security_hook).
+    Applies, in order: signature verification, IP whitelist, the view's
+    validate_request_data fields, replay prevention, each as enabled by the
+    app's SecurityPolicy. Fields are checked before the nonce is recorded,
+    so a malformed request does not turn its corrected retry into a replay.
+
+    Returns:
+        Error response that ends the request, or None if all checks pass
+    """
+    policy = current_app.extensions['sec_policy']
+
+    # Verify signature if enabled and secret is configured
+    if policy.webhook_secret_key and policy.verify_signature:
+        if not verify_webhook_signature_from_request(policy.webhook_secret_key):
+            logger.warning("Webhook signature verification failed")
+            return jsonify({'error': 'Invalid signature'}), 401
+
+    # Check IP whitelist if enabled
+    if policy.ip_whitelist_enabled and policy.ip_whitelist:
+        client_ip = get_client_ip()
+        if not policy.allows_ip(client_ip):
+            logger.warning("IP whitelist violation: %s", client_ip)
+            return jsonify({'error': 'Unauthorized IP'}), 403
+
+    # Reject incomplete requests before their nonce is spent
+    view = current_app.view_functions.get(request.endpoint)
+    required_fields = getattr(view, 'required_fields', ())
+    if required_fields:
+        error = _check_required_fields(required_fields)
+        if error is not None:
+            return error
+
+    # Replay attack prevention
+    if policy.replay_protection:
+        form = request.form
+        request_id = form.get('id') or form.get('linkId', '')
+        if request_id and not register_nonce(request_id):
+            logger.warning("Replay attack detected: %.10s...", request_id)
+            return jsonify({'error': 'Duplicate request detected'}), 409
+
+    return None
+
+
 def require_webhook_security():
     """
     Combined security decorator for webhooks.
@@ -339,52 +569,36 @@ def require_webhook_security():
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Get webhook secret from config
-            webhook_secret = current_app.config.get('AT_WEBHOOK_SECRET', '')
+            # Settings resolved once when the app was created
+            policy = current_app.extensions['sec_policy']
+            form = request.form
 
             # Verify signature if secret is configured
-            if webhook_secret and current_app.config.get('ENABLE_WEBHOOK_SIGNATURE', True):
-                if not verify_webhook_signature_from_request(webhook_secret):
+            if policy.webhook_secret_key and policy.verify_signature:
+                if not verify_webhook_signature_from_request(policy.webhook_secret_key):
                     logger.warning("Webhook signature verification failed")
                     return jsonify({'error': 'Invalid signature'}), 401
 
             # Apply replay prevention
-            nonce = request.form.get('id') or request.form.get('linkId') or ''
-            if nonce:
-                nonce_hash = hash_lib.sha256(nonce.encode()).hexdigest()
-                if nonce_hash in _seen_nonces:
-                    logger.warning(f"Replay attack detected: {nonce[:10]}...")
-                    return jsonify({'error': 'Duplicate request'}), 409
-                _seen_nonces.add(nonce_hash)
+            nonce = form.get('id') or form.get('linkId') or ''
+            if nonce and not register_nonce(nonce):
+                logger.warning(f"Replay attack detected: {nonce[:10]}...")
+                return jsonify({'error': 'Duplicate request'}), 409
 
             # Apply IP whitelist
-            if current_app.config.get('ENABLE_IP_WHITELIST', True):
-                allowed_ips_list = current_app.config.get('AT_WEBHOOK_IP_WHITELIST', [])
-                if allowed_ips_list:
-                    client_ip = request.remote_addr
-                    if request.headers.get('X-Forwarded-For'):
-                        client_ip = request.headers.get('X-Forwarded-For').split(',')[0].strip()
+            if policy.ip_whitelist_enabled and policy.ip_whitelist:
+                client_ip = get_client_ip()
 
-                    if not _is_ip_allowed(client_ip, allowed_ips_list):
-                        logger.warning(f"IP whitelist violation: {client_ip}")
-                        return jsonify({'error': 'Unauthorized'}), 403
+                if not policy.allows_ip(client_ip):
+                    logger.warning(f"IP whitelist violation: {client_ip}")
+                    return jsonify({'error': 'Unauthorized'}), 403
 
             # Apply rate limiting
-            client_id = request.remote_addr
-            if 'from' in request.form:
-                client_id = request.form.get('from')
-
-            current_time = time.time()
-            _rate_limit_store[client_id] = [
-                ts for ts in _rate_limit_store[client_id]
-                if current_time - ts < 60
-            ]
+            client_id = form.get('from') if 'from' in form else request.remote_addr
 
-            if len(_rate_limit_store[client_id]) >= current_app.config.get('RATE_LIMIT_PER_MINUTE', 10):
+            if not _allow_request(client_id, policy.rate_limit_per_minute):
                 return jsonify({'error': 'Rate limit exceeded'}), 429
 
-            _rate_limit_store[client_id].append(current_time)
-
             return f(*args, **kwargs)
         return decorated_function
     return decorator
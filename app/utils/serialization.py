@@ -0,0 +1,86 @@
+"""
+JSON serialization helpers.
+
+Uses orjson when installed and falls back to the standard library otherwise.
+"""
+import json
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def dumps(obj: Any, sort_keys: bool = False, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """
+    Serialize an object to a JSON string.
+
+    Args:
+        obj: JSON-serializable object
+        sort_keys: Sort dictionary keys
+        default: Called for objects that cannot be serialized natively, as
+            with json.dumps; datetimes and dates are passed to it as well
+
+    Returns:
+        JSON text
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=default, option=_orjson_option(sort_keys, default)).decode('utf-8')
+    return json.dumps(obj, sort_keys=sort_keys, default=default)
+
+
+def dumps_bytes(
+    obj: Any,
+    indent: bool = False,
+    sort_keys: bool = False,
+    default: Optional[Callable[[Any], Any]] = None
+) -> bytes:
+    """
+    Serialize an object to UTF-8 encoded JSON.
+
+    Args:
+        obj: JSON-serializable object
+        indent: Pretty-print with two-space indentation
+        sort_keys: Sort dictionary keys
+        default: Called for objects that cannot be serialized natively, as
+            with json.dumps; datetimes and dates are passed to it as well
+
+    Returns:
+        JSON bytes
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY | _orjson_option(sort_keys, default)
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(
+        obj, indent=2 if indent else None, sort_keys=sort_keys, default=default
+    ).encode('utf-8')
+
+
+def _orjson_option(sort_keys: bool, default: Optional[Callable]) -> int:
+    """orjson option flags matching the stdlib json.dumps arguments."""
+    option = orjson.OPT_SORT_KEYS if sort_keys else 0
+    if default is not None:
+        # The stdlib encoder has no native datetime support, so a default
+        # decides their format; orjson would otherwise emit RFC 3339
+        option |= orjson.OPT_PASSTHROUGH_DATETIME
+    return option
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Parse JSON text or bytes.
+
+    Args:
+        data: JSON document
+
+    Returns:
+        Parsed object
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -2,7 +2,34 @@
 Input validation utilities.
 """
 import re
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
+
+# Patterns used on every SMS webhook, compiled once at import. Phone number
+# patterns are ASCII-only: \d means [0-9], checked without Unicode tables.
+# The separator pattern stays Unicode, so other scripts' digits are kept (and
+# then rejected) rather than silently dropped
+_NON_DIGIT_RE = re.compile(r'\D')
+_NON_DIGIT_TABLE = str.maketrans('', '', ''.join(c for c in map(chr, range(256)) if c not in '0123456789'))
+# Accepted digit-only forms: 2547XXXXXXXX, 07XXXXXXXX, 25407XXXXXXXX (common
+# user variant) and 7XXXXXXXX, likewise for 1XXXXXXXX numbers
+_KENYAN_NUMBER_RE = re.compile(r'(?:254|2540|0)?([17]\d{8})', re.ASCII)
+_URL_PATTERN = r'https?://[^\s<>"{}|\\^`\[\]]+[^\s<>"{}|\\^`\[\].,;:!?]'
+_URL_RE = re.compile(_URL_PATTERN)
+# Optional scheme plus host (and port/userinfo): the case-insensitive part of a URL
+_URL_AUTHORITY_RE = re.compile(r'(?:[A-Za-z][A-Za-z0-9+.-]*://)?[^/?#]*')
+# Control characters other than tab, newline and carriage return, deleted
+# with str.translate
+_CONTROL_CHARS_TABLE = dict.fromkeys([*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F])
+# Script injection markers rejected in SMS text, matched in one pass
+_DANGEROUS_RE = re.compile(r'<script|javascript:|onerror=|onload=', re.IGNORECASE)
+# Match common Kenyan number formats in free text
+# (scoped ASCII flag, so the URL part of the combined pattern below keeps
+# Unicode \s and still stops at non-breaking spaces; the boundary checks
+# stay Unicode, so a number is not cut out of a run of other-script digits)
+_PHONE_PATTERN = r'(?<!\d)(?a:\+254[17]\d{8}|254[17]\d{8}|0[17]\d{8}|2540[17]\d{8}|[17]\d{8})(?!\d)'
+_PHONE_RE = re.compile(_PHONE_PATTERN)
+# URLs and phone numbers in a single scan; digits inside a URL belong to it
+_URL_OR_PHONE_RE = re.compile('(?P<url>' + _URL_PATTERN + ')|(?P<phone>' + _PHONE_PATTERN + ')')
 
 
 def normalize_phone_number(phone: str) -> str:
@@ -18,25 +45,35 @@ def normalize_phone_number(phone: str) -> str:
     if not phone:
         return ""
 
-    cleaned = re.sub(r'\D', '', phone.strip())
+    # Drop separators with a translate table; fall back to the regex for
+    # anything outside Latin-1 it leaves behind
+    cleaned = phone.translate(_NON_DIGIT_TABLE)
+    if not cleaned.isascii():
+        cleaned = _NON_DIGIT_RE.sub('', cleaned)
+        # Only non-ASCII digits (Arabic-Indic, fullwidth, ...) can remain;
+        # mixed-script numbers are invalid, not to be pieced together
+        if not cleaned.isascii():
+            return ""
 
-    # Accept +2547XXXXXXXX / +2541XXXXXXXX (after removing '+')
-    if len(cleaned) == 12 and cleaned.startswith('254') and cleaned[3] in {'1', '7'}:
-        return f'+{cleaned}'
+    match = _KENYAN_NUMBER_RE.fullmatch(cleaned)
+    return f'+254{match.group(1)}' if match else ""
 
-    # Accept 07XXXXXXXX / 01XXXXXXXX
-    if len(cleaned) == 10 and cleaned.startswith('0') and cleaned[1] in {'1', '7'}:
-        return f'+254{cleaned[1:]}'
 
-    # Accept 25407XXXXXXXX / 25401XXXXXXXX (common user variant)
-    if len(cleaned) == 13 and cleaned.startswith('2540') and cleaned[4] in {'1', '7'}:
-        return f'+254{cleaned[4:]}'
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL for comparison by lower-casing its scheme and host.
+
+    The path, query and fragment are left as-is, since they are
+    case-sensitive (bit.ly/abc and bit.ly/ABC are different links).
 
-    # Accept 7XXXXXXXX / 1XXXXXXXX
-    if len(cleaned) == 9 and cleaned[0] in {'1', '7'}:
-        return f'+254{cleaned}'
+    Args:
+        url: URL as found in a message
 
-    return ""
+    Returns:
+        URL with lower-case scheme and host
+    """
+    end = _URL_AUTHORITY_RE.match(url).end()
+    return url[:end].lower() + url[end:]
 
 
 def validate_phone_number(phone: str) -> Tuple[bool, Optional[str]]:
@@ -77,17 +114,8 @@ def validate_sms_text(text: str, max_length: int = 1000) -> Tuple[bool, Optional
         return False, f"SMS text exceeds maximum length of {max_length} characters"
 
     # Check for potentially dangerous content
-    dangerous_patterns = [
-        r'<script',
-        r'javascript:',
-        r'onerror=',
-        r'onload=',
-    ]
-
-    text_lower = text.lower()
-    for pattern in dangerous_patterns:
-        if re.search(pattern, text_lower):
-            return False, "SMS contains potentially dangerous content"
+    if _DANGEROUS_RE.search(text):
+        return False, "SMS contains potentially dangerous content"
 
     return True, None
 
@@ -102,32 +130,53 @@ def extract_urls(text: str) -> list:
     Returns:
         List of found URLs
     """
-    url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+[^\s<>"{}|\\^`\[\].,;:!?]'
-    urls = re.findall(url_pattern, text)
-    return urls
+    return _URL_RE.findall(text)
 
 
-def extract_phone_numbers(text: str) -> list:
+def extract_phone_numbers(text: str, exclude: Optional[str] = None) -> list:
     """
     Extract phone numbers from text.
 
     Args:
         text: Text to search for phone numbers
+        exclude: Normalized number to leave out (e.g. the reporter's own)
 
     Returns:
         List of found phone numbers
     """
-    # Match common Kenyan number formats in free text
-    phone_pattern = r'(?<!\d)(?:\+254[17]\d{8}|254[17]\d{8}|0[17]\d{8}|2540[17]\d{8}|[17]\d{8})(?!\d)'
-    matches = re.findall(phone_pattern, text)
+    return _normalize_phones(_PHONE_RE.findall(text), exclude)
+
+
+def extract_urls_and_phones(text: str, exclude: Optional[str] = None) -> Tuple[List[str], List[str]]:
+    """
+    Extract URLs and phone numbers from text in one pass.
 
-    normalized_phones = []
-    for match in matches:
-        normalized = normalize_phone_number(match)
-        if normalized and normalized not in normalized_phones:
-            normalized_phones.append(normalized)
+    Unlike calling extract_urls and extract_phone_numbers separately, digits
+    that are part of a URL are not reported as a phone number.
 
-    return normalized_phones
+    Args:
+        text: Text to search
+        exclude: Normalized number to leave out (e.g. the reporter's own)
+
+    Returns:
+        Tuple of (URLs, normalized phone numbers)
+    """
+    urls = []
+    phones = []
+    for match in _URL_OR_PHONE_RE.finditer(text):
+        if match.lastgroup == 'url':
+            urls.append(match.group())
+        else:
+            phones.append(match.group())
+    return urls, _normalize_phones(phones, exclude)
+
+
+def _normalize_phones(matches: List[str], exclude: Optional[str]) -> List[str]:
+    """Normalize matched numbers, dropping invalid ones, duplicates and exclude."""
+    # dict keeps first-seen order with O(1) membership checks
+    normalized_phones = dict.fromkeys(filter(None, map(normalize_phone_number, matches)))
+    normalized_phones.pop(exclude, None)
+    return list(normalized_phones)
 
 
 def sanitize_text(text: str) -> str:
@@ -143,11 +192,6 @@ def sanitize_text(text: str) -> str:
     if not text:
         return ""
 
-    # Remove null bytes
-    text = text.replace('\x00', '')
-
-    # Remove control characters except newlines and tabs
-    text = re.sub(r'[\x00-\x08\x0B-\x0C\x0E-\x1F\x7F]', '', text)
-
-    return text.strip()
+    # Remove null bytes and other control characters except newlines and tabs
+    return text.translate(_CONTROL_CHARS_TABLE).strip()
 
@@ -9,9 +9,9 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app import create_app
-from app.services.gemini.batch_processor import CampaignDetector
+from app.services.gemini.batch_processor import get_campaign_detector
 from app.services.database.models import DatabaseService
-from app.services.notifications.alert_service import AlertService
+from app.services.notifications.alert_service import get_alert_service
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -22,8 +22,8 @@ app = create_app()
 with app.app_context():
     try:
         # Initialize services
-        detector = CampaignDetector()
-        alert_service = AlertService()
+        detector = get_campaign_detector()
+        alert_service = get_alert_service()
 
         # Detect campaigns
         logger.info("Starting campaign detection...")
@@ -48,7 +48,7 @@ def simple_demo():
         ("Limited offer! iPhone 13 for only $99. Buy now: http://cheap-iphone.site/offer?utm=flash", True, "social_engineering"),
     ]
 
-    app = create_app()
+    app = create_app(minimal=True)
     metrics = EvaluationMetrics(threshold=0.5)
 
     with app.app_context():
@@ -56,9 +56,11 @@ def simple_demo():
 
         print(f"\nAnalyzing {len(samples)} messages...\n")
 
-        for idx, (text, actual_phishing, category) in enumerate(samples, 1):
+        # All requests go out together instead of one round trip per message
+        results = analyzer.analyze_batch([{'message_text': text} for text, _, _ in samples])
+
+        for idx, ((text, actual_phishing, category), result) in enumerate(zip(samples, results), 1):
             try:
-                result = analyzer.analyze_message(text)
                 score = min(result.get('score', 0) / 10.0, 1.0)
 
                 predicted_phishing = score >= 0.5
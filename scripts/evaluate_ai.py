@@ -10,6 +10,12 @@ Usage:
     python scripts/evaluate_ai.py                    # Use default dataset
     python scripts/evaluate_ai.py --dataset custom.csv  # Use custom dataset
     python scripts/evaluate_ai.py --threshold 0.6    # Test different threshold
+    python scripts/evaluate_ai.py --concurrency 5    # Fewer requests in flight
+    python scripts/evaluate_ai.py --mode batch       # One discounted Gemini batch job
+    python scripts/evaluate_ai.py --no-cache         # Ignore cached analyses
+
+Analyses are cached in <output>/.gemini_cache.sqlite, keyed by model, prompt
+and message text, so re-runs (e.g. threshold sweeps) skip Gemini entirely.
 
 Output:
     - reports/evaluation_summary.json       - Metrics summary
@@ -23,12 +29,16 @@ Output:
 
 import os
 import sys
-import json
 import csv
+import hashlib
+import inspect
 import logging
+import shutil
+import sqlite3
+from array import array
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import argparse
 import time
 
@@ -41,9 +51,12 @@ load_dotenv()
 # Import after env is loaded
 from flask import Flask
 from app import create_app
-from app.services.gemini.analyzer import GeminiAnalyzer
+from app.services.gemini.analyzer import GeminiAnalyzer, get_analyzer
+from app.services.gemini.prompt_templates import SYSTEM_INSTRUCTION
 from app.services.evaluation.metrics import EvaluationMetrics
 from app.services.evaluation.visualizer import EvaluationVisualizer
+from app.services.evaluation.visualizer_worker import ChartWorker
+from app.utils import serialization
 
 # Configure logging
 logging.basicConfig(
@@ -52,30 +65,172 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Try to import polars (optional dependency, fast CSV parsing for large datasets)
+try:
+    import polars as pl
+    POLARS_AVAILABLE = True
+except ImportError:
+    pl = None
+    POLARS_AVAILABLE = False
+
+_DATASET_COLUMNS = ['id', 'text', 'actual_label', 'category']
+
+# Messages sent to the analyzer per batch; progress is logged after each
+BATCH_SIZE = 50
+
+# Requests in flight at once, and tries per message on 429/5xx responses
+DEFAULT_CONCURRENCY = 10
+MAX_ATTEMPTS = 3
+
+# Minimum seconds between progress lines; cached batches finish instantly
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+CACHE_FILENAME = '.gemini_cache.sqlite'
+
+# Rendered charts keyed by their inputs, shared by every output directory;
+# least recently used files beyond the limit are deleted after each report
+CHART_CACHE_DIR = Path(
+    os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache'
+) / 'sms-eval' / 'figures'
+CHART_CACHE_MAX_FILES = 200
+
+
+class ResultCache:
+    """On-disk cache of successful analyses, shared across evaluation runs."""
+
+    def __init__(self, path: Path):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: SQLite file path
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path))
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS analyses '
+            '(key TEXT PRIMARY KEY, raw_score REAL, raw_json TEXT)'
+        )
+
+    @staticmethod
+    def key(model_name: str, message_text: str) -> str:
+        """Cache key; a new model, system instruction or prompt template misses."""
+        prompt = GeminiAnalyzer._build_prompt(message_text, None, None, None)
+        material = '\0'.join((model_name, SYSTEM_INSTRUCTION, prompt))
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached analysis, or None."""
+        row = self._conn.execute(
+            'SELECT raw_json FROM analyses WHERE key = ?', (key,)
+        ).fetchone()
+        return serialization.loads(row[0]) if row else None
+
+    def put_many(self, items: List[Tuple[str, Dict]]) -> None:
+        """Store (key, analysis) pairs in one transaction."""
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO analyses (key, raw_score, raw_json) VALUES (?, ?, ?)',
+                [(key, result.get('score'), serialization.dumps(result)) for key, result in items]
+            )
+
+    def close(self) -> None:
+        """Close the database."""
+        self._conn.close()
+
+
+def chart_cache_key(method: str, kwargs: Dict, dpi: int, model_name: str) -> str:
+    """
+    Content hash of one chart's inputs.
+
+    Covers the plot method, its arguments (except the output path), the dpi,
+    the model that produced the results and the visualizer source, so any
+    change to data or drawing code misses.
+
+    Args:
+        method: Visualizer plot method name
+        kwargs: Keyword arguments for the plot method
+        dpi: Resolution for saved images
+        model_name: Gemini model the evaluated results came from
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha1(f'{method}:{dpi}:{model_name}:'.encode('utf-8'))
+    digest.update(Path(inspect.getfile(EvaluationVisualizer)).read_bytes())
+    for name, value in sorted(kwargs.items()):
+        if name == 'output_path':
+            continue
+        digest.update(name.encode('utf-8'))
+        digest.update(value.tobytes() if isinstance(value, array) else serialization.dumps_bytes(value))
+    return digest.hexdigest()
+
+
+def prune_chart_cache(max_files: int = CHART_CACHE_MAX_FILES) -> None:
+    """
+    Delete the least recently used cached charts beyond max_files.
+
+    Cache hits refresh a file's modification time, so it orders by last use.
+
+    Args:
+        max_files: Number of charts to keep
+    """
+    files = sorted(CHART_CACHE_DIR.glob('*.png'), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in files[max_files:]:
+        path.unlink(missing_ok=True)
+
 
 class AIEvaluator:
     """Comprehensive AI evaluation framework."""
 
-    def __init__(self, app: Flask, threshold: float = 0.5):
+    def __init__(
+        self,
+        app: Flask,
+        threshold: float = 0.5,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        mode: str = 'sync',
+        cache_path: Optional[Path] = None
+    ):
         """
         Initialize evaluator.
 
         Args:
             app: Flask application instance
             threshold: Classification threshold (0-1)
+            concurrency: Maximum Gemini requests in flight (sync mode)
+            mode: 'sync' for direct requests, 'batch' for one Gemini API
+                batch job over the whole dataset
+            cache_path: SQLite file for cached analyses; None disables caching
         """
         self.app = app
         self.threshold = threshold
+        self.concurrency = concurrency
+        self.mode = mode
+        self.cache_path = cache_path
         self.metrics = EvaluationMetrics(threshold=threshold)
         self.visualizer = EvaluationVisualizer()
         self.analyzer = None
+        # Model that produced the results, after any fallback; set by evaluate()
+        self.model_name = None
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """
+        Collapse runs of whitespace and trim.
+
+        Unicode is left as is: look-alike characters are phishing evidence
+        the model should see.
+        """
+        return ' '.join(text.split())
 
     def load_dataset(self, filepath: str) -> List[Dict]:
         """
         Load evaluation dataset from CSV.
 
         Expected columns: id, text, actual_label, category
-        where actual_label is 'phishing' or 'legitimate'
+        where actual_label is 'phishing' or 'legitimate'. Parsed with
+        polars when installed, which is much faster on large datasets.
+        Each message also gets 'text_norm', the text sent for analysis.
 
         Args:
             filepath: Path to CSV file
@@ -83,16 +238,29 @@ class AIEvaluator:
         Returns:
             List of message dictionaries
         """
-        messages = []
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                messages.append({
-                    'id': row['id'],
-                    'text': row['text'],
-                    'actual_label': row['actual_label'].lower() == 'phishing',
-                    'category': row['category'].strip()
-                })
+        if POLARS_AVAILABLE:
+            # Read every column as text, like csv.DictReader
+            messages = pl.read_csv(
+                filepath, columns=_DATASET_COLUMNS, infer_schema=False
+            ).with_columns(
+                pl.col('actual_label').str.to_lowercase().eq('phishing'),
+                pl.col('category').str.strip_chars()
+            ).to_dicts()
+        else:
+            messages = []
+            with open(filepath, 'r', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    messages.append({
+                        'id': row['id'],
+                        'text': row['text'],
+                        'actual_label': row['actual_label'].lower() == 'phishing',
+                        'category': row['category'].strip()
+                    })
+
+        # Normalized once here; used for requests and cache keys
+        for message in messages:
+            message['text_norm'] = self._normalize(message['text'])
         logger.info(f"Loaded {len(messages)} messages from {filepath}")
         return messages
 
@@ -106,50 +274,95 @@ class AIEvaluator:
         logger.info(f"Starting evaluation with {len(messages)} messages...")
 
         start_time = time.time()
+        last_progress = start_time
         successful = 0
         failed = 0
 
         with self.app.app_context():
-            # Initialize analyzer in app context
-            self.analyzer = GeminiAnalyzer()
-
-            for idx, message in enumerate(messages, 1):
-                try:
-                    # Analyze message
-                    result = self.analyzer.analyze_message(
-                        message_text=message['text']
-                    )
+            # The app's shared analyzer; repeated evaluate() calls (e.g. a
+            # threshold sweep) reuse its client instead of re-initializing
+            self.analyzer = get_analyzer()
+            cache = ResultCache(self.cache_path) if self.cache_path else None
+
+            # A batch job covers the whole dataset in one submission
+            step = max(len(messages), 1) if self.mode == 'batch' else BATCH_SIZE
+
+            for batch_start in range(0, len(messages), step):
+                batch = messages[batch_start:batch_start + step]
+                requests = [{'message_text': message['text_norm']} for message in batch]
+
+                results = [None] * len(batch)
+                if cache:
+                    keys = [
+                        ResultCache.key(self.analyzer.model_name, message['text_norm'])
+                        for message in batch
+                    ]
+                    results = [cache.get(key) for key in keys]
+                pending = [i for i, result in enumerate(results) if result is None]
+
+                if pending:
+                    pending_requests = [requests[i] for i in pending]
+                    if self.mode == 'batch':
+                        fresh = self.analyzer.analyze_batch_job(pending_requests)
+                    else:
+                        # Analyze the batch with overlapping requests
+                        fresh = self.analyzer.analyze_batch(
+                            pending_requests,
+                            concurrency=self.concurrency,
+                            max_attempts=MAX_ATTEMPTS
+                        )
+                    for i, result in zip(pending, fresh):
+                        results[i] = result
+
+                    if cache:
+                        # Stored under the model that answered, which differs
+                        # from the lookup key's model after a fallback. Failed
+                        # analyses are retried on the next run
+                        model_name = self.analyzer.model_name
+                        cache.put_many([
+                            (ResultCache.key(model_name, requests[i]['message_text']), results[i])
+                            for i in pending if 'error' not in results[i]
+                        ])
+
+                for message, result in zip(batch, results):
+                    try:
+                        # Extract score (0-10 scale from Gemini)
+                        raw_score = result.get('score', 0)
+                        # Normalize to 0-1
+                        predicted_score = min(raw_score / 10.0, 1.0)
+
+                        # Record prediction
+                        self.metrics.add_prediction(
+                            actual_label=message['actual_label'],
+                            predicted_score=predicted_score,
+                            message_id=message['id'],
+                            message_text=message['text'],
+                            category=message['category']
+                        )
 
-                    # Extract score (0-10 scale from Gemini)
-                    raw_score = result.get('score', 0)
-                    # Normalize to 0-1
-                    predicted_score = min(raw_score / 10.0, 1.0)
-
-                    # Record prediction
-                    self.metrics.add_prediction(
-                        actual_label=message['actual_label'],
-                        predicted_score=predicted_score,
-                        message_id=message['id'],
-                        message_text=message['text'],
-                        category=message['category']
+                        successful += 1
+
+                    except Exception as e:
+                        logger.error(f"Failed to analyze message {message['id']}: {e}")
+                        failed += 1
+                        continue
+
+                # Progress indicator, throttled by wall-clock time; the
+                # completion line below always reports the final count
+                now = time.time()
+                if now - last_progress >= PROGRESS_INTERVAL_SECONDS:
+                    last_progress = now
+                    idx = batch_start + len(batch)
+                    elapsed = now - start_time
+                    remaining = (len(messages) - idx) * elapsed / idx
+                    logger.info(
+                        f"Processed {idx}/{len(messages)} "
+                        f"({elapsed:.1f}s, ~{remaining:.1f}s remaining)"
                     )
 
-                    successful += 1
-
-                    # Progress indicator
-                    if idx % 10 == 0:
-                        elapsed = time.time() - start_time
-                        rate = idx / elapsed
-                        remaining = (len(messages) - idx) / rate if rate > 0 else 0
-                        logger.info(
-                            f"Processed {idx}/{len(messages)} "
-                            f"({elapsed:.1f}s, ~{remaining:.1f}s remaining)"
-                        )
-
-                except Exception as e:
-                    logger.error(f"Failed to analyze message {message['id']}: {e}")
-                    failed += 1
-                    continue
+            if cache:
+                cache.close()
+            self.model_name = self.analyzer.model_name
 
         elapsed = time.time() - start_time
         logger.info(
@@ -187,41 +400,65 @@ class AIEvaluator:
         # Generate visualizations
         logger.info("Generating visualizations...")
 
-        # Confusion matrix
-        self.visualizer.plot_confusion_matrix(
-            summary['confusion_matrix'],
-            str(figures_path / "confusion_matrix.png")
-        )
-
-        # ROC curve
-        self.visualizer.plot_roc_curve(
-            self.metrics.all_labels,
-            self.metrics.all_scores,
-            str(figures_path / "roc_curve.png")
-        )
-
-        # Metrics comparison
-        self.visualizer.plot_metrics_comparison(
-            summary['metrics'],
-            str(figures_path / "metrics_comparison.png")
-        )
-
-        # Category performance
+        # Charts render in a background process while the report is written
+        charts = [
+            ('plot_confusion_matrix', {
+                'cm_values': summary['confusion_matrix'],
+                'output_path': str(figures_path / "confusion_matrix.png"),
+            }),
+            ('plot_roc_curve', {
+                'y_true': self.metrics.all_labels,
+                'y_scores': self.metrics.all_scores,
+                'output_path': str(figures_path / "roc_curve.png"),
+            }),
+            ('plot_metrics_comparison', {
+                'metrics': summary['metrics'],
+                'output_path': str(figures_path / "metrics_comparison.png"),
+            }),
+            ('plot_class_distribution', {
+                'y_true': self.metrics.all_labels,
+                'output_path': str(figures_path / "class_distribution.png"),
+            }),
+        ]
         if summary['category_metrics']:
-            self.visualizer.plot_category_performance(
-                summary['category_metrics'],
-                str(figures_path / "category_performance.png")
-            )
-
-        # Class distribution
-        self.visualizer.plot_class_distribution(
-            self.metrics.all_labels,
-            str(figures_path / "class_distribution.png")
-        )
+            charts.append(('plot_category_performance', {
+                'category_metrics': summary['category_metrics'],
+                'output_path': str(figures_path / "category_performance.png"),
+            }))
+        # Charts whose inputs were rendered before are copied from the cache
+        dpi = self.visualizer.dpi
+        pending = []
+        for method, kwargs in charts:
+            cached = CHART_CACHE_DIR / f"{chart_cache_key(method, kwargs, dpi, self.model_name)}.png"
+            if cached.exists():
+                shutil.copyfile(cached, kwargs['output_path'])
+                os.utime(cached)
+            else:
+                # A stale copy must not be cached if this render fails
+                Path(kwargs['output_path']).unlink(missing_ok=True)
+                pending.append((cached, method, kwargs))
+
+        chart_worker = None
+        if pending:
+            # One process per chart, up to the core count
+            chart_worker = ChartWorker(
+                dpi=dpi,
+                processes=min(len(pending), os.cpu_count() or 1)
+            ).start()
+            chart_worker.submit([(method, kwargs) for _, method, kwargs in pending])
+        logger.info(f"{len(charts) - len(pending)} of {len(charts)} charts reused from cache")
 
         # Generate markdown report
         self._generate_markdown_report(output_path, summary)
 
+        if chart_worker:
+            chart_worker.join()
+            CHART_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            for cached, _, kwargs in pending:
+                if os.path.exists(kwargs['output_path']):
+                    shutil.copyfile(kwargs['output_path'], cached)
+            prune_chart_cache()
+
         logger.info(f"Reports saved to {output_dir}")
         return summary
 
@@ -233,7 +470,7 @@ class AIEvaluator:
         # Top misclassifications
         misclassifications = self.metrics.get_misclassifications(limit=10)
 
-        report = f"""# AI Evaluation Report: SMS Phishing Detection
+        parts = [f"""# AI Evaluation Report: SMS Phishing Detection
 
 **Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
@@ -248,7 +485,7 @@ This report evaluates the performance of the Gemini AI analyzer on {summary['tot
 
 ### Performance Grade
 
-"""
+"""]
 
         # Grade based on F1 score
         f1 = metrics['f1_score']
@@ -263,9 +500,9 @@ This report evaluates the performance of the Gemini AI analyzer on {summary['tot
         else:
             grade = "🔴 D (Needs Improvement)"
 
-        report += f"**Overall Grade: {grade}** (F1-Score: {f1:.4f})\n\n"
+        parts.append(f"**Overall Grade: {grade}** (F1-Score: {f1:.4f})\n\n")
 
-        report += f"""---
+        parts.append(f"""---
 
 ## Key Metrics
 
@@ -315,24 +552,24 @@ Actual L  |    {cm['true_negatives']:4d}   |   {cm['false_positives']:4d}   |
 
 ## Category Performance
 
-"""
+""")
 
         # Category breakdown
         if summary['category_metrics']:
-            report += "Performance across message categories:\n\n"
-            report += "| Category | Count | Accuracy | Precision | Recall | F1-Score |\n"
-            report += "|----------|-------|----------|-----------|--------|----------|\n"
+            parts.append("Performance across message categories:\n\n")
+            parts.append("| Category | Count | Accuracy | Precision | Recall | F1-Score |\n")
+            parts.append("|----------|-------|----------|-----------|--------|----------|\n")
 
             for cat_name, cat_metrics in summary['category_metrics'].items():
-                report += (
+                parts.append(
                     f"| {cat_name} | {cat_metrics['count']} | "
                     f"{cat_metrics['accuracy']:.2%} | {cat_metrics['precision']:.2%} | "
                     f"{cat_metrics['recall']:.2%} | {cat_metrics['f1_score']:.4f} |\n"
                 )
         else:
-            report += "No category data available.\n"
+            parts.append("No category data available.\n")
 
-        report += f"""
+        parts.append(f"""
 
 ---
 
@@ -340,21 +577,21 @@ Actual L  |    {cm['true_negatives']:4d}   |   {cm['false_positives']:4d}   |
 
 The model was most confident about {len(misclassifications)} errors:
 
-"""
+""")
 
         for idx, pred in enumerate(misclassifications[:10], 1):
             actual = "PHISHING" if pred['actual_label'] else "LEGITIMATE"
             predicted = "PHISHING" if pred['predicted_label'] else "LEGITIMATE"
             confidence = pred['predicted_score']
 
-            report += f"""
+            parts.append(f"""
 ### {idx}. {actual} classified as {predicted} (confidence: {confidence:.1%})
 - **Text:** "{pred['message_text'][:100]}{"..." if len(pred['message_text']) > 100 else ""}"
 - **Category:** {pred['category']}
 - **Score:** {pred['predicted_score']:.3f}
-"""
+""")
 
-        report += f"""
+        parts.append(f"""
 
 ---
 
@@ -372,7 +609,7 @@ The following charts have been generated (see figures/ directory):
 
 ## Recommendations
 
-"""
+""")
 
         # Generate recommendations based on metrics
         recommendations = []
@@ -405,9 +642,9 @@ The following charts have been generated (see figures/ directory):
             recommendations.append("✅ Model performance is adequate. Continue monitoring with new data.")
 
         for rec in recommendations:
-            report += f"- {rec}\n\n"
+            parts.append(f"- {rec}\n\n")
 
-        report += f"""
+        parts.append(f"""
 
 ---
 
@@ -425,7 +662,7 @@ The following charts have been generated (see figures/ directory):
 
 **Average Inference Time:** {summary.get('avg_inference_time', 'N/A')}
 
-**Model Version:** {os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')}
+**Model Version:** {self.model_name or os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')}
 
 **Evaluation Date:** {datetime.now().isoformat()}
 
@@ -442,12 +679,11 @@ Suggested next steps:
 3. Re-train or fine-tune on misclassified examples
 4. Gather user feedback on alert quality
 
-"""
+""")
 
         # Write report
         report_file = output_path / "EVALUATION_REPORT.md"
-        with open(report_file, 'w') as f:
-            f.write(report)
+        report_file.write_text(''.join(parts), encoding='utf-8')
 
         logger.info(f"Markdown report saved to {report_file}")
 
@@ -469,12 +705,30 @@ def main():
         default=0.5,
         help='Classification threshold (0-1, default 0.5)'
     )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f'Gemini requests in flight (default {DEFAULT_CONCURRENCY}); lower it if rate limited'
+    )
+    parser.add_argument(
+        '--mode',
+        choices=['sync', 'batch'],
+        default='sync',
+        help='sync: direct requests (fast turnaround); '
+             'batch: one Gemini API batch job (cheaper, may take minutes)'
+    )
     parser.add_argument(
         '--output',
         type=str,
         default='reports',
         help='Output directory for reports'
     )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help=f'Re-analyze every message instead of reusing <output>/{CACHE_FILENAME}'
+    )
 
     args = parser.parse_args()
 
@@ -484,10 +738,16 @@ def main():
         sys.exit(1)
 
     # Create Flask app
-    app = create_app()
+    app = create_app(minimal=True)
 
     # Run evaluation
-    evaluator = AIEvaluator(app, threshold=args.threshold)
+    evaluator = AIEvaluator(
+        app,
+        threshold=args.threshold,
+        concurrency=args.concurrency,
+        mode=args.mode,
+        cache_path=None if args.no_cache else Path(args.output) / CACHE_FILENAME
+    )
 
     try:
         messages = evaluator.load_dataset(args.dataset)
@@ -13,7 +13,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app import create_app, db
 
-app = create_app()
+app = create_app(minimal=True)
 
 with app.app_context():
     # Create all tables
@@ -1,30 +1,61 @@
 #!/usr/bin/env python3
 """
-Install requirements one-by-one and log failures. Cross-platform friendly.
+Install requirements and log failures. Cross-platform friendly.
+
+Tries one `pip install -r` first. If that fails, packages are downloaded in
+parallel and then installed one-by-one from the local copies, so a single
+bad line does not block the rest.
 Usage: python scripts/install_requirements_safe.py [requirements-file]
 """
 import subprocess
 import sys
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 req_file = sys.argv[1] if len(sys.argv) > 1 else 'requirements.txt'
 log_file = 'install_errors.log'
 
-open(log_file, 'w').close()
-print(f'Installing packages from {req_file} (one-by-one). Errors will be logged to {log_file}')
+PIP = [sys.executable, '-m', 'pip']
+PIP_FLAGS = ['--disable-pip-version-check', '--no-input']
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def download(line, dest):
+    # Downloads only touch their own directory, so they can run concurrently;
+    # parallel installs into one site-packages could clobber shared deps
+    res = subprocess.run(PIP + ['download', *PIP_FLAGS, '-q', '-d', dest, line])
+    return res.returncode == 0
+
+
+print(f'Installing packages from {req_file}. Errors will be logged to {log_file}')
+
+failed = []
+res = subprocess.run(PIP + ['install', *PIP_FLAGS, '-r', req_file])
+if res.returncode != 0:
+    with open(req_file) as f:
+        lines = [line for line in (raw.split('#', 1)[0].strip() for raw in f) if line]
+
+    print(f'Batch install failed, retrying {len(lines)} packages one-by-one')
+    with tempfile.TemporaryDirectory() as cache:
+        dests = [os.path.join(cache, str(i)) for i in range(len(lines))]
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            downloaded = list(pool.map(download, lines, dests))
+
+        find_links = [arg for dest in dests for arg in ('--find-links', dest)]
+        for line, ok in zip(lines, downloaded):
+            if not ok:
+                failed.append(line)
+                continue
 
-with open(req_file) as f:
-    for raw in f:
-        line = raw.split('#', 1)[0].strip()
-        if not line:
-            continue
+            print(f'Installing: {line}')
+            res = subprocess.run(PIP + ['install', *PIP_FLAGS, *find_links, line])
+            if res.returncode != 0:
+                failed.append(line)
 
-        print(f'Installing: {line}')
-        res = subprocess.run([sys.executable, '-m', 'pip', 'install', line])
-        if res.returncode != 0:
-            with open(log_file, 'a') as L:
-                L.write(f'{line}\n')
+with open(log_file, 'w') as L:
+    L.writelines(f'{line}\n' for line in failed)
 
 print('Done. Check install_errors.log for any failed packages.')
-if os.path.getsize(log_file) > 0:
+if failed:
     sys.exit(1)
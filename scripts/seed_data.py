@@ -3,15 +3,14 @@ Seed database with sample data (for testing).
 """
 import sys
 from pathlib import Path
-from datetime import datetime
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app import create_app, db
-from app.models import Subscriber
+from app import create_app
+from app.services.database.models import DatabaseService
 
-app = create_app()
+app = create_app(minimal=True)
 
 with app.app_context():
     # Add sample subscribers
@@ -21,13 +20,9 @@ with app.app_context():
         {'phone_number': '+254734567890', 'region': 'Kisumu'},
     ]
 
-    for sub_data in sample_subscribers:
-        existing = Subscriber.query.filter_by(phone_number=sub_data['phone_number']).first()
-        if not existing:
-            subscriber = Subscriber(**sub_data)
-            db.session.add(subscriber)
-            print(f"Added subscriber: {sub_data['phone_number']}")
+    # One INSERT ... ON CONFLICT DO NOTHING; existing numbers are skipped
+    added = DatabaseService.bulk_create_subscribers(sample_subscribers)
+    print(f"Added {added} of {len(sample_subscribers)} subscribers")
 
-    db.session.commit()
     print("Sample data seeded successfully!")
 